@@ -1,11 +1,19 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
-from budget_forecast import BudgetForecaster
+from budget_forecast import BudgetForecaster, ForecastSnapshot, DAYS_IN_MONTH, FORECAST_YEAR
+from charts import get_chart_specs, get_tornado_spec
+from export import EXPORT_FORMATS, to_arrow_ipc
+from export_jobs import find_export, get_full_export, submit_export
+from warmup import find_warmup, start_warmup
+import metrics
+from dataset_store import dataset_path, prune_store
+from data_sources import SOURCE_FORMATS, TARGET_GROUP_COLUMN, TARGET_VALUE_COLUMN, detect_format, read_targets
 import numpy as np
-import tempfile
 import os
+import hashlib
+import functools
+from io import BytesIO
 
 # Sayfa konfigürasyonu
 st.set_page_config(
@@ -14,6 +22,67 @@ st.set_page_config(
     layout="wide"
 )
 
+# Varsayılan hedefler: widget başlangıç değerleri ve yükleme sonrası ön hesaplanan senaryo
+DEFAULT_GROWTH_PCT = 15.0
+DEFAULT_MARGIN_POINTS = 2.0
+DEFAULT_STOCK_RATIO = 0.8
+DEFAULT_SCENARIO = dict(
+    growth_param=DEFAULT_GROWTH_PCT / 100,
+    margin_improvement=DEFAULT_MARGIN_POINTS / 100,
+    stock_ratio_target=DEFAULT_STOCK_RATIO
+)
+
+# Paylaşılan snapshot'ın senaryo cache'i (LRU, kayıt sayısı). Bir senaryo ~12 kayıt
+# üretir: tahmin, tam veri, figürler, detay tablo ve görünümü, duyarlılık, metrik başına
+# tornado ve format başına tam veri dosyası (Excel ayrı depodadır, bkz. export_jobs).
+# Varsayılan 32 kayıt 3-4 eşzamanlı kullanıcıda birbirini düşürür; cache tüm oturumlarda
+# ortak olduğundan 8 oturumun her biri son 3 senaryosunu tutabilecek kadar ayrılır.
+# Kayıtlar 3 yıllık tam tabloları ve dışa aktarma dosyalarını da içerdiğinden binlerce
+# grupta kayıt sayısı belleği sınırlamaz; cache ayrıca byte ile sınırlanır (veri seti
+# başına; load_data en çok 8 veri seti tutar → en çok ~2 GiB) ve en eski kullanılan düşer.
+CACHE_ENTRIES_PER_SCENARIO = 12
+SHARED_SESSIONS = 8
+SCENARIOS_PER_SESSION = 3
+SNAPSHOT_CACHE_SIZE = CACHE_ENTRIES_PER_SCENARIO * SHARED_SESSIONS * SCENARIOS_PER_SESSION
+SNAPSHOT_CACHE_BYTES = 256 * 1024 ** 2
+
+# Operasyonel metrikler (bkz. metrics): BUDGET_METRICS_PORT verilirse yerel /metrics uç
+# noktası, BUDGET_METRICS_FILE verilirse textfile collector dosyası; süreç başına bir kez başlar
+@st.cache_resource(show_spinner=False)
+def start_metrics_export():
+    port = os.environ.get('BUDGET_METRICS_PORT')
+    path = os.environ.get('BUDGET_METRICS_FILE')
+    return (
+        metrics.start_http_server(int(port)) if port else None,
+        metrics.start_textfile_writer(path) if path else None
+    )
+
+start_metrics_export()
+
+# Oturum çalıştırma sayaçları: tam çalıştırma, yeni senaryo ile yeniden hesaplama ve
+# yalnızca bir bölümün yenilendiği fragment çalıştırmaları (sayfa altında gösterilir)
+run_stats = st.session_state.setdefault('run_stats', {'full_runs': 0, 'recomputes': 0, 'fragment_runs': 0})
+run_stats['full_runs'] += 1
+metrics.APP_RUNS.inc(kind='full')
+
+def counted_fragment(func, run_every=None):
+    """
+    st.fragment sarmalayıcısı: tam çalıştırmadaki ilk çağrıdan sonraki her çalışma
+    (bölüm içi etkileşim veya run_every yenilemesi) fragment_runs'a sayılır
+    """
+    calls = 0
+    
+    @functools.wraps(func)
+    def counted(*args, **kwargs):
+        nonlocal calls
+        if calls:
+            st.session_state['run_stats']['fragment_runs'] += 1
+            metrics.APP_RUNS.inc(kind='fragment')
+        calls += 1
+        return func(*args, **kwargs)
+    
+    return st.fragment(counted, run_every=run_every)
+
 # CSS
 st.markdown("""
     <style>
@@ -38,25 +107,59 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("📂 Veri Yükleme")
 uploaded_file = st.sidebar.file_uploader(
     "Excel Dosyası Yükle",
-    type=['xlsx'],
-    help="2024-2025 verilerini içeren Excel dosyası"
+    type=[extension.lstrip('.') for extension in SOURCE_FORMATS],
+    help="2024-2025 verilerini içeren Excel dosyası (ERP'den alınan CSV veya Parquet de olur)"
+)
+
+winsorize = st.sidebar.checkbox(
+    "Aykırı satışları mevsimsellikte kırp",
+    value=False,
+    key="winsorize",
+    help="Grup medyanından çok uzak aylık satışlar mevsimsellik hesaplanmadan önce sınıra çekilir "
+         "(winsorize). Trend, momentum ve tahmin bazı ham satışları kullanır."
 )
 
 # Veri yükleme
-@st.cache_data
-def load_data(file_path):
-    return BudgetForecaster(file_path)
+# Temizlenmiş veri dosya hash'i ile memory-mapped depoya bir kez yazılır; tüm oturumlar
+# ve süreçler aynı dosyayı kopyasız açar (kaynak sadece ilk yüklemede parse edilir).
+# Değiştirilemez ForecastSnapshot st.cache_resource ile tüm kullanıcılara aynı örnek
+# olarak paylaştırılır (kopyalama/pickle yok); senaryo cache'i (LRU) de ortaktır ve
+# oturum sayısına ve byte'a göre sınırlanır (bkz. SNAPSHOT_CACHE_SIZE / SNAPSHOT_CACHE_BYTES).
+# Tablolar Arrow-backed tutulur; st.dataframe ve Arrow indirmesi dönüşüm yapmaz.
+# Veri seti kaydolunca varsayılan senaryonun tahmini, tablo/figürleri ve dışa aktarma
+# dosyaları arka planda ön hesaplanır (bkz. warmup); ilk etkileşim cache'ten okunur.
+# Yükleme doğrulama raporu veri setiyle birlikte saklanır; winsorize yalnızca mevsimselliği
+# etkilediğinden aynı depo dosyası iki ayar için de kullanılır.
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_data(file_hash, _file_bytes, source_format='excel', winsorize=False):
+    store_path = dataset_path(file_hash)
+    
+    if not os.path.exists(store_path):
+        BudgetForecaster(
+            BytesIO(_file_bytes), dtype_backend='pyarrow', source_format=source_format
+        ).save_dataset(store_path)
+        # Eski sürüm ve boyut sınırını aşan (en uzun süredir açılmayan) depo dosyaları silinir
+        prune_store(keep=[store_path])
+    
+    forecaster = ForecastSnapshot.from_dataset(
+        store_path, cache_size=SNAPSHOT_CACHE_SIZE, cache_bytes=SNAPSHOT_CACHE_BYTES, winsorize=winsorize
+    )
+    start_warmup(forecaster, DEFAULT_SCENARIO)
+    return forecaster
 
 forecaster = None
 if uploaded_file is not None:
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_path = tmp_file.name
+    file_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
     
     with st.spinner('Veri yükleniyor...'):
-        forecaster = load_data(tmp_path)
-    
-    os.unlink(tmp_path)
+        try:
+            forecaster = load_data(file_hash, file_bytes, detect_format(uploaded_file.name), winsorize)
+        except ImportError as e:
+            # Eski .xls dosyaları xlrd ile okunur (requirements.txt); ortamda kurulu değilse
+            # uygulama çökmek yerine kullanıcıya söylenir
+            st.error(f"Dosya okunamadı: {e}\n\nDosyayı .xlsx olarak kaydedip tekrar yükleyebilirsiniz.")
+            st.stop()
 
 # Eğer dosya yüklenmemişse bilgi göster ve dur
 if forecaster is None:
@@ -70,12 +173,24 @@ if forecaster is None:
     """)
     st.stop()
 
+# Yükleme doğrulama raporu (bkz. validation): hata seviyesinde sorun varsa bölüm açık gelir
+issues = forecaster.issues
+if len(issues):
+    error_rows = int(issues.loc[issues['Önem'] == 'hata', 'Satır'].sum())
+    with st.expander(f"🔎 Veri Kontrolü: {len(issues)} sorun türü, {int(issues['Satır'].sum())} satır",
+                     expanded=error_rows > 0):
+        if error_rows:
+            st.warning(f"⚠️ {error_rows} satırda hatalı veri var; bu satırlar tahmine olduğu gibi girer. "
+                       "Kaynak dosyayı düzeltip yeniden yüklemeniz önerilir.")
+        st.dataframe(issues.drop(columns='Kod'), use_container_width=True, hide_index=True)
+
 # Dosya yüklendiyse parametreleri göster
+# Hedef türleri (hangi girişlerin gösterileceği) anında uygulanır; hedef değerleri ise
+# formda toplanır ve yalnızca "Uygula" ile gönderilir - 12 ay slider'ını ayarlarken
+# her tıkta tahmin, özet ve tüm tablar yeniden hesaplanmaz
 st.sidebar.markdown("---")
-st.sidebar.subheader("💰 Büyüme Hedefi")
+st.sidebar.subheader("🎛️ Hedef Türleri")
 
-# 2. AY BAZINDA HEDEF
-st.sidebar.markdown("### 📅 Ay Bazında Hedef")
 monthly_input_type = st.sidebar.radio(
     "Ay Hedefi",
     ["Tüm Aylar İçin Tek Hedef", "Her Ay Ayrı Hedef"],
@@ -83,49 +198,6 @@ monthly_input_type = st.sidebar.radio(
     key="monthly_type"
 )
 
-monthly_growth_targets = {}
-
-if monthly_input_type == "Tüm Aylar İçin Tek Hedef":
-    monthly_default = st.sidebar.slider(
-        "Tüm Aylar İçin Büyüme Hedefi (%)",
-        min_value=-20.0,
-        max_value=50.0,
-        value=15.0,
-        step=1.0,
-        key="monthly_default"
-    ) / 100
-    
-    for month in range(1, 13):
-        monthly_growth_targets[month] = monthly_default
-else:
-    st.sidebar.caption("↓ Aşağı kaydırarak tüm ayları görebilirsiniz")
-    
-    month_names = {
-        1: "Ocak", 2: "Şubat", 3: "Mart", 4: "Nisan",
-        5: "Mayıs", 6: "Haziran", 7: "Temmuz", 8: "Ağustos",
-        9: "Eylül", 10: "Ekim", 11: "Kasım", 12: "Aralık"
-    }
-    
-    for month in range(1, 13):
-        monthly_growth_targets[month] = st.sidebar.slider(
-            f"{month_names[month]} ({month})",
-            min_value=-20.0,
-            max_value=50.0,
-            value=15.0,
-            step=1.0,
-            key=f"month_{month}"
-        ) / 100
-    
-    avg_monthly = sum(monthly_growth_targets.values()) / 12
-    st.sidebar.info(f"📊 Ort. Aylık: %{avg_monthly*100:.1f}")
-
-# 3. ANA GRUP BAZINDA HEDEF
-st.sidebar.markdown("---")
-st.sidebar.markdown("### 🏪 Ana Grup Bazında Hedef")
-
-# Ana grupları al (cache yok, her seferinde hesaplansın - hızlı zaten)
-main_groups = sorted(forecaster.data['MainGroup'].unique().tolist())
-
 maingroup_input_type = st.sidebar.radio(
     "Ana Grup Hedefi",
     ["Tüm Gruplar İçin Tek Hedef", "Her Grup Ayrı Hedef"],
@@ -133,105 +205,297 @@ maingroup_input_type = st.sidebar.radio(
     key="maingroup_type"
 )
 
-maingroup_growth_targets = {}
+stock_param_type = st.sidebar.radio(
+    "Stok Parametresi",
+    ["Stok/SMM Oranı", "Stok Tutar Değişimi", "İşletme Sermayesi Limiti"],
+    index=0,
+    help="Stok hedefini oran, tutar veya toplam stok bütçesi bazında belirle"
+)
 
-if maingroup_input_type == "Tüm Gruplar İçin Tek Hedef":
-    maingroup_default = st.sidebar.slider(
-        "Tüm Gruplar İçin Büyüme Hedefi (%)",
-        min_value=-20.0,
-        max_value=50.0,
-        value=15.0,
-        step=1.0,
-        key="maingroup_default"
-    ) / 100
+forecast_horizon = st.sidebar.radio(
+    "Tahmin Ufku",
+    [1, 2, 3],
+    index=0,
+    format_func=lambda h: f"{h} yıl",
+    horizontal=True,
+    key="forecast_horizon",
+    help=f"{FORECAST_YEAR} ve sonraki yıllar tek geçişte tahmin edilir; sonraki yılların hedefleri ayrıca girilir"
+)
+later_years = [FORECAST_YEAR + k for k in range(1, forecast_horizon)]
+
+# Ana grupları al (cache yok, her seferinde hesaplansın - hızlı zaten)
+main_groups = sorted(forecaster.data['MainGroup'].unique().tolist())
+
+# Grup hedefleri dosyası formun dışında: yüklenince tablo dosyadaki değerlerle açılır
+targets_table = pd.DataFrame({TARGET_GROUP_COLUMN: main_groups, TARGET_VALUE_COLUMN: DEFAULT_GROWTH_PCT})
+target_file_hash = ''
+if maingroup_input_type == "Her Grup Ayrı Hedef":
+    target_file = st.sidebar.file_uploader(
+        "Hedef Dosyası (opsiyonel)",
+        type=['csv', 'xlsx', 'xls'],
+        help=f"'{TARGET_GROUP_COLUMN}' ve '{TARGET_VALUE_COLUMN}' kolonları olan CSV/Excel (15 = %15)",
+        key="group_target_file"
+    )
+    
+    if target_file is not None:
+        target_bytes = target_file.getvalue()
+        target_file_hash = hashlib.sha256(target_bytes).hexdigest()[:16]
+        try:
+            uploaded_targets = read_targets(BytesIO(target_bytes), detect_format(target_file.name))
+        except ValueError as e:
+            st.sidebar.error(f"❌ {e}")
+        else:
+            matched = uploaded_targets.reindex(main_groups)
+            targets_table[TARGET_VALUE_COLUMN] = (matched * 100).fillna(DEFAULT_GROWTH_PCT).to_numpy()
+            unknown = len(uploaded_targets) - int(matched.notna().sum())
+            st.sidebar.caption(f"📄 {int(matched.notna().sum())} grup hedefi yüklendi"
+                               + (f", {unknown} bilinmeyen grup atlandı" if unknown else ""))
+
+with st.sidebar.form("scenario_form", border=False):
+    st.markdown("---")
+    st.subheader("💰 Büyüme Hedefi")
     
-    for group in main_groups:
-        maingroup_growth_targets[group] = maingroup_default
-else:
-    st.sidebar.caption("↓ Aşağı kaydırarak tüm grupları görebilirsiniz")
+    # 2. AY BAZINDA HEDEF
+    st.markdown("### 📅 Ay Bazında Hedef")
     
-    for group in main_groups:
-        maingroup_growth_targets[group] = st.sidebar.slider(
-            f"{group}",
+    monthly_growth_targets = {}
+    
+    if monthly_input_type == "Tüm Aylar İçin Tek Hedef":
+        monthly_default = st.slider(
+            "Tüm Aylar İçin Büyüme Hedefi (%)",
             min_value=-20.0,
             max_value=50.0,
-            value=15.0,
+            value=DEFAULT_GROWTH_PCT,
             step=1.0,
-            key=f"group_{group}"
+            key="monthly_default"
         ) / 100
+        
+        for month in range(1, 13):
+            monthly_growth_targets[month] = monthly_default
+    else:
+        st.caption("↓ Aşağı kaydırarak tüm ayları görebilirsiniz")
+        
+        month_names = {
+            1: "Ocak", 2: "Şubat", 3: "Mart", 4: "Nisan",
+            5: "Mayıs", 6: "Haziran", 7: "Temmuz", 8: "Ağustos",
+            9: "Eylül", 10: "Ekim", 11: "Kasım", 12: "Aralık"
+        }
+        
+        for month in range(1, 13):
+            monthly_growth_targets[month] = st.slider(
+                f"{month_names[month]} ({month})",
+                min_value=-20.0,
+                max_value=50.0,
+                value=DEFAULT_GROWTH_PCT,
+                step=1.0,
+                key=f"month_{month}"
+            ) / 100
+        
+        avg_monthly = sum(monthly_growth_targets.values()) / 12
+        st.info(f"📊 Ort. Aylık: %{avg_monthly*100:.1f}")
     
-    avg_maingroup = sum(maingroup_growth_targets.values()) / len(maingroup_growth_targets)
-    st.sidebar.info(f"📊 Ort. Ana Grup: %{avg_maingroup*100:.1f}")
-
-growth_param = sum(monthly_growth_targets.values()) / 12
-
-# 4. KARLILIK HEDEFİ
-st.sidebar.markdown("---")
-st.sidebar.subheader("📈 Karlılık Hedefi")
-margin_improvement = st.sidebar.slider(
-    "Brüt Marj İyileşme Hedefi (puan)",
-    min_value=-5.0,
-    max_value=10.0,
-    value=2.0,
-    step=0.5,
-    help="Mevcut brüt marj üzerine eklenecek puan"
-) / 100
-
-# 5. STOK HEDEFİ
-st.sidebar.markdown("---")
-st.sidebar.subheader("📦 Stok Hedefi")
+    # 3. ANA GRUP BAZINDA HEDEF
+    st.markdown("---")
+    st.markdown("### 🏪 Ana Grup Bazında Hedef")
+    
+    if maingroup_input_type == "Tüm Gruplar İçin Tek Hedef":
+        maingroup_default = st.slider(
+            "Tüm Gruplar İçin Büyüme Hedefi (%)",
+            min_value=-20.0,
+            max_value=50.0,
+            value=DEFAULT_GROWTH_PCT,
+            step=1.0,
+            key="maingroup_default"
+        ) / 100
+        
+        maingroup_growth_targets = pd.Series(maingroup_default, index=main_groups)
+    else:
+        # Yüzlerce grupta slider yerine tek düzenlenebilir tablo + dosyadan yükleme;
+        # hedefler forecaster'a pd.Series olarak geçer (dict'e çevrilmez).
+        # Yeni dosya yüklenince tablo dosyadaki değerlerden yeniden başlar
+        edited_targets = st.data_editor(
+            targets_table,
+            key=f"group_targets_{target_file_hash}",
+            hide_index=True,
+            disabled=[TARGET_GROUP_COLUMN],
+            column_config={
+                TARGET_VALUE_COLUMN: st.column_config.NumberColumn(
+                    min_value=-20.0, max_value=50.0, step=1.0, format="%.1f"
+                )
+            },
+            use_container_width=True
+        )
+        
+        # Boş bırakılan hücreler genel hedefi izler (forecaster eksik hedefi growth_param alır)
+        maingroup_growth_targets = pd.Series(
+            edited_targets[TARGET_VALUE_COLUMN].to_numpy(dtype=float) / 100,
+            index=edited_targets[TARGET_GROUP_COLUMN].to_numpy()
+        )
+        
+        avg_maingroup = np.nanmean(maingroup_growth_targets.to_numpy()) if maingroup_growth_targets.notna().any() else 0.0
+        st.info(f"📊 Ort. Ana Grup: %{avg_maingroup*100:.1f}")
+    
+    growth_param = sum(monthly_growth_targets.values()) / 12
+    
+    # 4. KARLILIK HEDEFİ
+    st.markdown("---")
+    st.subheader("📈 Karlılık Hedefi")
+    margin_improvement = st.slider(
+        "Brüt Marj İyileşme Hedefi (puan)",
+        min_value=-5.0,
+        max_value=10.0,
+        value=DEFAULT_MARGIN_POINTS,
+        step=0.5,
+        help="Mevcut brüt marj üzerine eklenecek puan"
+    ) / 100
+    
+    # 5. STOK HEDEFİ
+    st.markdown("---")
+    st.subheader("📦 Stok Hedefi")
+    
+    stock_budget = None
+    
+    if stock_param_type == "Stok/SMM Oranı":
+        stock_ratio_target = st.slider(
+            "Hedef Stok/SMM Oranı",
+            min_value=0.3,
+            max_value=2.0,
+            value=DEFAULT_STOCK_RATIO,
+            step=0.1,
+            help="Stok tutarı / Satılan Malın Maliyeti oranı"
+        )
+        stock_change_pct = None
+    elif stock_param_type == "Stok Tutar Değişimi":
+        stock_change_pct = st.slider(
+            "Stok Tutar Değişimi (%)",
+            min_value=-50.0,
+            max_value=100.0,
+            value=0.0,
+            step=5.0,
+            help="2025'e göre stok tutarında % artış veya azalış"
+        ) / 100
+        stock_ratio_target = None
+    else:
+        # Toplam stok bütçesi gruplara/aylara tarihsel Stok/SMM oranlarından en az sapmayla dağıtılır
+        stock_2025 = forecaster.data.loc[forecaster.data['Year'] == 2025, 'Stock'].sum() / 12
+        budget_total = st.number_input(
+            "Aylık Ortalama Toplam Stok Bütçesi (₺)",
+            min_value=0.0,
+            value=float(round(stock_2025, -6)),
+            step=float(max(round(stock_2025 * 0.05, -6), 1e6)),
+            format="%.0f",
+            help=f"2026 boyunca tutulacak aylık ortalama toplam stok (2025 ortalaması: ₺{stock_2025:,.0f})"
+        )
+        min_weeks, max_weeks = st.slider(
+            "Haftalık Stok Kapsama Aralığı",
+            min_value=0.0,
+            max_value=52.0,
+            value=(1.0, 26.0),
+            step=0.5,
+            help="Her grup/ay için stok, kaç haftalık SMM'yi karşılamalı (alt - üst sınır)"
+        )
+        stock_budget = {'total': budget_total, 'min_weeks': min_weeks, 'max_weeks': max_weeks}
+        stock_ratio_target = None
+        stock_change_pct = None
+    
+    # 6. SONRAKİ YILLAR (çok yıllı ufuk): yıl başına genel büyüme, marj ve stok hedefi;
+    # ay/grup hedefleri yalnızca ilk yıl içindir, sonraki yıllar genel hedefi izler
+    if later_years:
+        st.markdown("---")
+        st.subheader("🗓️ Sonraki Yıllar")
+        
+        growth_param, margin_improvement = [growth_param], [margin_improvement]
+        stock_ratio_target, stock_change_pct = [stock_ratio_target], [stock_change_pct]
+        stock_budget = [stock_budget]
+        
+        for year in later_years:
+            st.markdown(f"**{year}**")
+            growth_param.append(st.slider(
+                f"{year} Büyüme Hedefi (%)",
+                min_value=-20.0,
+                max_value=50.0,
+                value=10.0,
+                step=1.0,
+                help=f"{year - 1}'e göre tüm ay ve gruplara uygulanacak büyüme"
+            ) / 100)
+            margin_improvement.append(st.slider(
+                f"{year} Brüt Marj İyileşme (puan)",
+                min_value=-5.0,
+                max_value=10.0,
+                value=0.0,
+                step=0.5,
+                help=f"{year - 1} marjı üzerine eklenecek puan"
+            ) / 100)
+            
+            if stock_param_type == "Stok/SMM Oranı":
+                stock_ratio_target.append(st.slider(
+                    f"{year} Hedef Stok/SMM Oranı", min_value=0.3, max_value=2.0, value=DEFAULT_STOCK_RATIO, step=0.1
+                ))
+                stock_change_pct.append(None)
+                stock_budget.append(None)
+            elif stock_param_type == "Stok Tutar Değişimi":
+                stock_change_pct.append(st.slider(
+                    f"{year} Stok Tutar Değişimi (%)", min_value=-50.0, max_value=100.0, value=0.0, step=5.0,
+                    help=f"{year - 1} stoğuna göre % artış veya azalış"
+                ) / 100)
+                stock_ratio_target.append(None)
+                stock_budget.append(None)
+            else:
+                stock_budget.append(dict(stock_budget[0], total=st.number_input(
+                    f"{year} Aylık Ortalama Stok Bütçesi (₺)",
+                    min_value=0.0,
+                    value=float(round(stock_2025, -6)),
+                    step=float(max(round(stock_2025 * 0.05, -6), 1e6)),
+                    format="%.0f"
+                )))
+                stock_ratio_target.append(None)
+                stock_change_pct.append(None)
+        
+        monthly_growth_targets = [monthly_growth_targets] + [None] * len(later_years)
+        maingroup_growth_targets = [maingroup_growth_targets] + [None] * len(later_years)
+    
+    st.form_submit_button("✅ Parametreleri Uygula", type="primary", use_container_width=True)
+
+# Grup hedefi şablonu (indirme butonu form içinde kullanılamaz)
+if maingroup_input_type == "Her Grup Ayrı Hedef":
+    st.sidebar.download_button(
+        "📥 Hedef Tablosunu İndir (CSV)",
+        data=edited_targets.to_csv(index=False).encode('utf-8-sig'),
+        file_name="ana_grup_hedefleri.csv",
+        mime="text/csv",
+        on_click="ignore"
+    )
 
-stock_param_type = st.sidebar.radio(
-    "Stok Parametresi",
-    ["Stok/SMM Oranı", "Stok Tutar Değişimi"],
-    index=0,
-    help="Stok hedefini oran veya tutar bazında belirle"
+# TAHMİN YAP
+# Senaryo parametreleri (tüm forecaster çağrılarında ortak)
+scenario = dict(
+    growth_param=growth_param,
+    margin_improvement=margin_improvement,
+    stock_ratio_target=stock_ratio_target,
+    stock_change_pct=stock_change_pct,
+    monthly_growth_targets=monthly_growth_targets,
+    maingroup_growth_targets=maingroup_growth_targets,
+    stock_budget=stock_budget,
+    horizon=forecast_horizon
 )
+last_year = FORECAST_YEAR + forecast_horizon - 1
+forecast_years = "-".join(str(year) for year in sorted({FORECAST_YEAR, last_year}))
 
-if stock_param_type == "Stok/SMM Oranı":
-    stock_ratio_target = st.sidebar.slider(
-        "Hedef Stok/SMM Oranı",
-        min_value=0.3,
-        max_value=2.0,
-        value=0.8,
-        step=0.1,
-        help="Stok tutarı / Satılan Malın Maliyeti oranı"
-    )
-    stock_change_pct = None
-else:
-    stock_change_pct = st.sidebar.slider(
-        "Stok Tutar Değişimi (%)",
-        min_value=-50.0,
-        max_value=100.0,
-        value=0.0,
-        step=5.0,
-        help="2025'e göre stok tutarında % artış veya azalış"
-    ) / 100
-    stock_ratio_target = None
+# Yeni senaryo (veya yeni veri) bu tam çalıştırmada hesaplanıyor
+applied_scenario = (file_hash, winsorize, forecaster.scenario_key(**scenario))
+if st.session_state.get('applied_scenario') != applied_scenario:
+    st.session_state['applied_scenario'] = applied_scenario
+    run_stats['recomputes'] += 1
+    metrics.APP_RUNS.inc(kind='recompute')
 
-# TAHMİN YAP
 with st.spinner('Tahmin hesaplanıyor...'):
-    # Stock parametresini belirle
-    if stock_change_pct is not None:
-        # Tutar bazlı değişim - forecaster'a direkt geç
-        full_data = forecaster.get_full_data_with_forecast(
-            growth_param=growth_param,
-            margin_improvement=margin_improvement,
-            stock_ratio_target=None,
-            stock_change_pct=stock_change_pct,
-            monthly_growth_targets=monthly_growth_targets,
-            maingroup_growth_targets=maingroup_growth_targets
-        )
-    else:
-        # Oran bazlı hedef - eski yöntem
-        full_data = forecaster.get_full_data_with_forecast(
-            growth_param=growth_param,
-            margin_improvement=margin_improvement,
-            stock_ratio_target=stock_ratio_target,
-            stock_change_pct=None,
-            monthly_growth_targets=monthly_growth_targets,
-            maingroup_growth_targets=maingroup_growth_targets
-        )
+    # stock_budget verildiyse bütçe dağıtımı, stock_change_pct verildiyse tutar bazlı
+    # değişim, yoksa oran bazlı hedef
+    try:
+        full_data = forecaster.get_full_data_with_forecast(**scenario)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        st.stop()
     
     summary = forecaster.get_summary_stats(full_data)
     quality_metrics = forecaster.get_forecast_quality_metrics(full_data)
@@ -276,8 +540,8 @@ with col3:
     )
 
 with col4:
-    if stock_change_pct is not None:
-        # Stok tutar değişimi göster
+    if stock_param_type != "Stok/SMM Oranı":
+        # Stok tutarı göster (tutar değişimi veya bütçe dağıtımı)
         stock_2026 = summary[2026]['Avg_Stock']
         stock_2025 = summary[2025]['Avg_Stock']
         stock_change = ((stock_2026 - stock_2025) / stock_2025 * 100) if stock_2025 > 0 else 0
@@ -393,134 +657,95 @@ with col4:
 st.markdown("---")
 
 # TABLAR
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Aylık Trend", "🎯 Ana Grup Analizi", "📅 Yıllık Karşılaştırma", "📋 Detay Veriler"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Aylık Trend", "🎯 Ana Grup Analizi", "📅 Yıllık Karşılaştırma", "📋 Detay Veriler", "🌪️ Duyarlılık"])
+
+# Grafik spec'leri senaryo başına cache'lenir (figürler charts.py'de)
+chart_specs = get_chart_specs(forecaster, scenario)
 
 with tab1:
-    st.subheader("Aylık Satış Trendi (2024-2026)")
-    
-    monthly_sales = full_data.groupby(['Year', 'Month'])['Sales'].sum().reset_index()
-    
-    fig = go.Figure()
+    st.subheader(f"Aylık Satış Trendi (2024-{last_year})")
     
-    for year in [2024, 2025, 2026]:
-        year_data = monthly_sales[monthly_sales['Year'] == year]
-        
-        line_style = 'solid' if year < 2026 else 'dash'
-        line_width = 2 if year < 2026 else 3
-        
-        fig.add_trace(go.Scatter(
-            x=year_data['Month'],
-            y=year_data['Sales'],
-            mode='lines+markers',
-            name=f'{year}' + (' (Tahmin)' if year == 2026 else ''),
-            line=dict(dash=line_style, width=line_width),
-            marker=dict(size=8)
-        ))
-    
-    fig.update_layout(
-        title="Aylık Satış Karşılaştırması",
-        xaxis_title="Ay",
-        yaxis_title="Satış (TRY)",
-        hovermode='x unified',
-        height=500
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(chart_specs['monthly_sales'], use_container_width=True)
     
     # Brüt Marj Trendi
     st.subheader("Aylık Brüt Marj % Trendi")
     
-    monthly_margin = full_data.groupby(['Year', 'Month']).apply(
-        lambda x: (x['GrossProfit'].sum() / x['Sales'].sum() * 100) if x['Sales'].sum() > 0 else 0
-    ).reset_index(name='Margin%')
+    st.plotly_chart(chart_specs['monthly_margin'], use_container_width=True)
+
+# Grup bazında güvenilirlik tablosu: metrikler veri başına bir kez hesaplanır, sıralama
+# ve filtre yalnızca bu bölümü (fragment) yeniden çalıştırır
+def group_quality_section():
+    group_quality = forecaster.get_group_quality_metrics()
     
-    fig2 = go.Figure()
+    sort_options = {
+        'Sales_2025': '2025 Satış',
+        'confidence_level': 'Güven Seviyesi',
+        'r2_score': 'R² (2024-2025 Uyum)',
+        'trend_consistency': 'Trend Tutarlılığı',
+        'mape': 'Tahmin Hatası (MAPE)',
+        'avg_growth_2024_2025': 'Ort. Büyüme'
+    }
+    col1, col2 = st.columns([1, 2])
     
-    for year in [2024, 2025, 2026]:
-        year_data = monthly_margin[monthly_margin['Year'] == year]
-        
-        line_style = 'solid' if year < 2026 else 'dash'
-        
-        fig2.add_trace(go.Scatter(
-            x=year_data['Month'],
-            y=year_data['Margin%'],
-            mode='lines+markers',
-            name=f'{year}' + (' (Tahmin)' if year == 2026 else ''),
-            line=dict(dash=line_style),
-            marker=dict(size=8)
-        ))
+    with col1:
+        sort_by = st.selectbox("Sırala", list(sort_options), format_func=sort_options.get)
+        ascending = st.toggle("Artan sıralama", value=sort_by == 'mape')
     
-    fig2.update_layout(
-        title="Aylık Brüt Marj % Karşılaştırması",
-        xaxis_title="Ay",
-        yaxis_title="Brüt Marj %",
-        hovermode='x unified',
-        height=500
-    )
+    with col2:
+        levels = st.multiselect("Güven Seviyesi", ['Yüksek', 'Orta', 'Düşük'], default=['Yüksek', 'Orta', 'Düşük'])
     
-    st.plotly_chart(fig2, use_container_width=True)
+    table = group_quality[group_quality['confidence_level'].isin(levels)]
+    if sort_by == 'confidence_level':
+        rank = table['confidence_level'].map({'Düşük': 0, 'Orta': 1, 'Yüksek': 2}).to_numpy(dtype=float)
+        table = table.iloc[np.lexsort((table['Sales_2025'].to_numpy(dtype=float), rank))[::1 if ascending else -1]]
+    else:
+        table = table.sort_values(sort_by, ascending=ascending, na_position='last')
+    
+    st.caption(f"{len(table)} / {len(group_quality)} ana grup · 3 aydan az ortak ayı olan gruplarda metrikler boş, güven 'Düşük'")
+    st.dataframe(
+        table,
+        use_container_width=True,
+        hide_index=True,
+        height=400,
+        column_order=['MainGroup', 'confidence_level', 'r2_score', 'trend_consistency', 'mape',
+                      'avg_growth_2024_2025', 'common_months', 'Sales_2025'],
+        column_config={
+            'MainGroup': 'Ana Grup',
+            'confidence_level': 'Güven',
+            'r2_score': st.column_config.NumberColumn('R²', format="%.2f"),
+            'trend_consistency': st.column_config.NumberColumn('Trend Tutarlılığı', format="%.2f"),
+            'mape': st.column_config.NumberColumn('MAPE %', format="%.1f"),
+            'avg_growth_2024_2025': st.column_config.NumberColumn('Ort. Büyüme %', format="%.1f"),
+            'common_months': st.column_config.NumberColumn('Ortak Ay', format="%d"),
+            'Sales_2025': st.column_config.NumberColumn('2025 Satış', format="localized")
+        }
+    )
 
 with tab2:
     st.subheader("Ana Grup Bazında Performans")
     
-    group_sales = full_data.groupby(['Year', 'MainGroup'])['Sales'].sum().reset_index()
-    
-    top_groups_2026 = group_sales[group_sales['Year'] == 2026].nlargest(10, 'Sales')['MainGroup'].tolist()
-    
-    group_sales_filtered = group_sales[group_sales['MainGroup'].isin(top_groups_2026)]
-    
-    fig3 = px.bar(
-        group_sales_filtered,
-        x='MainGroup',
-        y='Sales',
-        color='Year',
-        barmode='group',
-        title='Top 10 Ana Grup - Yıllık Satış Karşılaştırması'
-    )
-    
-    fig3.update_layout(height=500, xaxis_tickangle=-45)
-    st.plotly_chart(fig3, use_container_width=True)
+    st.plotly_chart(chart_specs['top_groups'], use_container_width=True)
     
     # Büyüme analizi
-    st.subheader("Ana Grup Büyüme Analizi (2025 → 2026)")
-    
-    sales_2025 = group_sales[group_sales['Year'] == 2025][['MainGroup', 'Sales']]
-    sales_2025.columns = ['MainGroup', 'Sales_2025']
-    
-    sales_2026_grp = group_sales[group_sales['Year'] == 2026][['MainGroup', 'Sales']]
-    sales_2026_grp.columns = ['MainGroup', 'Sales_2026']
-    
-    growth_analysis = sales_2025.merge(sales_2026_grp, on='MainGroup')
-    growth_analysis['Growth%'] = ((growth_analysis['Sales_2026'] - growth_analysis['Sales_2025']) / 
-                                   growth_analysis['Sales_2025'] * 100)
-    growth_analysis = growth_analysis.sort_values('Growth%', ascending=False)
-    
-    fig4 = px.bar(
-        growth_analysis.head(15),
-        x='MainGroup',
-        y='Growth%',
-        title='Top 15 Ana Grup - Büyüme Oranı',
-        color='Growth%',
-        color_continuous_scale='RdYlGn'
-    )
+    st.subheader(f"Ana Grup Büyüme Analizi ({last_year - 1} → {last_year})")
     
-    fig4.update_layout(height=500, xaxis_tickangle=-45)
-    st.plotly_chart(fig4, use_container_width=True)
+    st.plotly_chart(chart_specs['group_growth'], use_container_width=True)
+    
+    st.subheader("Ana Grup Tahmin Güvenilirliği (2024 → 2025)")
+    counted_fragment(group_quality_section)()
 
 with tab3:
     st.subheader("Yıllık Toplam Karşılaştırma")
     
     col1, col2 = st.columns(2)
     
+    years = sorted(summary)
+    
     with col1:
         yearly_summary = pd.DataFrame({
-            'Yıl': [2024, 2025, 2026],
-            'Satış': [summary[2024]['Total_Sales'], 
-                     summary[2025]['Total_Sales'],
-                     summary[2026]['Total_Sales']],
-            'Brüt Kar': [summary[2024]['Total_GrossProfit'],
-                        summary[2025]['Total_GrossProfit'],
-                        summary[2026]['Total_GrossProfit']]
+            'Yıl': years,
+            'Satış': [summary[year]['Total_Sales'] for year in years],
+            'Brüt Kar': [summary[year]['Total_GrossProfit'] for year in years]
         })
         
         fig5 = go.Figure()
@@ -537,10 +762,8 @@ with tab3:
     
     with col2:
         yearly_margin = pd.DataFrame({
-            'Yıl': [2024, 2025, 2026],
-            'Brüt Marj %': [summary[2024]['Avg_GrossMargin%'],
-                           summary[2025]['Avg_GrossMargin%'],
-                           summary[2026]['Avg_GrossMargin%']]
+            'Yıl': years,
+            'Brüt Marj %': [summary[year]['Avg_GrossMargin%'] for year in years]
         })
         
         fig6 = go.Figure()
@@ -565,140 +788,32 @@ with tab3:
     summary_table = pd.DataFrame({
         'Metrik': ['Toplam Satış (TRY)', 'Toplam Brüt Kar (TRY)', 
                   'Brüt Marj %', 'Ort. Stok (TRY)', 'Stok/SMM Oranı'],
-        '2024': [
-            f"₺{summary[2024]['Total_Sales']:,.0f}",
-            f"₺{summary[2024]['Total_GrossProfit']:,.0f}",
-            f"%{summary[2024]['Avg_GrossMargin%']:.2f}",
-            f"₺{summary[2024]['Avg_Stock']:,.0f}",
-            f"{summary[2024]['Avg_Stock_COGS_Ratio']:.2f}"
-        ],
-        '2025': [
-            f"₺{summary[2025]['Total_Sales']:,.0f}",
-            f"₺{summary[2025]['Total_GrossProfit']:,.0f}",
-            f"%{summary[2025]['Avg_GrossMargin%']:.2f}",
-            f"₺{summary[2025]['Avg_Stock']:,.0f}",
-            f"{summary[2025]['Avg_Stock_COGS_Ratio']:.2f}"
-        ],
-        '2026 (Tahmin)': [
-            f"₺{summary[2026]['Total_Sales']:,.0f}",
-            f"₺{summary[2026]['Total_GrossProfit']:,.0f}",
-            f"%{summary[2026]['Avg_GrossMargin%']:.2f}",
-            f"₺{summary[2026]['Avg_Stock']:,.0f}",
-            f"{summary[2026]['Avg_Stock_COGS_Ratio']:.2f}"
-        ]
+        **{
+            f"{year} (Tahmin)" if year >= FORECAST_YEAR else str(year): [
+                f"₺{summary[year]['Total_Sales']:,.0f}",
+                f"₺{summary[year]['Total_GrossProfit']:,.0f}",
+                f"%{summary[year]['Avg_GrossMargin%']:.2f}",
+                f"₺{summary[year]['Avg_Stock']:,.0f}",
+                f"{summary[year]['Avg_Stock_COGS_Ratio']:.2f}"
+            ]
+            for year in years
+        }
     })
     
     st.dataframe(summary_table, use_container_width=True, hide_index=True)
 
-with tab4:
-    st.subheader("Detaylı Veri Tablosu - Yan Yana Karşılaştırma")
-    
+# Tab içi etkileşimler (ay/format seçimi, duyarlılık metriği) fragment'tır: yalnızca kendi
+# bölümlerini yeniden çalıştırır, tahmin/özet/diğer tablar yeniden çizilmez
+def detail_section():
     # Ay seçimi
     selected_month = st.selectbox("Ay Seçin", list(range(1, 13)), format_func=lambda x: f"{x}. Ay")
     
-    # Her yıl için veri al
-    data_2024 = full_data[(full_data['Year'] == 2024) & (full_data['Month'] == selected_month)].copy()
-    data_2025 = full_data[(full_data['Year'] == 2025) & (full_data['Month'] == selected_month)].copy()
-    data_2026 = full_data[(full_data['Year'] == 2026) & (full_data['Month'] == selected_month)].copy()
-    
-    # Aylık gün sayıları
-    days_in_month = {1: 31, 2: 28, 3: 31, 4: 30, 5: 31, 6: 30,
-                     7: 31, 8: 31, 9: 30, 10: 31, 11: 30, 12: 31}
-    days = days_in_month[selected_month]
-    
-    # MainGroup bazında birleştir
-    comparison = data_2024[['MainGroup', 'Sales', 'GrossMargin%', 'Stock', 'COGS']].rename(
-        columns={
-            'Sales': 'Satış_2024',
-            'GrossMargin%': 'BM%_2024',
-            'Stock': 'Stok_2024',
-            'COGS': 'SMM_2024'
-        }
-    )
+    # Tüm aylar tek pivotta hazırlanır ve senaryo başına cache'lenir; ay seçimi sadece dilimdir
+    comparison = forecaster.select_month(forecaster.get_detail_comparison(**scenario), selected_month)
+    display_df = forecaster.select_month(forecaster.get_detail_comparison(**scenario, formatted=True), selected_month)
+    display_df = display_df.rename(columns={'MainGroup': 'Ana Grup'})
     
-    comparison = comparison.merge(
-        data_2025[['MainGroup', 'Sales', 'GrossMargin%', 'Stock', 'COGS']].rename(
-            columns={
-                'Sales': 'Satış_2025',
-                'GrossMargin%': 'BM%_2025',
-                'Stock': 'Stok_2025',
-                'COGS': 'SMM_2025'
-            }
-        ),
-        on='MainGroup',
-        how='outer'
-    )
-    
-    comparison = comparison.merge(
-        data_2026[['MainGroup', 'Sales', 'GrossMargin%', 'Stock', 'COGS']].rename(
-            columns={
-                'Sales': 'Satış_2026',
-                'GrossMargin%': 'BM%_2026',
-                'Stock': 'Stok_2026',
-                'COGS': 'SMM_2026'
-            }
-        ),
-        on='MainGroup',
-        how='outer'
-    )
-    
-    comparison = comparison.fillna(0)
-    
-    # Haftalık normalize - Stok/SMM Haftalık
-    comparison['Stok/SMM_Haftalık_2024'] = np.where(
-        comparison['SMM_2024'] > 0,
-        comparison['Stok_2024'] / ((comparison['SMM_2024'] / days) * 7),
-        0
-    )
-    comparison['Stok/SMM_Haftalık_2025'] = np.where(
-        comparison['SMM_2025'] > 0,
-        comparison['Stok_2025'] / ((comparison['SMM_2025'] / days) * 7),
-        0
-    )
-    comparison['Stok/SMM_Haftalık_2026'] = np.where(
-        comparison['SMM_2026'] > 0,
-        comparison['Stok_2026'] / ((comparison['SMM_2026'] / days) * 7),
-        0
-    )
-    
-    # Formatla - Gösterim için
-    display_df = comparison.copy()
-    
-    # Para formatı
-    for col in ['Satış_2024', 'Stok_2024', 'SMM_2024', 'Satış_2025', 'Stok_2025', 'SMM_2025', 
-                'Satış_2026', 'Stok_2026', 'SMM_2026']:
-        if col in display_df.columns:
-            display_df[col] = display_df[col].apply(lambda x: f"₺{x:,.0f}" if x > 0 else "-")
-    
-    # Yüzde formatı
-    for col in ['BM%_2024', 'BM%_2025', 'BM%_2026']:
-        if col in display_df.columns:
-            display_df[col] = display_df[col].apply(lambda x: f"%{x*100:.1f}" if x > 0 else "-")
-    
-    # Stok/SMM Haftalık formatı
-    for col in ['Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026']:
-        if col in display_df.columns:
-            display_df[col] = display_df[col].apply(lambda x: f"{x:.2f}" if x > 0 else "-")
-    
-    # Sütun sırası - Yan yana karşılaştırma
-    display_df = display_df[[
-        'MainGroup',
-        'Satış_2024', 'Satış_2025', 'Satış_2026',
-        'BM%_2024', 'BM%_2025', 'BM%_2026',
-        'Stok_2024', 'Stok_2025', 'Stok_2026',
-        'SMM_2024', 'SMM_2025', 'SMM_2026',
-        'Stok/SMM_Haftalık_2024', 'Stok/SMM_Haftalık_2025', 'Stok/SMM_Haftalık_2026'
-    ]]
-    
-    # Sütun isimlerini güzelleştir
-    display_df.columns = [
-        'Ana Grup',
-        'Satış 2024', 'Satış 2025', 'Satış 2026',
-        'BM% 2024', 'BM% 2025', 'BM% 2026',
-        'Stok 2024', 'Stok 2025', 'Stok 2026',
-        'SMM 2024', 'SMM 2025', 'SMM 2026',
-        'Stok/SMM Hft. 2024', 'Stok/SMM Hft. 2025', 'Stok/SMM Hft. 2026'
-    ]
+    days = DAYS_IN_MONTH[selected_month]
     
     st.info(f"📅 {selected_month}. Ay ({days} gün) - Stok/SMM haftalık: (Stok / (SMM/{days})*7)")
     
@@ -709,150 +824,133 @@ with tab4:
         height=600
     )
     
-    # Excel export - ham veri
-    st.download_button(
-        label="📥 CSV İndir (Sadece Bu Ay)",
-        data=comparison.to_csv(index=False).encode('utf-8'),
-        file_name=f'budget_comparison_month_{selected_month}.csv',
-        mime='text/csv'
-    )
+    # Ham veri indirme - CSV veya Arrow IPC
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.download_button(
+            label="📥 CSV İndir (Sadece Bu Ay)",
+            data=comparison.to_csv(index=False).encode('utf-8'),
+            file_name=f'budget_comparison_month_{selected_month}.csv',
+            mime='text/csv'
+        )
+    
+    with col2:
+        st.download_button(
+            label="📥 Arrow İndir (Sadece Bu Ay)",
+            data=to_arrow_ipc(comparison),
+            file_name=f'budget_comparison_month_{selected_month}.arrow',
+            mime='application/vnd.apache.arrow.file'
+        )
+
+def full_export_section():
+    export_labels = {'parquet': 'Parquet', 'csv.gz': 'CSV (gzip)', 'csv.zst': 'CSV (zstd)', 'arrow': 'Arrow IPC'}
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        export_format = st.selectbox("Format", list(EXPORT_FORMATS), format_func=export_labels.get)
+    
+    with col2:
+        extension, mime = EXPORT_FORMATS[export_format]
+        
+        # Dosya butona basılınca üretilir (rerun'larda hesaplanmaz) ve senaryo cache'inde tutulur;
+        # varsayılan senaryonun Parquet dosyası yükleme sonrası ön hesaplamada hazırlanır
+        st.download_button(
+            label=f"📥 Tam Veri İndir ({export_labels[export_format]})",
+            data=lambda: get_full_export(forecaster, scenario, export_format),
+            file_name=f'budget_full_data{extension}',
+            mime=mime,
+            on_click="ignore"
+        )
+
+def tornado_section():
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        tornado_labels = {'Sales': 'Satış', 'GrossProfit': 'Brüt Kar', 'Stock': 'Stok'}
+        tornado_metric = st.radio("Metrik", list(tornado_labels), format_func=tornado_labels.get, horizontal=True)
+    
+    with col2:
+        tornado_top_n = st.slider("Gösterilecek Parametre", min_value=5, max_value=40, value=15, step=5)
+    
+    st.plotly_chart(get_tornado_spec(forecaster, scenario, tornado_metric, tornado_top_n), use_container_width=True)
+
+with tab4:
+    st.subheader("Detaylı Veri Tablosu - Yan Yana Karşılaştırma")
+    counted_fragment(detail_section)()
+    
+    # Tam veri (tüm yıllar, ay × ana grup) - BI araçları için parça parça yazılan sıkıştırılmış dosya
+    st.markdown("---")
+    st.subheader(f"📦 Tam Veri İndir (2024 + 2025 + {forecast_years} Tahmin)")
+    counted_fragment(full_export_section)()
     
     # Tam Excel dosyası oluştur
     st.markdown("---")
     st.subheader("📊 Tam Bütçe Dosyası İndir")
-    st.caption("Orijinal Excel + 2025 Aralık Tahmini + 2026 Tahmini")
-    
-    if st.button("🔄 Excel Dosyası Oluştur (Tüm Veriler)", type="primary"):
-        with st.spinner("Excel dosyası hazırlanıyor..."):
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-            from openpyxl.utils.dataframe import dataframe_to_rows
-            from io import BytesIO
-            
-            # 2025 Aralık ayını tahmin et (basit: önceki ayların ortalaması)
-            data_2025_full = forecaster.data[forecaster.data['Year'] == 2025].copy()
-            
-            # Aralık için tahmin yap - Kasım verilerini kopyala ve hafif artır
-            november_data = data_2025_full[data_2025_full['Month'] == 11].copy()
-            december_estimate = november_data.copy()
-            december_estimate['Month'] = 12
-            # Mevsimsellik faktörü: Aralık genelde Kasım'dan %10-15 yüksek
-            december_estimate['Sales'] = december_estimate['Sales'] * 1.12
-            december_estimate['GrossProfit'] = december_estimate['GrossProfit'] * 1.12
-            december_estimate['COGS'] = december_estimate['COGS'] * 1.12
-            december_estimate['Stock'] = december_estimate['Stock'] * 1.05  # Stok hafif artış
-            
-            # 2025'e Aralık tahminini ekle
-            data_2025_complete = pd.concat([data_2025_full[data_2025_full['Month'] != 12], december_estimate], ignore_index=True)
-            data_2025_complete = data_2025_complete.sort_values(['Month', 'MainGroup'])
-            
-            # 2026 verisi
-            data_2026 = full_data[full_data['Year'] == 2026].copy()
-            
-            # Orijinal Excel'i yükle
-            from openpyxl import load_workbook
-            
-            # Yeni workbook oluştur
-            wb = openpyxl.Workbook()
-            wb.remove(wb.active)  # Default sheet'i sil
-            
-            # 2024 sheet'i (orijinal veri)
-            ws_2024 = wb.create_sheet("2024")
-            data_2024 = forecaster.data[forecaster.data['Year'] == 2024].copy()
-            
-            # 2025 sheet'i (tamamlanmış - Aralık tahmini ile)
-            ws_2025 = wb.create_sheet("2025")
-            
-            # 2026 sheet'i (tahmin)
-            ws_2026 = wb.create_sheet("2026_Tahmin")
-            
-            # Her sheet için veri hazırla ve yaz
-            for ws, data, year_name in [(ws_2024, data_2024, "2024"), 
-                                         (ws_2025, data_2025_complete, "2025"), 
-                                         (ws_2026, data_2026, "2026")]:
-                
-                # Veriyi formatla
-                excel_data = pd.DataFrame()
-                
-                for month in range(1, 13):
-                    month_data = data[data['Month'] == month].copy()
-                    
-                    if len(month_data) > 0:
-                        # Toplam satırı ekle
-                        total_row = pd.DataFrame({
-                            'Ay': [f'Toplam {month}'],
-                            'Ana Grup': [''],
-                            'Satış': [month_data['Sales'].sum()],
-                            'Brüt Kar': [month_data['GrossProfit'].sum()],
-                            'Brüt Marj %': [month_data['GrossProfit'].sum() / month_data['Sales'].sum() if month_data['Sales'].sum() > 0 else 0],
-                            'Stok': [month_data['Stock'].mean()],
-                            'SMM': [month_data['COGS'].sum()]
-                        })
-                        
-                        month_formatted = month_data[['Month', 'MainGroup', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS']].copy()
-                        month_formatted.columns = ['Ay', 'Ana Grup', 'Satış', 'Brüt Kar', 'Brüt Marj %', 'Stok', 'SMM']
-                        
-                        month_data_with_total = pd.concat([month_formatted, total_row], ignore_index=True)
-                        excel_data = pd.concat([excel_data, month_data_with_total], ignore_index=True)
-                
-                # DataFrame'i worksheet'e yaz
-                for r_idx, row in enumerate(dataframe_to_rows(excel_data, index=False, header=True), 1):
-                    for c_idx, value in enumerate(row, 1):
-                        cell = ws.cell(row=r_idx, column=c_idx, value=value)
-                        
-                        # Header formatı
-                        if r_idx == 1:
-                            cell.fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-                            cell.font = Font(color="FFFFFF", bold=True)
-                            cell.alignment = Alignment(horizontal='center')
-                        
-                        # Toplam satırları bold
-                        if isinstance(value, str) and value.startswith('Toplam'):
-                            cell.font = Font(bold=True)
-                            cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-                        
-                        # Number formatları
-                        if r_idx > 1:
-                            if c_idx in [3, 4, 6, 7]:  # Satış, Brüt Kar, Stok, SMM
-                                cell.number_format = '#,##0'
-                            elif c_idx == 5:  # Brüt Marj %
-                                cell.number_format = '0.00%'
-                
-                # Kolon genişlikleri
-                ws.column_dimensions['A'].width = 12
-                ws.column_dimensions['B'].width = 25
-                ws.column_dimensions['C'].width = 18
-                ws.column_dimensions['D'].width = 18
-                ws.column_dimensions['E'].width = 15
-                ws.column_dimensions['F'].width = 18
-                ws.column_dimensions['G'].width = 18
-                
-                # Başlık ekle
-                if year_name == "2025":
-                    ws.insert_rows(1)
-                    ws['A1'] = f'{year_name} (Aralık Tahmini İçerir)'
-                    ws['A1'].font = Font(size=14, bold=True, color="FF6B35")
-                    ws.merge_cells('A1:G1')
-                elif year_name == "2026":
-                    ws.insert_rows(1)
-                    ws['A1'] = f'{year_name} Tahmin'
-                    ws['A1'].font = Font(size=14, bold=True, color="1E88E5")
-                    ws.merge_cells('A1:G1')
-            
-            # Excel'e kaydet
-            output = BytesIO()
-            wb.save(output)
-            excel_data = output.getvalue()
-            
+    st.caption(f"Orijinal Excel + 2025 Aralık Tahmini + {forecast_years} Tahmini")
+    
+    # Excel arka plandaki thread havuzunda üretilir; script beklemez. İş sürerken yalnızca
+    # bu bölüm (fragment) yarım saniyede bir yenilenip ilerlemeyi gösterir. Biten dosya
+    # ayrı dosya deposunda tutulur (bkz. export_jobs): aynı senaryoda indirme butonu doğrudan görünür.
+    running_job = find_export(forecaster, scenario)
+    polling = running_job is not None and not running_job.done
+    
+    def export_section():
+        job = find_export(forecaster, scenario)
+        workbook = job.result if job is not None else None
+        
+        # İş bitti: takibi durdurmak için tam rerun (run_every kalkar)
+        if polling and job is not None and job.done:
+            st.rerun()
+        
+        if job is not None and not job.done:
+            st.progress(job.progress, text=f"Excel dosyası hazırlanıyor... {job.message}")
+            return
+        
+        if workbook is not None:
             st.download_button(
-                label="📥 Bütçe Dosyası İndir (3 Yıl - Excel)",
-                data=excel_data,
-                file_name="butce_2024_2025_2026_tam.xlsx",
+                label=f"📥 Bütçe Dosyası İndir ({len(summary)} Yıl - Excel)",
+                data=workbook,
+                file_name=f"butce_2024_2025_{forecast_years.replace('-', '_')}_tam.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                type="primary"
+                type="primary",
+                on_click="ignore"
             )
-            
-            st.success("✅ Excel dosyası hazır! (2024 + 2025 Tamamlanmış + 2026 Tahmin)")
+            st.success(f"✅ Excel dosyası hazır! (2024 + 2025 Tamamlanmış + {forecast_years} Tahmin)")
+            return
+        
+        if job is not None and job.status == 'failed':
+            st.error(f"Excel dosyası oluşturulamadı: {job.error}")
+        
+        if st.button("🔄 Excel Dosyası Oluştur (Tüm Veriler)", type="primary"):
+            submit_export(forecaster, scenario)
+            # Tam rerun: bölüm ilerleme takibiyle (run_every) yeniden kurulur
+            st.rerun()
+    
+    counted_fragment(export_section, run_every=0.5 if polling else None)()
+
+with tab5:
+    st.subheader("Parametre Duyarlılığı - 2026 Toplamlarına Etki")
+    st.caption("Her hedefin 1 puan (stok bütçesinde %1) değişmesinin 2026 toplamlarına etkisi. "
+               "Tahmin hedeflerde doğrusal olduğundan tüm parametreler tek geçişte hesaplanır.")
+    counted_fragment(tornado_section)()
+
+# Oturum sayaçları (fragment çalıştırmaları bir sonraki tam çalıştırmada güncellenir)
+st.sidebar.markdown("---")
+st.sidebar.caption(
+    f"🔁 Tam çalıştırma: {run_stats['full_runs']} · Yeniden hesaplama: {run_stats['recomputes']} · "
+    f"Bölüm yenileme: {run_stats['fragment_runs']}"
+)
+
+# Yükleme sonrası ön hesaplama durumu
+warmup = find_warmup(forecaster)
+if warmup is not None:
+    if warmup.status == 'done':
+        st.sidebar.caption(f"⚡ Varsayılan senaryo ön hesaplandı ({warmup.elapsed:.1f} sn)")
+    elif warmup.status == 'failed':
+        st.sidebar.caption(f"⚠️ Ön hesaplama tamamlanamadı: {warmup.error}")
+    else:
+        st.sidebar.caption(f"⏳ Varsayılan senaryo ön hesaplanıyor ({warmup.step or 'sırada'})")
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,258 @@
+"""
+Performans ölçüm betiği
+
+Sentetik bir çalışma kitabı üretir ve numpy / pyarrow dtype backend'leri için
+yükleme, tahmin, tablo dönüşümü ve indirme serileştirme sürelerini ölçer.
+--duckdb ile aynı veri Parquet'ten DuckDB backend'i ile, --polars ile Polars
+motoruyla (engine='polars') da işlenir; sonuçların pandas yolu ile aynı olduğu
+doğrulanır ve süreler yan yana yazılır. --metrics metrik kaydının ek yükünü
+(kayıt başına ns ve metrikler açık/kapalı tahmin süresi) ölçer.
+
+Kullanım:
+    python benchmark.py --groups 2000 --repeat 5 > bench_output.txt
+    python benchmark.py --groups 20000 --repeat 3 --duckdb --polars
+    python benchmark.py --groups 2000 --metrics
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from budget_forecast import BudgetForecaster, SUMMARY_YEARS
+from export import to_arrow_ipc
+from synthetic_data import write_csv, write_parquet, write_workbook
+
+SCENARIO = dict(
+    growth_param=0.15,
+    margin_improvement=0.02,
+    stock_ratio_target=0.8,
+    monthly_growth_targets={month: 0.15 for month in range(1, 13)},
+    maingroup_growth_targets=None,
+    stock_change_pct=None
+)
+
+
+def timeit(fn, repeat=5):
+    """fn'i repeat kez çalıştır, medyan süreyi ms olarak döndür"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def streamlit_table_conversion(df):
+    """st.dataframe'in yaptığı pandas → Arrow IPC dönüşümünü taklit et"""
+    import pyarrow as pa
+    
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def run_backend(path, dtype_backend, repeat):
+    """Tek backend için ölçümleri çalıştır"""
+    results = {}
+    
+    results['ingest_ms'] = timeit(lambda: BudgetForecaster(path, dtype_backend=dtype_backend), 1)
+    forecaster = BudgetForecaster(path, dtype_backend=dtype_backend)
+    
+    def cold_forecast():
+        forecaster.clear_cache()
+        forecaster.get_full_data_with_forecast(**SCENARIO)
+    
+    results['forecast_cold_ms'] = timeit(cold_forecast, repeat)
+    results['forecast_cached_ms'] = timeit(lambda: forecaster.get_full_data_with_forecast(**SCENARIO), repeat)
+    
+    full_data = forecaster.get_full_data_with_forecast(**SCENARIO)
+    display = forecaster.get_detail_comparison(**SCENARIO, formatted=True)
+    
+    results['summary_ms'] = timeit(lambda: forecaster.get_summary_stats(full_data), repeat)
+    results['st_table_full_data_ms'] = timeit(lambda: streamlit_table_conversion(full_data), repeat)
+    results['st_table_detail_ms'] = timeit(lambda: streamlit_table_conversion(display), repeat)
+    results['download_csv_ms'] = timeit(lambda: full_data.to_csv(index=False).encode('utf-8'), repeat)
+    results['download_arrow_ms'] = timeit(lambda: to_arrow_ipc(full_data), repeat)
+    results['data_mb'] = forecaster.data.memory_usage(deep=True).sum() / 1e6
+    results['full_data_mb'] = full_data.memory_usage(deep=True).sum() / 1e6
+    results['detail_display_mb'] = display.memory_usage(deep=True).sum() / 1e6
+    
+    return results
+
+
+def run_formats(tmp_dir, groups, repeat):
+    """Aynı sentetik verinin Excel / CSV / Parquet kaynaklarından yükleme süreleri"""
+    writers = {'xlsx': write_workbook, 'csv': write_csv, 'parquet': write_parquet}
+    results = {}
+    for extension, writer in writers.items():
+        path = writer(os.path.join(tmp_dir, f'ingest.{extension}'), groups)
+        results[extension] = timeit(lambda: BudgetForecaster(path), repeat)
+    return results
+
+
+def run_duckdb(tmp_dir, groups, repeat):
+    """Parquet kaynağında pandas yolu ile DuckDB backend'ini karşılaştır (eşitlik + süre)"""
+    from duckdb_backend import DuckDBAggregates
+    
+    path = write_parquet(os.path.join(tmp_dir, 'duckdb.parquet'), groups)
+    forecaster = BudgetForecaster(path)
+    aggregates = DuckDBAggregates(path)
+    
+    steps = {
+        'seasonality': (forecaster.calculate_seasonality, aggregates.calculate_seasonality),
+        'trend': (forecaster.calculate_trend, aggregates.calculate_trend),
+        'momentum': (forecaster.calculate_recent_momentum, aggregates.calculate_recent_momentum),
+        'summary': (lambda: forecaster.summarize_years(forecaster.data, SUMMARY_YEARS),
+                    lambda: aggregates.summarize_years(SUMMARY_YEARS))
+    }
+    
+    results = {'ingest': (timeit(lambda: BudgetForecaster(path), repeat),
+                          timeit(lambda: DuckDBAggregates(path).close(), repeat))}
+    for name, (pandas_step, duckdb_step) in steps.items():
+        expected, actual = pandas_step(), duckdb_step()
+        if name != 'summary':
+            expected = expected.reset_index(drop=True)
+        # Toplama sırası farklı olduğundan yalnızca kayan nokta yuvarlama farkına izin verilir
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False, rtol=1e-9)
+        
+        # pandas tarafı running tabloları cache'lediğinden ölçüm temizleme dahil yapılır
+        def pandas_cold():
+            forecaster._running = None
+            pandas_step()
+        
+        results[name] = (timeit(pandas_cold, repeat), timeit(duckdb_step, repeat))
+    
+    aggregates.close()
+    return results
+
+
+def run_polars(tmp_dir, groups, repeat):
+    """Parquet kaynağında pandas ve Polars motorlarının hattını karşılaştır (eşitlik + süre)"""
+    path = write_parquet(os.path.join(tmp_dir, 'polars.parquet'), groups)
+    forecasters = {engine: BudgetForecaster(path, engine=engine) for engine in ('pandas', 'polars')}
+    
+    def cold(forecaster, step):
+        # Ara sonuç cache'leri (running tablolar, bağlam, senaryolar) her ölçümde temizlenir
+        def run():
+            forecaster._running = None
+            forecaster._context = None
+            forecaster.clear_cache()
+            return step(forecaster)
+        return run
+    
+    steps = {
+        'seasonality': lambda f: f.calculate_seasonality(),
+        'trend': lambda f: f.calculate_trend(),
+        'momentum': lambda f: f.calculate_recent_momentum(),
+        'forecast_cold': lambda f: f.get_full_data_with_forecast(**SCENARIO),
+        'summary': lambda f: pd.DataFrame(f.get_summary_stats(f.data, years=None))
+    }
+    
+    results = {'ingest': tuple(timeit(lambda: BudgetForecaster(path, engine=engine), repeat)
+                               for engine in forecasters)}
+    for name, step in steps.items():
+        expected, actual = (cold(forecaster, step)() for forecaster in forecasters.values())
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True),
+                                      check_dtype=False, rtol=1e-9)
+        results[name] = tuple(timeit(cold(forecaster, step), repeat) for forecaster in forecasters.values())
+    
+    return results
+
+
+def run_metrics(path, repeat):
+    """Metrik kaydının ek yükü: kayıt başına maliyet ve metrikler açık/kapalı tahmin süreleri"""
+    import metrics
+    
+    calls = 100_000
+    counter = metrics.Counter('benchmark_total', "", ['kind'], registry=None)
+    histogram = metrics.Histogram('benchmark_seconds', "", ['kind'], registry=None)
+    
+    def per_call_ns(fn):
+        return timeit(lambda: [fn() for _ in range(calls)], repeat) * 1e6 / calls
+    
+    results = {
+        'counter_inc_ns': per_call_ns(lambda: counter.inc(kind='forecast')),
+        'histogram_observe_ns': per_call_ns(lambda: histogram.observe(0.01, kind='forecast'))
+    }
+    
+    forecaster = BudgetForecaster(path)
+    
+    def cold_forecast():
+        # Bağlam ve running tablolar da temizlenir; yoksa ilk ölçülen (açık) tur onları
+        # kurar, sonraki (kapalı) tur hazır bulur ve fark metriklere yazılır
+        forecaster._running = None
+        forecaster._context = None
+        forecaster.clear_cache()
+        forecaster.get_full_data_with_forecast(**SCENARIO)
+    
+    # Ölçülmeyen ısınma turu (ilk çağrıdaki lazy import'lar ve bellek ayırmaları)
+    cold_forecast()
+    
+    # Açık/kapalı farkı: cache isabeti (en sık yol) ve soğuk tahmin
+    for enabled in (True, False):
+        metrics.set_enabled(enabled)
+        suffix = 'on' if enabled else 'off'
+        results[f'forecast_cold_ms_{suffix}'] = timeit(cold_forecast, repeat)
+        results[f'forecast_cached_us_{suffix}'] = timeit(
+            lambda: [forecaster.get_full_data_with_forecast(**SCENARIO) for _ in range(1000)], repeat)
+    metrics.set_enabled(True)
+    
+    results['render_ms'] = timeit(metrics.render, repeat)
+    return results
+
+
+def print_comparison(title, results, engine):
+    print()
+    print(f"{title:<26}{'pandas':>12}{engine:>12}{'oran':>8}")
+    for step, (base, other) in results.items():
+        print(f"{step:<26}{base:>12.2f}{other:>12.2f}{other / base:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=1000, help='Sentetik ana grup sayısı')
+    parser.add_argument('--repeat', type=int, default=5, help='Ölçüm tekrar sayısı (medyan alınır)')
+    parser.add_argument('--workbook', help='Sentetik yerine kullanılacak Excel dosyası')
+    parser.add_argument('--duckdb', action='store_true', help='DuckDB backend karşılaştırmasını da çalıştır (duckdb gerekli)')
+    parser.add_argument('--polars', action='store_true', help="engine='polars' karşılaştırmasını da çalıştır (polars gerekli)")
+    parser.add_argument('--metrics', action='store_true', help='Metrik kaydının ek yükünü ölç')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.workbook or write_workbook(os.path.join(tmp_dir, 'benchmark.xlsx'), args.groups)
+        
+        results = {backend: run_backend(path, backend, args.repeat) for backend in ('numpy', 'pyarrow')}
+        ingest = run_formats(tmp_dir, args.groups, min(args.repeat, 3))
+        duckdb_results = run_duckdb(tmp_dir, args.groups, args.repeat) if args.duckdb else None
+        polars_results = run_polars(tmp_dir, args.groups, args.repeat) if args.polars else None
+        metrics_results = run_metrics(path, args.repeat) if args.metrics else None
+    
+    print(f"{'metrik':<26}{'numpy':>12}{'pyarrow':>12}{'oran':>8}")
+    for metric in results['numpy']:
+        base, arrow = results['numpy'][metric], results['pyarrow'][metric]
+        ratio = arrow / base if base else float('nan')
+        print(f"{metric:<26}{base:>12.2f}{arrow:>12.2f}{ratio:>8.2f}")
+    
+    print()
+    print(f"{'kaynak formatı':<26}{'yükleme ms':>12}{'oran':>8}")
+    for extension, ms in ingest.items():
+        print(f"{extension:<26}{ms:>12.2f}{ms / ingest['xlsx']:>8.2f}")
+    
+    if duckdb_results is not None:
+        print_comparison('parquet adımı (eşit)', duckdb_results, 'duckdb')
+    if polars_results is not None:
+        print_comparison('motor adımı (eşit)', polars_results, 'polars')
+    if metrics_results is not None:
+        print()
+        print(f"{'metrik ek yükü':<26}{'değer':>12}")
+        for name, value in metrics_results.items():
+            print(f"{name:<26}{value:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
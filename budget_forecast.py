@@ -1,51 +1,244 @@
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
+from collections import OrderedDict
+import threading
+import time
+import weakref
+import metrics
+from data_sources import DEFAULT_SCHEMA, SCHEMA_METRICS, detect_format, read_source, validate_schema
+from stock_optimizer import allocate_stock, budget_range, cover_ratio_bounds
+from validation import screen_data, winsorize_sales
 import warnings
 warnings.filterwarnings('ignore')
 
+# Aylık gün sayıları
+DAYS_IN_MONTH = {1: 31, 2: 28, 3: 31, 4: 30, 5: 31, 6: 30,
+                 7: 31, 8: 31, 9: 30, 10: 31, 11: 30, 12: 31}
+_MONTHS = np.arange(1, 13, dtype=float)
+_DAYS_BY_MONTH = np.array([np.nan] + [DAYS_IN_MONTH[month] for month in range(1, 13)])
+
+# Detay tablo metrikleri: (kaynak kolon, tablo öneki)
+DETAIL_METRICS = [
+    ('Sales', 'Satış'),
+    ('GrossMargin%', 'BM%'),
+    ('Stock', 'Stok'),
+    ('COGS', 'SMM'),
+]
+
+# Gerçekleşme verisinin tutulduğu yıllar (2026 tahmin yılıdır)
+HISTORY_YEARS = (2024, 2025)
+
+# Tahminin ilk yılı (çok yıllı ufukta sonraki yıllar bunu ardışık izler)
+FORECAST_YEAR = HISTORY_YEARS[-1] + 1
+
+# Özet metriklerde her zaman bulunan yıllar (arayüz bu anahtarları okur)
+SUMMARY_YEARS = HISTORY_YEARS + (FORECAST_YEAR,)
+
+# Yıl başına verilebilen senaryo parametreleri (bkz. BudgetForecaster.year_params)
+SCENARIO_PARAMS = ('growth_param', 'margin_improvement', 'stock_ratio_target', 'monthly_growth_targets',
+                   'maingroup_growth_targets', 'stock_change_pct', 'stock_budget')
+
+# Momentum için son aylar (2025)
+RECENT_MONTHS = (10, 11, 12)
+
+# append_actuals için zorunlu kolonlar
+ACTUALS_COLUMNS = ['Year', 'Month', 'MainGroup', 'Sales', 'GrossProfit', 'Stock']
+
+# Hesaplama motorları: pandas (varsayılan) veya Polars lazy sorguları (bkz. polars_engine)
+ENGINES = ('pandas', 'polars')
+
+# Duyarlılık analizinde parametre adımı (oran parametreleri için 1 puan; stok bütçesi için %1)
+SENSITIVITY_STEP = 0.01
+
+# Bellekteki forecaster'lar (metrik gauge'ları okunurken sayılır; silinen örnek düşer)
+_FORECASTERS = weakref.WeakSet()
+
+
+def _read_only_frame(df):
+    """Kolonları salt okunur dizilerle kopyalayıp cache'e uygun DataFrame üret"""
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, np.dtype):
+            values = series.to_numpy(copy=True)
+            values.flags.writeable = False
+        else:
+            values = series.array.copy()
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _result_bytes(value):
+    """Cache kaydının yaklaşık boyutu (byte): tablolar memory_usage, dosyalar len, spec'lerde dizi toplamı"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_result_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_result_bytes(item) for item in value)
+    return 0
+
+
+def _to_arrow_backed(df):
+    """DataFrame kolonlarını pyarrow dtype'larına çevir (sayısal tipler korunur)"""
+    import pyarrow as pa
+    
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.ArrowDtype):
+            continue
+        if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+            dtypes[col] = pd.ArrowDtype(pa.from_numpy_dtype(dtype))
+        else:
+            dtypes[col] = pd.ArrowDtype(pa.string())
+    
+    return df.astype(dtypes) if dtypes else df
+
+
 class BudgetForecaster:
-    def __init__(self, excel_path):
-        """Excel'den veriyi yükle ve temizle"""
-        # Raw olarak oku, header belirtme
-        df_raw = pd.read_excel(excel_path, sheet_name='Sayfa1', header=None)
+    def __init__(self, source=None, cache_size=32, dtype_backend='numpy', data=None, schema=None, source_format=None, engine='pandas', winsorize=False, issues=None, cache_bytes=None):
+        """
+        Kaynak dosyadan (Excel, CSV veya Parquet) veriyi yükle ve temizle
+        
+        schema: kaynak kolon → Sales/GrossProfit/GrossMargin%/Stock yıl eşlemesi
+        (varsayılan: mevcut Excel düzeni, bkz. data_sources.DEFAULT_SCHEMA)
+        source_format: 'excel', 'csv' veya 'parquet'; None ise dosya uzantısından bulunur
+        dtype_backend='pyarrow' ise self.data ve cache'lenen tüm sonuç tabloları
+        Arrow-backed tutulur (Streamlit tablolarında ve Arrow indirmelerinde dönüşüm gerekmez)
+        data verilirse kaynak okunmaz; önceden temizlenmiş veri olduğu gibi kullanılır
+        (bkz. from_dataset)
+        engine='polars' ise okuma, temizlik, Aralık tahmini, mevsimsellik/trend/momentum,
+        tahmin bağlamı ve özetler Polars lazy sorgularıyla çalışır (bkz. polars_engine);
+        sonuçlar yine pandas DataFrame'dir
+        winsorize=True ise mevsimsellik, grup içi aykırı satışlar kırpılarak hesaplanır
+        (bkz. validation.winsorize_sales); trend, momentum ve tahmin bazı ham satışları kullanır
+        Yükleme doğrulama raporu self.issues'tadır (bkz. validation.screen_data); issues
+        verilmezse kaynaktan okurken tam, data ile oluştururken temiz veri üzerinden üretilir
+        Senaryo cache'i en çok cache_size kayıt, cache_bytes verilirse ayrıca en çok bu kadar
+        byte (tablo ve dosya boyutları) tutar; sınır aşılınca en eski kullanılan kayıt düşer
+        """
+        if dtype_backend not in ('numpy', 'pyarrow'):
+            raise ValueError(f"dtype_backend 'numpy' veya 'pyarrow' olmalı: {dtype_backend}")
+        if engine not in ENGINES:
+            raise ValueError(f"engine {' veya '.join(repr(name) for name in ENGINES)} olmalı: {engine}")
+        self.dtype_backend = dtype_backend
+        self.engine = engine
+        self.winsorize = winsorize
+        
+        # Senaryo sonuç cache'i (LRU)
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+        self._scenario_cache = OrderedDict()
+        self._cache_sizes = {}
+        self._cache_lock = threading.Lock()
+        self._pending = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._context = None
+        
+        # Veri sürümü (append_actuals ile artar) ve satış toplam/adet tabloları
+        self._data_version = 0
+        self._running = None
+        self._polars = None
+        
+        self.schema = validate_schema(schema) if schema is not None else DEFAULT_SCHEMA
+        
+        # Temizlenmiş veri hazırsa (depo/snapshot) kaynağı atla
+        if data is not None:
+            self.df = None
+            self.data = data
+            self.issues = issues if issues is not None else screen_data(self.data)
+        else:
+            self._load(source, source_format)
         
-        # Header 1. satır (index 1)
-        self.df = pd.read_excel(excel_path, sheet_name='Sayfa1', header=1)
+        _FORECASTERS.add(self)
+    
+    def _load(self, source, source_format):
+        """Kaynağı oku ve temizle (süre ve satır sayısı format başına metriklere yazılır)"""
+        source_format = source_format or detect_format(source)
+        start = time.perf_counter()
+        
+        # Polars motoru: okuma + temizlik + Aralık tahmini tek sorguda (ham tablo tutulmaz)
+        if self.engine == 'polars':
+            from polars_engine import load_data
+            
+            self.df = None
+            frame = load_data(source, self.schema, source_format)
+            self.data = self._from_polars(frame.to_pandas())
+            self._polars = (self._data_version, frame)
+            
+            # Polars temizliği tek sorguda yapıldığından yalnızca temiz veri taranır
+            self.issues = screen_data(self.data)
+        else:
+            # Yalnızca şemadaki kolonları oku
+            self.df = read_source(source, self.schema, source_format)
+            self.process_data()
         
-        self.process_data()
+        metrics.INGEST_SECONDS.observe(time.perf_counter() - start, source=source_format)
+        metrics.INGEST_ROWS.inc(len(self.data), source=source_format)
+    
+    def _from_polars(self, df):
+        """Polars sonucundan gelen pandas tablosunu seçili dtype backend'ine getir"""
+        return _to_arrow_backed(df) if self.dtype_backend == 'pyarrow' else df
+    
+    def _polars_frame(self):
+        """self.data'nın Polars karşılığı (engine='polars'; veri sürümü başına bir kez üretilir)"""
+        cached = self._polars
+        if cached is None or cached[0] != self._data_version:
+            import polars as pl
+            
+            cached = self._polars = (self._data_version, pl.from_pandas(self.data))
+        return cached[1]
+    
+    @classmethod
+    def from_dataset(cls, path, cache_size=32, engine='pandas', winsorize=False, cache_bytes=None):
+        """
+        save_dataset ile yazılmış memory-mapped veri setinden forecaster oluştur
+        
+        Veri kopyalanmaz; aynı dosyayı açan tüm oturum ve süreçler page cache'teki
+        tek kopyayı paylaşır. Tablolar Arrow-backed olduğundan backend 'pyarrow' olur.
+        Kaynağın doğrulama raporu dosyadan okunur.
+        """
+        from dataset_store import open_dataset, read_issues
         
+        with metrics.INGEST_SECONDS.time(source='dataset'):
+            forecaster = cls(cache_size=cache_size, dtype_backend='pyarrow', data=open_dataset(path), engine=engine,
+                             winsorize=winsorize, issues=read_issues(path), cache_bytes=cache_bytes)
+        metrics.INGEST_ROWS.inc(len(forecaster.data), source='dataset')
+        return forecaster
+    
+    def snapshot(self):
+        """Mevcut veriden değiştirilemez, oturumlar arası paylaşılabilir ForecastSnapshot üret"""
+        return ForecastSnapshot(cache_size=self.cache_size, dtype_backend=self.dtype_backend, data=self.data,
+                                schema=self.schema, engine=self.engine, winsorize=self.winsorize, issues=self.issues,
+                                cache_bytes=self.cache_bytes)
+    
+    def save_dataset(self, path):
+        """Temizlenmiş self.data'yı (doğrulama raporuyla) memory-map ile açılabilir Arrow IPC dosyasına yaz"""
+        from dataset_store import write_dataset
+        
+        return write_dataset(self.data, path, issues=self.issues)
+    
     def process_data(self):
-        """Veriyi yıl bazında ayrıştır ve temizle"""
-        
-        # 2024 verileri - DOĞRU KOLONLAR
-        # J (TY Sales Value TRY2) = Gerçek satış değeri
-        # H (TY Gross Profit TRY2) = Brüt kar
-        # K (TY Gross Marjin TRY%) = Brüt marj %
-        # I (TY Avg Store Stock Cost TRY2) = Stok
-        df_2024 = self.df[['Month', 'MainGroupDesc', 
-                           'TY Sales Value TRY2',          # Kolon J - Gerçek satış
-                           'TY Gross Profit TRY2',         # Kolon H - Brüt kar  
-                           'TY Gross Marjin TRY%',         # Kolon K - Brüt marj %
-                           'TY Avg Store Stock Cost TRY2']].copy()  # Kolon I - Stok
-        df_2024.columns = ['Month', 'MainGroup', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock']
-        df_2024['Year'] = 2024
-        
-        # 2025 verileri - DOĞRU KOLONLAR
-        # S (TY Sales Value TRY2.1) = Gerçek satış değeri
-        # Q (TY Gross Profit TRY2.1) = Brüt kar
-        # T (TY Gross Marjin TRY%.1) = Brüt marj %
-        # R (TY Avg Store Stock Cost TRY2.1) = Stok
-        df_2025 = self.df[['Month', 'MainGroupDesc',
-                           'TY Sales Value TRY2.1',         # Kolon S - Gerçek satış
-                           'TY Gross Profit TRY2.1',        # Kolon Q - Brüt kar
-                           'TY Gross Marjin TRY%.1',        # Kolon T - Brüt marj %
-                           'TY Avg Store Stock Cost TRY2.1']].copy()  # Kolon R - Stok
-        df_2025.columns = ['Month', 'MainGroup', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock']
-        df_2025['Year'] = 2025
+        """Veriyi yıl bazında ayrıştır ve temizle (kaynak kolonlar self.schema'dan)"""
+        
+        # Her yıl için eşlenen kolonları standart adlara çevir
+        # (varsayılan şemada 2024: J/H/K/I, 2025: S/Q/T/R kolonları)
+        frames = []
+        for year, mapping in self.schema['years'].items():
+            source_columns = [self.schema['month'], self.schema['group']] + [mapping[metric] for metric in SCHEMA_METRICS]
+            df_year = self.df[source_columns].copy()
+            df_year.columns = ['Month', 'MainGroup', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock']
+            df_year['Year'] = year
+            frames.append(df_year)
         
         # Birleştir
-        self.data = pd.concat([df_2024, df_2025], ignore_index=True)
+        self.data = pd.concat(frames, ignore_index=True)
         
         # Toplam satırlarını çıkar
         self.data = self.data[~self.data['Month'].astype(str).str.contains('Toplam', na=False)]
@@ -53,6 +246,9 @@ class BudgetForecaster:
         # Month'u integer'a çevir
         self.data['Month'] = pd.to_numeric(self.data['Month'], errors='coerce')
         
+        # Doğrulama: aşağıda atılacak/0'lanacak satırlar ve şüpheli değerler tek geçişte raporlanır
+        self.issues = screen_data(self.data)
+        
         # MainGroup boş olanları çıkar
         self.data = self.data.dropna(subset=['MainGroup'])
         
@@ -71,6 +267,10 @@ class BudgetForecaster:
         
         # 2025 Aralık ayı eksikse tahmin et
         self._fill_missing_december_2025()
+        
+        # Arrow-backed mod: temizlenmiş veriyi pyarrow dtype'larına çevir
+        if self.dtype_backend == 'pyarrow':
+            self.data = _to_arrow_backed(self.data)
     
     def _fill_missing_december_2025(self):
         """2025 Aralık ayı eksik veya sıfırsa tahmin et"""
@@ -101,20 +301,59 @@ class BudgetForecaster:
                 self.data = self.data.sort_values(['Year', 'Month', 'MainGroup']).reset_index(drop=True)
                 
                 print("📅 2025 Aralık ayı tahmini eklendi (Kasım × 1.12)")
+    
+    @staticmethod
+    def _sales_stats(rows, sign=1):
+        """
+        Satırlardan satış toplam/adet tablolarını üret
+        
+        group_month: (MainGroup, Month) - mevsimsellik
+        group_year: (Year, MainGroup) - yıllık toplamlar, trend, organik büyüme
+        group_recent: MainGroup - 2025 son aylar (momentum)
+        sign=-1 çıkarılacak satırlar için negatif katkı üretir
+        """
+        
+        frame = rows[['Year', 'Month', 'MainGroup']].copy()
+        frame['sum'] = rows['Sales'].to_numpy(dtype=float) * sign
+        frame['count'] = float(sign)
+        
+        recent = (frame['Year'] == 2025) & frame['Month'].isin(RECENT_MONTHS)
         
+        return {
+            'group_month': frame.groupby(['MainGroup', 'Month'])[['sum', 'count']].sum(),
+            'group_year': frame.groupby(['Year', 'MainGroup'])[['sum', 'count']].sum(),
+            'group_recent': frame[recent].groupby('MainGroup')[['sum', 'count']].sum()
+        }
+    
+    def _running_stats(self):
+        """Satış toplam/adet tabloları (ilk kullanımda tüm veriden, sonra append_actuals ile artımlı)"""
+        if self._running is None:
+            self._running = self._sales_stats(self.data)
+        return self._running
+    
     def calculate_seasonality(self):
         """Her ay için mevsimsellik indeksi hesapla"""
         
-        # Grup ve ay bazında ortalama satış
-        monthly_avg = self.data.groupby(['MainGroup', 'Month'])['Sales'].mean().reset_index()
-        monthly_avg.columns = ['MainGroup', 'Month', 'AvgSales']
+        if self.engine == 'polars':
+            from polars_engine import calculate_seasonality
+            
+            return self._from_polars(calculate_seasonality(self._polars_frame(), self._seasonality_sales()))
         
-        # Her grup için yıllık ortalama
-        yearly_avg = self.data.groupby('MainGroup')['Sales'].mean().reset_index()
-        yearly_avg.columns = ['MainGroup', 'YearlyAvg']
+        # winsorize: kırpılmış satışlarla tablo yeniden toplanır (running tablolar ham satışları tutar)
+        if self.winsorize:
+            rows = self.data[['Year', 'Month', 'MainGroup']].assign(Sales=self._seasonality_sales())
+            group_month = self._sales_stats(rows)['group_month']
+        else:
+            group_month = self._running_stats()['group_month']
         
-        # Merge
-        seasonality = monthly_avg.merge(yearly_avg, on='MainGroup')
+        # Grup ve ay bazında ortalama satış
+        seasonality = group_month.reset_index()
+        seasonality['AvgSales'] = seasonality['sum'] / seasonality['count']
+        
+        # Her grup için yıllık ortalama (ay toplamlarından)
+        group = group_month.groupby(level='MainGroup')[['sum', 'count']].sum()
+        yearly_avg = group['sum'] / group['count']
+        seasonality['YearlyAvg'] = seasonality['MainGroup'].map(yearly_avg)
         
         # Mevsimsellik indeksi = Aylık Ort / Yıllık Ort
         seasonality['SeasonalityIndex'] = np.where(
@@ -125,19 +364,26 @@ class BudgetForecaster:
         
         return seasonality[['MainGroup', 'Month', 'SeasonalityIndex']]
     
+    def _seasonality_sales(self):
+        """Mevsimsellikte kullanılacak satışlar: winsorize=True ise kırpılmış dizi, değilse None (Sales)"""
+        return winsorize_sales(self.data) if self.winsorize else None
+    
     def calculate_trend(self):
         """Her grup için trend hesapla (2024->2025 büyümesi)"""
         
-        # 2024 toplamı
-        total_2024 = self.data[self.data['Year'] == 2024].groupby('MainGroup')['Sales'].sum().reset_index()
-        total_2024.columns = ['MainGroup', 'Sales_2024']
-        
-        # 2025 toplamı
-        total_2025 = self.data[self.data['Year'] == 2025].groupby('MainGroup')['Sales'].sum().reset_index()
-        total_2025.columns = ['MainGroup', 'Sales_2025']
+        if self.engine == 'polars':
+            from polars_engine import calculate_trend
+            
+            return self._from_polars(calculate_trend(self._polars_frame()))
         
-        # Merge
-        trend = total_2024.merge(total_2025, on='MainGroup')
+        # 2024 ve 2025 toplamı (yalnızca iki yılda da olan gruplar)
+        totals = self._running_stats()['group_year']['sum'].unstack('Year')
+        totals = totals.reindex(columns=list(HISTORY_YEARS)).dropna()
+        trend = pd.DataFrame({
+            'MainGroup': totals.index,
+            'Sales_2024': totals[2024].to_numpy(),
+            'Sales_2025': totals[2025].to_numpy()
+        })
         
         # Büyüme oranı hesapla
         trend['GrowthRate'] = np.where(
@@ -151,25 +397,24 @@ class BudgetForecaster:
     def calculate_recent_momentum(self):
         """Son 3 ayın momentumunu hesapla"""
         
-        # Son 3 ay (2025'in 10, 11, 12. ayları varsayalım - veri varsa)
-        recent_months = self.data[
-            (self.data['Year'] == 2025) & 
-            (self.data['Month'].isin([10, 11, 12]))
-        ]
-        
-        if len(recent_months) == 0:
-            # Veri yoksa 2025'in tamamını al
-            recent_months = self.data[self.data['Year'] == 2025]
+        if self.engine == 'polars':
+            from polars_engine import calculate_recent_momentum
+            
+            return self._from_polars(calculate_recent_momentum(self._polars_frame()))
         
-        # Grup bazında ortalama
-        momentum = recent_months.groupby('MainGroup')['Sales'].mean().reset_index()
-        momentum.columns = ['MainGroup', 'RecentAvg']
+        stats = self._running_stats()
+        group_year = stats['group_year']
+        overall = group_year[group_year.index.get_level_values('Year') == 2025].droplevel('Year')
         
-        # Genel ortalama ile karşılaştır
-        overall_avg = self.data[self.data['Year'] == 2025].groupby('MainGroup')['Sales'].mean().reset_index()
-        overall_avg.columns = ['MainGroup', 'OverallAvg']
+        # Son 3 ay (2025'in 10, 11, 12. ayları) - veri yoksa 2025'in tamamı
+        recent = stats['group_recent']
+        if recent['count'].sum() == 0:
+            recent = overall
         
-        momentum = momentum.merge(overall_avg, on='MainGroup')
+        # Grup bazında ortalama ve genel ortalama ile karşılaştırma
+        momentum = pd.DataFrame({'RecentAvg': recent['sum'] / recent['count']}).join(
+            pd.DataFrame({'OverallAvg': overall['sum'] / overall['count']}), how='inner'
+        ).reset_index()
         
         # Momentum skoru (son aylar / genel ortalama)
         momentum['MomentumScore'] = np.where(
@@ -180,141 +425,824 @@ class BudgetForecaster:
         
         return momentum[['MainGroup', 'MomentumScore']]
     
-    def forecast_2026(self, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None):
+    def append_actuals(self, rows):
+        """
+        Yeni ay gerçekleşmelerini Excel'i yeniden okumadan ekle
+        
+        rows: Year, Month, MainGroup, Sales, GrossProfit, Stock kolonlu DataFrame
+        (GrossMargin% yoksa GrossProfit / Sales ile hesaplanır). Aynı (Year, Month,
+        MainGroup) satırı zaten varsa (örn. Aralık tahmini) gerçekleşme ile değiştirilir.
+        
+        Mevsimsellik, yıllık toplam, trend ve momentum toplamları yalnızca eklenen ve
+        değiştirilen satırlardan güncellenir; tahmin bağlamı ve senaryo cache'i
+        geçersiz kılınır (bir sonraki istekte yeniden hesaplanır).
+        """
+        
+        missing = [col for col in ACTUALS_COLUMNS if col not in rows.columns]
+        if missing:
+            raise ValueError(f"Gerçekleşme verisinde eksik kolon(lar): {missing}")
+        
+        years = {int(year) for year in pd.unique(rows['Year'])}
+        unsupported = sorted(years - set(HISTORY_YEARS))
+        if unsupported:
+            raise ValueError(f"Gerçekleşme yalnızca {HISTORY_YEARS} yılları için eklenebilir: {unsupported}")
+        
+        if rows.duplicated(['Year', 'Month', 'MainGroup']).any():
+            raise ValueError("Gerçekleşme verisinde tekrarlanan (Year, Month, MainGroup) satırları var")
+        
+        new_rows = self._clean_actuals(rows)
+        stats = self._running_stats()
+        data = self.data
+        
+        # Değiştirilecek satırlar yalnızca gelen yıl/ay dilimlerinde aranır
+        keys = pd.MultiIndex.from_frame(new_rows[['Year', 'Month', 'MainGroup']])
+        candidates = data[data['Year'].isin(years) & data['Month'].isin(pd.unique(new_rows['Month']))]
+        replaced = candidates[pd.MultiIndex.from_frame(candidates[['Year', 'Month', 'MainGroup']]).isin(keys)]
+        
+        # Toplamlar: yeni satırların katkısı eklenir, değiştirilenlerinki çıkarılır
+        changes = [self._sales_stats(new_rows)]
+        if len(replaced) > 0:
+            changes.append(self._sales_stats(replaced, sign=-1))
+        
+        running = {}
+        for name, total in stats.items():
+            for change in changes:
+                total = total.add(change[name], fill_value=0)
+            running[name] = total[total['count'] != 0].sort_index()
+        
+        self.data = pd.concat([data.drop(index=replaced.index), new_rows], ignore_index=True)
+        self._running = running
+        
+        # Bağımlı cache'leri geçersiz kıl (devam eden hesaplar eski sürüm anahtarıyla kalır)
+        with self._cache_lock:
+            self._data_version += 1
+            self._scenario_cache.clear()
+            self._cache_sizes.clear()
+            self._context = None
+        
+        return {'appended': len(new_rows) - len(replaced), 'replaced': len(replaced)}
+    
+    def _clean_actuals(self, rows):
+        """Gerçekleşme satırlarını self.data şemasına getir (COGS, oran, kolon sırası, dtype)"""
+        
+        actuals = rows.copy()
+        actuals[['Sales', 'GrossProfit', 'Stock']] = actuals[['Sales', 'GrossProfit', 'Stock']].fillna(0)
+        
+        if 'GrossMargin%' not in actuals.columns:
+            sales = actuals['Sales'].to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                actuals['GrossMargin%'] = np.where(sales > 0, actuals['GrossProfit'].to_numpy(dtype=float) / sales, 0)
+        actuals['GrossMargin%'] = actuals['GrossMargin%'].fillna(0)
+        
+        # SMM ve Stok/COGS oranı (process_data ile aynı)
+        actuals['COGS'] = actuals['Sales'] - actuals['GrossProfit']
+        cogs = actuals['COGS'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            actuals['Stock_COGS_Ratio'] = np.where(cogs > 0, actuals['Stock'].to_numpy(dtype=float) / cogs, 0)
+        
+        return actuals[list(self.data.columns)].astype(self.data.dtypes.to_dict()).reset_index(drop=True)
+    
+    @staticmethod
+    def year_params(horizon=1, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None):
+        """
+        Senaryo parametrelerini ufuktaki her yıl için ayır
+        
+        Her parametre tek değer (tüm yıllarda aynı) veya ufuk uzunluğunda liste/tuple
+        (yıl başına) olabilir; örn. horizon=3, growth_param=[0.15, 0.10, 0.08].
+        Yıl başına parametre dict'lerinden oluşan liste döner.
+        """
+        
+        horizon = int(horizon)
+        if horizon < 1:
+            raise ValueError("Tahmin ufku en az 1 yıl olmalı")
+        
+        values = (growth_param, margin_improvement, stock_ratio_target, monthly_growth_targets,
+                  maingroup_growth_targets, stock_change_pct, stock_budget)
+        years = [{} for _ in range(horizon)]
+        for name, value in zip(SCENARIO_PARAMS, values):
+            if isinstance(value, (list, tuple)):
+                if len(value) != horizon:
+                    raise ValueError(f"{name}: {horizon} yıllık ufuk için {horizon} değer gerekli, {len(value)} verildi")
+                for params, year_value in zip(years, value):
+                    params[name] = year_value
+            else:
+                for params in years:
+                    params[name] = value
+        
+        return years
+    
+    @staticmethod
+    def scenario_key(growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None, horizon=1):
+        """
+        Senaryo parametrelerini hashlenebilir, normalize bir anahtara çevir
+        
+        Tek yıllık ufukta yılın anahtarı (bkz. _year_key), çok yıllıda yıl anahtarlarının
+        tuple'ı döner; aynı tahmini üreten parametre setleri aynı anahtarı verir.
+        """
+        
+        years = BudgetForecaster.year_params(horizon, growth_param, margin_improvement, stock_ratio_target,
+                                             monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget)
+        keys = tuple(BudgetForecaster._year_key(**params) for params in years)
+        return keys[0] if len(keys) == 1 else keys
+    
+    @staticmethod
+    def _year_key(growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None):
+        """
+        Tek yılın parametrelerini normalize anahtara çevir
+        
+        - growth_param'a eşit ay/grup hedefleri atılır (eksik hedef zaten growth_param olur)
+        - stock_change_pct verildiyse stock_ratio_target kullanılmadığı için yok sayılır
+        - stock_budget verildiyse stok diğer iki parametreden bağımsızdır, ikisi de yok sayılır
+        """
+        
+        def number(value):
+            return None if value is None else float(np.round(float(value), 12))
+        
+        growth = number(growth_param)
+        
+        # Hedefler dict veya pd.Series; yüzlerce grupta da tek vektörel geçiş
+        def targets(mapping, key_type):
+            if mapping is None or len(mapping) == 0:
+                return None
+            values = pd.Series(mapping, dtype=float)
+            rounded = np.round(values.to_numpy(), 12)
+            keep = ~np.isnan(rounded) & (rounded != growth)
+            items = tuple(sorted(zip(map(key_type, values.index[keep].tolist()), rounded[keep].tolist())))
+            return items or None
+        
+        budget = None
+        if stock_budget is not None:
+            budget = tuple(number(stock_budget.get(name)) for name in ('total', 'min_weeks', 'max_weeks'))
+            stock_ratio_target = stock_change_pct = None
+        
+        return (
+            growth,
+            number(margin_improvement),
+            None if stock_change_pct is not None else number(stock_ratio_target),
+            targets(monthly_growth_targets, int),
+            targets(maingroup_growth_targets, str),
+            number(stock_change_pct),
+            budget
+        )
+    
+    def memoize(self, kind, key, build):
+        """
+        Senaryo LRU cache'inden sonucu getir, yoksa build() ile hesapla ve sakla
+        
+        DataFrame sonuçlar salt okunur dizilerle saklanır ve görünüm olarak döner;
+        diğer sonuçlar (figür spec'leri, byte'lar) olduğu gibi paylaşılır, değiştirilmemelidir.
+        """
+        
+        cache_key = (kind, key, self._data_version)
+        while True:
+            with self._cache_lock:
+                if cache_key in self._scenario_cache:
+                    self._scenario_cache.move_to_end(cache_key)
+                    self.cache_hits += 1
+                    hit, result = True, self._scenario_cache[cache_key]
+                    break
+                
+                # Aynı anahtar başka bir thread'de hesaplanıyorsa bitmesini bekle
+                pending = self._pending.get(cache_key)
+                if pending is None:
+                    pending = self._pending[cache_key] = threading.Event()
+                    self.cache_misses += 1
+                    hit = False
+                    break
+            
+            pending.wait()
+        
+        # Metrikler cache kilidi dışında yazılır
+        if hit:
+            metrics.CACHE_REQUESTS.inc(kind=kind, result='hit')
+            return self._cache_view(result)
+        metrics.CACHE_REQUESTS.inc(kind=kind, result='miss')
+        
+        try:
+            with metrics.CACHE_BUILD_SECONDS.time(kind=kind):
+                result = build()
+            if isinstance(result, pd.DataFrame):
+                if self.dtype_backend == 'pyarrow':
+                    result = _to_arrow_backed(result)
+                result = _read_only_frame(result)
+            
+            size = _result_bytes(result)
+            with self._cache_lock:
+                self._scenario_cache[cache_key] = result
+                self._scenario_cache.move_to_end(cache_key)
+                self._cache_sizes[cache_key] = size
+                
+                # Kayıt sayısı ve (verildiyse) byte sınırı; en yeni kayıt tek başına sınırı aşsa da kalır
+                while len(self._scenario_cache) > self.cache_size or (
+                        self.cache_bytes is not None and len(self._scenario_cache) > 1
+                        and sum(self._cache_sizes.values()) > self.cache_bytes):
+                    evicted, _ = self._scenario_cache.popitem(last=False)
+                    del self._cache_sizes[evicted]
+        finally:
+            with self._cache_lock:
+                del self._pending[cache_key]
+            pending.set()
+        
+        return self._cache_view(result)
+    
+    def cached(self, kind, key):
+        """memoize cache'indeki sonucu hesaplamadan getir (yoksa None; sayaçlar değişmez)"""
+        with self._cache_lock:
+            value = self._scenario_cache.get((kind, key, self._data_version))
+        return None if value is None else self._cache_view(value)
+    
+    @staticmethod
+    def _cache_view(value):
+        if isinstance(value, pd.DataFrame):
+            return value.copy(deep=False)
+        return value
+    
+    def resident_bytes(self):
+        """self.data'nın bellek kullanımı (byte; Arrow kolonlarında buffer boyutu)"""
+        return int(self.data.memory_usage(index=False).sum())
+    
+    @property
+    def data_version(self):
+        """Veri sürümü (append_actuals her çağrıda artırır; dış cache anahtarları için)"""
+        return self._data_version
+    
+    def cache_info(self):
+        """Senaryo cache istatistikleri"""
+        with self._cache_lock:
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'size': len(self._scenario_cache),
+                'max_size': self.cache_size,
+                'bytes': sum(self._cache_sizes.values()),
+                'max_bytes': self.cache_bytes
+            }
+    
+    def clear_cache(self):
+        """Senaryo cache'ini temizle"""
+        with self._cache_lock:
+            self._scenario_cache.clear()
+            self._cache_sizes.clear()
+    
+    def get_forecast_context(self):
+        """
+        Senaryodan bağımsız tahmin girdileri (veri başına bir kez hesaplanır)
+        
+        base: 2025 satırları + SeasonalityIndex + HistoricalRatio (salt okunur)
+        organic_growth: 2024->2025 toplam satış büyümesi
+        months, groups: base'deki sıralı ay/ana grup değerleri
+        month_codes, group_codes: base satırlarının months/groups içindeki konumları
+                                  (hedefler bu kodlarla satırlara dizi olarak yayılır)
+        """
+        
+        with self._cache_lock:
+            if self._context is not None:
+                return self._context
+            version = self._data_version
+        
+        base, organic_growth = self._forecast_inputs()
+        
+        context = {'base': _read_only_frame(base), 'organic_growth': organic_growth}
+        for name, column in (('month', 'Month'), ('group', 'MainGroup')):
+            codes, uniques = pd.factorize(base[column].to_numpy(), sort=True)
+            codes.setflags(write=False)
+            context[f'{name}_codes'] = codes
+            context[f'{name}s'] = pd.Index(uniques)
+        
+        with self._cache_lock:
+            # Hesap sırasında veri değiştiyse eski bağlam saklanmaz
+            if version != self._data_version:
+                return context
+            if self._context is None:
+                self._context = context
+            return self._context
+    
+    def _forecast_inputs(self):
+        """Tahmin bağlamının base tablosu ve organik büyümesi (cache'siz)"""
+        
+        if self.engine == 'polars':
+            from polars_engine import forecast_inputs
+            
+            base, organic_growth = forecast_inputs(self._polars_frame(), self._seasonality_sales())
+            return self._from_polars(base), organic_growth
+        
+        # Mevsimsellik hesapla
+        seasonality = self.calculate_seasonality()
+        
+        # 2025 verilerini al (base olarak kullanacağız)
+        base_2025 = self.data[self.data['Year'] == 2025]
+        
+        # Mevsimselliği ekle
+        base = base_2025.merge(seasonality, on=['MainGroup', 'Month'], how='left')
+        base['SeasonalityIndex'] = base['SeasonalityIndex'].fillna(1.0)
+        
+        # Tarihsel Stok/SMM oranı (grup × ay, SMM'si olan aylar); yoksa grup, o da yoksa genel ortalama
+        history = self.data[self.data['COGS'] > 0]
+        ratio_by_month = history.groupby(['MainGroup', 'Month'])['Stock_COGS_Ratio'].mean().rename('HistoricalRatio')
+        ratio_by_group = history.groupby('MainGroup')['Stock_COGS_Ratio'].mean()
+        base = base.merge(ratio_by_month.reset_index(), on=['MainGroup', 'Month'], how='left')
+        base['HistoricalRatio'] = base['HistoricalRatio'].fillna(base['MainGroup'].map(ratio_by_group))
+        base['HistoricalRatio'] = base['HistoricalRatio'].fillna(history['Stock_COGS_Ratio'].mean()).fillna(0)
+        
+        # Organik trend (2024->2025) - yıllık toplamlar running tablolardan
+        group_year = self._running_stats()['group_year']['sum']
+        year_totals = group_year.groupby(level='Year').sum()
+        total_2024 = year_totals.get(2024, 0)
+        total_2025 = year_totals.get(2025, 0)
+        organic_growth = (total_2025 - total_2024) / total_2024 if total_2024 > 0 else 0
+        
+        return base, organic_growth
+    
+    @staticmethod
+    def _growth_target_arrays(context, monthly_growth_targets, maingroup_growth_targets, growth_param):
+        """
+        Ay ve ana grup hedeflerini base satırlarına hizalı dizilere çevir
+        
+        Hedefler ay/grup başına bir kez sıralanır (reindex), satırlara kodlarla
+        yayılır; grup sayısından bağımsız olarak tek hedef kadar ucuzdur.
         """
-        2026 tahminini yap
+        
+        def aligned(targets, keys, codes):
+            if targets is None or len(targets) == 0:
+                return np.full(len(codes), float(growth_param))
+            values = pd.Series(targets, dtype=float).reindex(keys).fillna(growth_param).to_numpy()
+            return values[codes]
+        
+        return (
+            aligned(monthly_growth_targets, context['months'], context['month_codes']),
+            aligned(maingroup_growth_targets, context['groups'], context['group_codes'])
+        )
+    
+    def forecast(self, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None, horizon=1):
+        """
+        2026'dan başlayarak horizon yıllık tahmin yap
         
         Parameters:
         -----------
         growth_param: Genel büyüme hedefi (diğer hedefler yoksa kullanılır)
-        margin_improvement: Brüt marj iyileşme hedefi (örn: 0.02 = 2 puan)
+        margin_improvement: Brüt marj iyileşme hedefi (örn: 0.02 = 2 puan; yıllar birikimli)
         stock_ratio_target: Hedef stok/SMM oranı (örn: 0.8) - stock_change_pct None ise
         monthly_growth_targets: Dict {month: growth_rate} - Her ay için özel hedef
         maingroup_growth_targets: Dict {maingroup: growth_rate} - Her ana grup için özel hedef
-        stock_change_pct: Stok tutar değişim yüzdesi (örn: -0.05 = %5 azalış)
+                                  (pd.Series da olur; yüzlerce grupta dict'e çevirmeye gerek yok)
+        stock_change_pct: Stok tutar değişim yüzdesi (örn: -0.05 = %5 azalış; önceki yıla göre)
+        stock_budget: İşletme sermayesi limiti - Dict {'total': aylık ortalama toplam stok,
+                      'min_weeks': en az haftalık kapsama, 'max_weeks': en çok haftalık kapsama}.
+                      Verilirse stok, tarihsel Stok/SMM oranlarından en az sapmayla bütçeye
+                      dağıtılır (bkz. stock_optimizer); diğer stok parametreleri yok sayılır.
+        horizon: Tahmin edilecek yıl sayısı. Parametreler yıl başına liste olarak da
+                 verilebilir (bkz. year_params); tek değer tüm yıllara uygulanır.
         """
         
-        # Mevsimsellik hesapla
-        seasonality = self.calculate_seasonality()
+        key = self.scenario_key(growth_param, margin_improvement, stock_ratio_target,
+                                monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget, horizon)
         
-        # 2025 verilerini al (base olarak kullanacağız)
-        base_2025 = self.data[self.data['Year'] == 2025].copy()
+        def build():
+            with metrics.FORECAST_SECONDS.time(horizon=horizon):
+                return self._compute_forecast(self.year_params(
+                    horizon, growth_param, margin_improvement, stock_ratio_target,
+                    monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget
+                ))
         
-        # Mevsimselliği ekle
-        forecast = base_2025.merge(seasonality, on=['MainGroup', 'Month'], how='left')
-        forecast['SeasonalityIndex'] = forecast['SeasonalityIndex'].fillna(1.0)
+        return self.memoize('forecast', key, build)
+    
+    def forecast_2026(self, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None):
+        """2026 tahminini yap (tek yıllık forecast; parametreler için bkz. forecast)"""
+        return self.forecast(growth_param, margin_improvement, stock_ratio_target,
+                             monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget)
+    
+    def _compute_forecast(self, years):
+        """
+        forecast hesaplaması (cache'siz) - ufuk × satır (ay × ana grup) dizileriyle
         
-        # Organik trend (2024->2025)
-        total_2024 = self.data[self.data['Year'] == 2024]['Sales'].sum()
-        total_2025 = self.data[self.data['Year'] == 2025]['Sales'].sum()
-        organic_growth = (total_2025 - total_2024) / total_2024 if total_2024 > 0 else 0
+        years: year_params çıktısı. Satış, marj, brüt kar ve SMM tüm yıllar için tek
+        vektörel geçişte hesaplanır; yalnızca stok önceki yılın stoğuna bağlı olabildiği
+        (tutar değişimi) ve bütçe yıl başına dağıtıldığı için yıl yıl ilerler.
+        """
         
-        # AY BAZINDA BÜYÜME HEDEFLERİ
-        if monthly_growth_targets is not None:
-            forecast['MonthlyGrowthTarget'] = forecast['Month'].map(monthly_growth_targets)
-            forecast['MonthlyGrowthTarget'] = forecast['MonthlyGrowthTarget'].fillna(growth_param)
-        else:
-            forecast['MonthlyGrowthTarget'] = growth_param
+        # Senaryodan bağımsız girdiler: mevsimsellik eklenmiş 2025 bazı ve organik trend
+        context = self.get_forecast_context()
+        base = context['base']
+        organic_growth = context['organic_growth']
+        horizon = len(years)
+        
+        # AY VE ANA GRUP BAZINDA BÜYÜME HEDEFLERİ (ufuk × satır; eksik hedef = o yılın growth_param'ı)
+        combined_growth = np.empty((horizon, len(base)))
+        for k, params in enumerate(years):
+            month_targets, group_targets = self._growth_target_arrays(
+                context, params['monthly_growth_targets'], params['maingroup_growth_targets'], params['growth_param']
+            )
+            # KOMBINE BÜYÜME HEDEFI: Ay hedefi ve Ana Grup hedefinin ortalaması
+            combined_growth[k] = (month_targets + group_targets) / 2
         
-        # ANA GRUP BAZINDA BÜYÜME HEDEFLERİ
-        if maingroup_growth_targets is not None:
-            forecast['MainGroupGrowthTarget'] = forecast['MainGroup'].map(maingroup_growth_targets)
-            forecast['MainGroupGrowthTarget'] = forecast['MainGroupGrowthTarget'].fillna(growth_param)
-        else:
-            forecast['MainGroupGrowthTarget'] = growth_param
+        # TAHMİN FORMÜLÜ
+        # 2025 değeri × mevsimsel düzeltme × Π yıllar [(1 + organik büyüme × 0.3) × (1 + kombine hedef)]
+        # Mevsimsellik bazın şeklini düzeltir (bir kez); büyüme yıldan yıla birikir
+        seasonal = base['Sales'].to_numpy(dtype=float) * (0.85 + base['SeasonalityIndex'].to_numpy(dtype=float) * 0.15)
+        sales = seasonal * np.cumprod((1 + organic_growth * 0.3) * (1 + combined_growth), axis=0)
         
-        # KOMBINE BÜYÜME HEDEFI
-        # Ay hedefi ve Ana Grup hedefinin ortalamasını al
-        forecast['CombinedGrowthTarget'] = (forecast['MonthlyGrowthTarget'] + forecast['MainGroupGrowthTarget']) / 2
+        # Gross Margin iyileşmesi (yıl hedefleri birikimli puan)
+        margin_shift = np.cumsum([params['margin_improvement'] for params in years])[:, None]
+        margin = np.clip(base['GrossMargin%'].to_numpy(dtype=float) + margin_shift, 0, 1)
         
-        # TAHMİN FORMÜLÜ
-        # 2025 değeri × (1 + organik büyüme × 0.3) × (1 + kombine hedef) × mevsimsel düzeltme
-        forecast['Sales_2026'] = (
-            forecast['Sales'] *
-            (1 + organic_growth * 0.3) *  # Organik trend hafif etki
-            (1 + forecast['CombinedGrowthTarget']) *  # Ay + Ana Grup kombine hedef
-            (0.85 + forecast['SeasonalityIndex'] * 0.15)  # Mevsimsellik hafif etki
+        # GrossProfit ve COGS
+        gross_profit = sales * margin
+        cogs = sales - gross_profit
+        
+        # STOK HESAPLAMA - ÜÇ YÖNTEM (yıl başına; tutar değişimi önceki yılın stoğuna uygulanır)
+        stock = np.empty_like(sales)
+        previous_stock = base['Stock'].to_numpy(dtype=float)
+        for k, params in enumerate(years):
+            if params['stock_budget'] is not None:
+                # Yöntem 3: İŞLETME SERMAYESİ LİMİTİ (verildiyse diğer yöntemlerden önceliklidir)
+                stock[k] = self._allocate_stock_budget(context, cogs[k], params['stock_budget'], FORECAST_YEAR + k)
+            elif params['stock_change_pct'] is not None:
+                # Yöntem 1: TUTAR BAZLI DEĞİŞİM
+                # Her ana grup/ay için önceki yıl stok tutarını % değişim ile çarp
+                # Örnek: %5 azalış (-0.05) → her grubun stoğu %5 azalır
+                stock[k] = previous_stock * (1 + params['stock_change_pct'])
+            else:
+                # Yöntem 2: ORAN BAZLI HEDEF
+                # Yılın COGS'u × hedef oran
+                stock[k] = cogs[k] * params['stock_ratio_target']
+            previous_stock = stock[k]
+        
+        # Sonuç datası: yıllar alt alta, her yılda base satır sırası
+        result = pd.DataFrame({
+            'Month': np.tile(base['Month'].to_numpy(), horizon),
+            'MainGroup': np.tile(base['MainGroup'].to_numpy(), horizon),
+            'Sales': sales.ravel(),
+            'GrossProfit': gross_profit.ravel(),
+            'GrossMargin%': margin.ravel(),
+            'Stock': stock.ravel(),
+            'COGS': cogs.ravel(),
+            'Year': np.repeat(FORECAST_YEAR + np.arange(horizon), len(base))
+        })
+        
+        # Stok/COGS oranı
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['Stock_COGS_Ratio'] = np.where(cogs > 0, stock / cogs, 0).ravel()
+        
+        return result
+    
+    def _allocate_stock_budget(self, context, cogs, stock_budget, year):
+        """Yılın toplam stok bütçesini ana grup × ay hücrelerine dağıt (bkz. stock_optimizer)"""
+        
+        # Toplam stok (aylık ortalama × ay sayısı) gruplara/aylara, tarihsel oranlardan
+        # en az sapacak ve haftalık kapsama sınırları içinde kalacak şekilde dağıtılır
+        base = context['base']
+        days = _DAYS_BY_MONTH[base['Month'].to_numpy(dtype=np.int64)]
+        lower, upper = cover_ratio_bounds(days, stock_budget.get('min_weeks'), stock_budget.get('max_weeks'))
+        
+        months = len(context['months'])
+        try:
+            return allocate_stock(
+                cogs, base['HistoricalRatio'].to_numpy(dtype=float),
+                stock_budget['total'] * months, lower, upper
+            )
+        except ValueError:
+            if np.any(lower > upper):
+                raise
+            # Aralık kontrolü allocate_stock'ta; mesaj arayüz için aylık ortalamaya çevrilir
+            min_total, max_total = budget_range(cogs, lower, upper)
+            raise ValueError(
+                f"{year} stok bütçesi kapsama sınırlarıyla sağlanamaz: aylık ortalama "
+                f"₺{min_total / months:,.0f} - ₺{max_total / months:,.0f} arasında olmalı"
+            ) from None
+    
+    def get_full_data_with_forecast(self, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None, horizon=1):
+        """2024, 2025 ve tahmin ufkundaki yılları (2026...) birleştir"""
+        
+        key = self.scenario_key(growth_param, margin_improvement, stock_ratio_target,
+                                monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget, horizon)
+        
+        def build():
+            forecast = self.forecast(growth_param, margin_improvement, stock_ratio_target, monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget, horizon)
+            
+            # 2024-2025 verisini düzenle
+            historical = self.data[['Month', 'MainGroup', 'Sales', 'GrossProfit', 
+                                   'GrossMargin%', 'Stock', 'COGS', 'Stock_COGS_Ratio', 'Year']]
+            
+            # Birleştir
+            return pd.concat([historical, forecast], ignore_index=True)
+        
+        return self.memoize('full_data', key, build)
+    
+    def get_sensitivity(self, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None, horizon=1):
+        """
+        Her parametrenin 2026 toplam Satış, Brüt Kar ve Stok üzerindeki etkisi
+        
+        Tahmin formülü büyüme hedeflerinde doğrusal olduğundan etkiler tahmini yeniden
+        çalıştırmadan tek vektörel geçişte hesaplanır. Satır başına bir parametre:
+        genel büyüme, brüt marj iyileşme, aktif stok parametresi, 12 ay hedefi ve her
+        ana grup hedefi. Sales/GrossProfit/Stock kolonları parametrenin Step kadar
+        artmasıyla toplamlardaki değişimdir (Step: oranlarda 1 puan, bütçede %1).
+        Çok yıllı ufukta etkiler ilk tahmin yılı (2026) parametreleri içindir.
+        """
+        
+        first_year = self.year_params(horizon, growth_param, margin_improvement, stock_ratio_target,
+                                      monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget)[0]
+        return self.memoize('sensitivity', self._year_key(**first_year), lambda: self._compute_sensitivity(
+            *(first_year[name] for name in SCENARIO_PARAMS)
+        ))
+    
+    def _compute_sensitivity(self, growth_param, margin_improvement, stock_ratio_target, monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget):
+        """get_sensitivity hesaplaması (cache'siz)"""
+        
+        step = SENSITIVITY_STEP
+        context = self.get_forecast_context()
+        base = context['base']
+        forecast = self.forecast_2026(growth_param, margin_improvement, stock_ratio_target,
+                                      monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget)
+        
+        # Sales_2026 = birim × (1 + (ay hedefi + grup hedefi) / 2); forecast satırları base sırasında
+        unit = (
+            base['Sales'].to_numpy(dtype=float) *
+            (1 + context['organic_growth'] * 0.3) *
+            (0.85 + base['SeasonalityIndex'].to_numpy(dtype=float) * 0.15)
         )
+        sales = forecast['Sales'].to_numpy(dtype=float)
+        margin = forecast['GrossMargin%'].to_numpy(dtype=float)
         
-        # Gross Margin iyileşmesi
-        forecast['GrossMargin%_2026'] = (forecast['GrossMargin%'] + margin_improvement).clip(0, 1)
+        # Satış başına stok: yalnızca oran yönteminde stok satışla birlikte değişir
+        ratio_mode = stock_budget is None and stock_change_pct is None
+        stock_per_sales = (1 - margin) * stock_ratio_target if ratio_mode else np.zeros_like(margin)
         
-        # GrossProfit ve COGS
-        forecast['GrossProfit_2026'] = forecast['Sales_2026'] * forecast['GrossMargin%_2026']
-        forecast['COGS_2026'] = forecast['Sales_2026'] - forecast['GrossProfit_2026']
-        
-        # STOK HESAPLAMA - İKİ YÖNTEM:
-        if stock_change_pct is not None:
-            # Yöntem 1: TUTAR BAZLI DEĞİŞİM
-            # Her ana grup/ay için 2025 stok tutarını % değişim ile çarp
-            # Örnek: %5 azalış (-0.05) → her grubun stoğu %5 azalır
-            forecast['Stock_2026'] = forecast['Stock'] * (1 + stock_change_pct)
+        # Bir hedef 1 puan artınca satır başına değişim (kombine hedef = ortalama → yarısı)
+        row_sales = 0.5 * unit * step
+        row_effects = np.column_stack([row_sales, row_sales * margin, row_sales * stock_per_sales])
+        
+        # Açık hedefi olmayan (veya genel hedefe eşit) ay/gruplar genel büyümeyi izler
+        month_targets, group_targets = self._growth_target_arrays(
+            context, monthly_growth_targets, maingroup_growth_targets, growth_param
+        )
+        growth_weight = np.isclose(month_targets, growth_param).astype(float) + np.isclose(group_targets, growth_param)
+        
+        rows = [('growth', '', 'Genel Büyüme Hedefi', *(row_effects * growth_weight[:, None]).sum(axis=0))]
+        
+        # Marj: GrossMargin% = clip(marj + iyileşme) olduğundan tam fark alınır
+        raised_margin = np.clip(base['GrossMargin%'].to_numpy(dtype=float) + margin_improvement + step, 0, 1)
+        margin_delta = sales * (raised_margin - margin)
+        rows.append(('margin', '', 'Brüt Marj İyileşme', 0.0, margin_delta.sum(),
+                     -(margin_delta * stock_ratio_target).sum() if ratio_mode else 0.0))
+        
+        # Aktif stok parametresi
+        if stock_budget is not None:
+            rows.append(('stock_budget', '', 'Stok Bütçesi (%1)', 0.0, 0.0,
+                         stock_budget['total'] * len(context['months']) * step))
+        elif stock_change_pct is not None:
+            rows.append(('stock_change', '', 'Stok Tutar Değişimi', 0.0, 0.0,
+                         base['Stock'].to_numpy(dtype=float).sum() * step))
         else:
-            # Yöntem 2: ORAN BAZLI HEDEF
-            # 2026 COGS × hedef oran
-            forecast['Stock_2026'] = forecast['COGS_2026'] * stock_ratio_target
+            rows.append(('stock_ratio', '', 'Stok/SMM Oranı', 0.0, 0.0,
+                         forecast['COGS'].to_numpy(dtype=float).sum() * step))
         
-        # Sonuç datasını hazırla
-        result = forecast[['Month', 'MainGroup', 'Sales_2026', 'GrossProfit_2026', 
-                          'GrossMargin%_2026', 'Stock_2026', 'COGS_2026']].copy()
-        result.columns = ['Month', 'MainGroup', 'Sales', 'GrossProfit', 
-                         'GrossMargin%', 'Stock', 'COGS']
-        result['Year'] = 2026
+        # Ay ve ana grup hedefleri: satır etkilerinin ay/grup toplamları
+        for kind, label in (('month', 'Ay {} Hedefi'), ('group', '{} Hedefi')):
+            codes, uniques = context[f'{kind}_codes'], context[f'{kind}s']
+            totals = np.column_stack([np.bincount(codes, weights=row_effects[:, i], minlength=len(uniques)) for i in range(3)])
+            rows.extend((kind, str(k), label.format(k), *total) for k, total in zip(uniques, totals))
         
-        # Stok/COGS oranı
-        result['Stock_COGS_Ratio'] = np.where(
-            result['COGS'] > 0,
-            result['Stock'] / result['COGS'],
-            0
+        sensitivity = pd.DataFrame(rows, columns=['Kind', 'Target', 'Label', 'Sales', 'GrossProfit', 'Stock'])
+        sensitivity.insert(3, 'Step', step)
+        
+        return sensitivity
+    
+    def get_detail_comparison(self, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None, stock_budget=None, horizon=1, formatted=False):
+        """
+        Tüm aylar × ana gruplar için yıl yan yana karşılaştırma tablosu
+        
+        Tek pivot ile (Month, MainGroup) index'li geniş tablo üretilir ve senaryo
+        başına cache'lenir; ay seçimi select_month ile index dilimidir.
+        formatted=True ise gösterim için hazır metin tablo döner.
+        """
+        
+        key = self.scenario_key(growth_param, margin_improvement, stock_ratio_target,
+                                monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget, horizon)
+        
+        def build():
+            full_data = self.get_full_data_with_forecast(growth_param, margin_improvement, stock_ratio_target, monthly_growth_targets, maingroup_growth_targets, stock_change_pct, stock_budget, horizon)
+            return self.build_detail_comparison(full_data)
+        
+        if not formatted:
+            return self.memoize('detail_comparison', key, build)
+        
+        return self.memoize('detail_display', key, lambda: self.format_detail_comparison(
+            self.memoize('detail_comparison', key, build)
+        ))
+    
+    @staticmethod
+    def build_detail_comparison(full_data):
+        """full_data'dan (Month, MainGroup) × (metrik, yıl) geniş tabloyu tek pivotta oluştur"""
+        
+        metric_columns = [source for source, _ in DETAIL_METRICS]
+        
+        # Tek groupby + unstack (tekrarlı satırlarda tutarlar toplanır, marj ortalanır)
+        wide = full_data.groupby(['Month', 'MainGroup', 'Year'], sort=True)[metric_columns].agg(
+            {'Sales': 'sum', 'GrossMargin%': 'mean', 'Stock': 'sum', 'COGS': 'sum'}
+        ).unstack('Year', fill_value=0).fillna(0)
+        
+        years = sorted(wide.columns.get_level_values('Year').unique())
+        
+        # Haftalık normalize Stok/SMM: Stok / ((SMM/gün)*7)
+        days = wide.index.get_level_values('Month').map(DAYS_IN_MONTH).to_numpy(dtype=float)
+        stock = wide['Stock'][years].to_numpy(dtype=float)
+        cogs = wide['COGS'][years].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weekly = np.where(cogs > 0, stock / ((cogs / days[:, None]) * 7), 0)
+        
+        # Yıl yan yana kolon sırası: her yıl için Satış, BM%, Stok, SMM; ardından haftalık oranlar
+        columns = {}
+        for year in years:
+            for source, prefix in DETAIL_METRICS:
+                columns[f'{prefix}_{year}'] = wide[(source, year)].to_numpy(dtype=float)
+        for i, year in enumerate(years):
+            columns[f'Stok/SMM_Haftalık_{year}'] = weekly[:, i]
+        
+        return pd.DataFrame(columns, index=wide.index)
+    
+    @staticmethod
+    def format_detail_comparison(comparison):
+        """Geniş karşılaştırma tablosunu gösterim metnine çevir (metrik gruplu kolon sırası)"""
+        
+        years = sorted({int(col.rsplit('_', 1)[1]) for col in comparison.columns})
+        
+        def money(values):
+            return np.where(values > 0, ['₺' + f'{v:,.0f}' for v in values], '-')
+        
+        def percent(values):
+            return np.where(values > 0, ['%' + f'{v * 100:.1f}' for v in values], '-')
+        
+        def ratio(values):
+            return np.where(values > 0, [f'{v:.2f}' for v in values], '-')
+        
+        formatters = {'Satış': money, 'BM%': percent, 'Stok': money, 'SMM': money}
+        
+        display = {}
+        for _, prefix in DETAIL_METRICS:
+            for year in years:
+                display[f'{prefix} {year}'] = formatters[prefix](comparison[f'{prefix}_{year}'].to_numpy(dtype=float))
+        for year in years:
+            display[f'Stok/SMM Hft. {year}'] = ratio(comparison[f'Stok/SMM_Haftalık_{year}'].to_numpy(dtype=float))
+        
+        return pd.DataFrame(display, index=comparison.index)
+    
+    @staticmethod
+    def select_month(comparison, month):
+        """Karşılaştırma tablosundan tek ayı index dilimi olarak al (MainGroup kolon olur)"""
+        
+        try:
+            rows = comparison.index.get_loc(month)
+        except KeyError:
+            return comparison.iloc[0:0].droplevel('Month').reset_index()
+        
+        return comparison.iloc[rows].droplevel('Month').reset_index()
+    
+    @staticmethod
+    def summarize_years(data, years=None):
+        """
+        Yıl bazında özet istatistikler (yıl indeksli düzenli tablo)
+        
+        Tek geçişte Year üzerinden gruplanır; gün sayıları ay dizisinden bir kez
+        çıkarılır. years verilirse veride olmayan yıllar da satır olarak eklenir
+        (toplamlar 0, ortalamalar NaN).
+        """
+        
+        month = data['Month'].to_numpy(dtype=float)
+        sales = data['Sales'].to_numpy(dtype=float)
+        cogs = data['COGS'].to_numpy(dtype=float)
+        stock = data['Stock'].to_numpy(dtype=float)
+        
+        # Haftalık normalize Stok/SMM: Stok / ((SMM/gün_sayısı)*7); geçersiz ayda gün NaN
+        valid_month = np.isin(month, list(DAYS_IN_MONTH))
+        days = np.where(valid_month, _DAYS_BY_MONTH[np.where(valid_month, month, 0).astype(int)], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weekly = np.where(cogs > 0, stock / ((cogs / days) * 7), 0)
+        
+        frame = pd.DataFrame({
+            'Year': data['Year'].to_numpy(dtype=np.int64),
+            'Sales': sales,
+            'GrossProfit': data['GrossProfit'].to_numpy(dtype=float),
+            'Stock': stock,
+            'Stock_COGS_Ratio': data['Stock_COGS_Ratio'].to_numpy(dtype=float),
+            'Stock_COGS_Weekly': weekly
+        })
+        
+        summary = frame.groupby('Year', sort=True).agg(
+            Total_Sales=('Sales', 'sum'),
+            Total_GrossProfit=('GrossProfit', 'sum'),
+            Avg_Stock=('Stock', 'mean'),
+            Avg_Stock_COGS_Ratio=('Stock_COGS_Ratio', 'mean'),
+            Avg_Stock_COGS_Weekly=('Stock_COGS_Weekly', 'mean')
         )
         
-        return result
+        return BudgetForecaster.complete_summary(summary, years)
     
-    def get_full_data_with_forecast(self, growth_param=0.1, margin_improvement=0.0, stock_ratio_target=1.0, monthly_growth_targets=None, maingroup_growth_targets=None, stock_change_pct=None):
-        """2024, 2025 ve 2026 tahminini birleştir"""
+    @staticmethod
+    def complete_summary(summary, years=None):
+        """
+        Yıl indeksli toplam/ortalama tablosunu özet tablosuna tamamla
         
-        forecast_2026 = self.forecast_2026(growth_param, margin_improvement, stock_ratio_target, monthly_growth_targets, maingroup_growth_targets, stock_change_pct)
+        Eksik yılları ekler ve Avg_GrossMargin% kolonunu toplamlardan hesaplar
+        (summarize_years ve duckdb_backend aynı son adımı paylaşır).
+        """
         
-        # 2024-2025 verisini düzenle
-        historical = self.data[['Month', 'MainGroup', 'Sales', 'GrossProfit', 
-                               'GrossMargin%', 'Stock', 'COGS', 'Stock_COGS_Ratio', 'Year']].copy()
+        if years is not None:
+            summary = summary.reindex(sorted(set(years) | set(summary.index)))
+            summary[['Total_Sales', 'Total_GrossProfit']] = summary[['Total_Sales', 'Total_GrossProfit']].fillna(0.0)
         
-        # Birleştir
-        full_data = pd.concat([historical, forecast_2026], ignore_index=True)
+        total_sales = summary['Total_Sales'].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = np.where(total_sales > 0, summary['Total_GrossProfit'].to_numpy() / total_sales * 100, 0.0)
+        summary.insert(2, 'Avg_GrossMargin%', margin)
         
-        return full_data
+        return summary
     
-    def get_summary_stats(self, data):
-        """Özet istatistikler - Haftalık normalize edilmiş stok/SMM oranı dahil"""
+    def get_summary_stats(self, data, years=SUMMARY_YEARS):
+        """
+        Özet istatistikler - Haftalık normalize edilmiş stok/SMM oranı dahil
         
-        summary = {}
+        {yıl: {metrik: değer}} sözlüğü döner; years'taki yıllar veride olmasa da
+        bulunur, veride olan diğer yıllar da eklenir (bkz. summarize_years).
+        """
         
-        # Aylık gün sayıları
-        days_in_month = {1: 31, 2: 28, 3: 31, 4: 30, 5: 31, 6: 30,
-                         7: 31, 8: 31, 9: 30, 10: 31, 11: 30, 12: 31}
+        if self.engine == 'polars':
+            from polars_engine import summarize_years
+            
+            summary = summarize_years(data, years)
+        else:
+            summary = self.summarize_years(data, years)
+        return {int(year): row for year, row in summary.to_dict(orient='index').items()}
+    
+    @staticmethod
+    def _quality_metrics(sales_2024, sales_2025, present_2024, present_2025, skip_zero=False):
+        """
+        Satır başına (toplam veya ana grup) kalite metrikleri - tek NumPy geçişi
+        
+        sales_*/present_*: satır × ay satış toplamı ve ayda veri olup olmadığı.
+        Büyüme oranları iki yılda da verisi olan aylardan hesaplanır; 3 aydan az ortak
+        ay olan satırlarda metrikler NaN, güven 'Düşük'tür. 2024 satışı sıfır olan ay
+        orijinaldeki gibi inf/NaN büyüme üretir (MAPE inf, tutarlılık NaN → 'Düşük');
+        skip_zero=True ise bu aylar atlanır (grup tablosu: tek boş ay tüm grubu düşürmesin).
+        """
         
-        for year in [2024, 2025, 2026]:
-            year_data = data[data['Year'] == year].copy()
+        valid = present_2024 & present_2025
+        if skip_zero:
+            valid &= sales_2024 != 0
+        months = valid.sum(axis=1)
+        enough = months >= 3
+        n = np.where(months > 0, months, 1)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 2024'ten 2025'e büyüme oranları (geçersiz aylar 0 ağırlıklı)
+            growth = np.where(valid, (sales_2025 - sales_2024) / np.where(valid, sales_2024, 1), 0.0)
+            mean_growth = growth.sum(axis=1) / n
+            growth_std = np.sqrt((np.where(valid, growth - mean_growth[:, None], 0.0) ** 2).sum(axis=1) / n)
             
-            # Haftalık normalize Stok/SMM hesapla
-            # Her ay için: Stok / ((SMM/gün_sayısı)*7)
-            year_data['Days'] = year_data['Month'].map(days_in_month)
-            year_data['Stock_COGS_Weekly'] = np.where(
-                year_data['COGS'] > 0,
-                year_data['Stock'] / ((year_data['COGS'] / year_data['Days']) * 7),
-                0
-            )
+            # 2024-2025 aylık satış korelasyonu (R² benzeri)
+            x = np.where(valid, sales_2024, 0.0)
+            y = np.where(valid, sales_2025, 0.0)
+            dx = np.where(valid, x - (x.sum(axis=1) / n)[:, None], 0.0)
+            dy = np.where(valid, y - (y.sum(axis=1) / n)[:, None], 0.0)
+            correlation = (dx * dy).sum(axis=1) / np.sqrt((dx ** 2).sum(axis=1) * (dy ** 2).sum(axis=1))
             
-            summary[year] = {
-                'Total_Sales': year_data['Sales'].sum(),
-                'Total_GrossProfit': year_data['GrossProfit'].sum(),
-                'Avg_GrossMargin%': (year_data['GrossProfit'].sum() / year_data['Sales'].sum() * 100) if year_data['Sales'].sum() > 0 else 0,
-                'Avg_Stock': year_data['Stock'].mean(),
-                'Avg_Stock_COGS_Ratio': year_data['Stock_COGS_Ratio'].mean(),
-                'Avg_Stock_COGS_Weekly': year_data['Stock_COGS_Weekly'].mean()
-            }
+            mape = (np.abs(growth).sum(axis=1) / n) * 100
         
-        return summary
+        r2_score = np.where(enough, correlation ** 2, np.nan)
+        trend_consistency = np.where(enough, 1 - np.minimum(growth_std, 1.0), np.nan)
+        
+        # Güven seviyesi (NaN karşılaştırmaları False → 'Düşük')
+        confidence = np.where(
+            (r2_score > 0.8) & (trend_consistency > 0.7), 'Yüksek',
+            np.where((r2_score > 0.6) & (trend_consistency > 0.5), 'Orta', 'Düşük')
+        )
+        
+        return {
+            'common_months': months,
+            'r2_score': r2_score,
+            'mape': np.where(enough, mape, np.nan),
+            'trend_consistency': trend_consistency,
+            'confidence_level': confidence,
+            'avg_growth_2024_2025': np.where(enough, mean_growth * 100, np.nan)
+        }
+    
+    @staticmethod
+    def _year_month_matrix(rows, codes, size, year, months=_MONTHS):
+        """
+        Bir yılın satışını (satır kodu × ay) matrisine topla; ayda veri var mı maskesi ile
+        
+        months: matris kolonlarındaki sıralı ay değerleri; listede olmayan aylar (örn.
+        okunamayıp 0 yapılan aylar grup tablosunda) matrise girmez.
+        """
+        
+        month = rows['Month'].to_numpy(dtype=float)
+        column = np.minimum(np.searchsorted(months, month), len(months) - 1)
+        in_year = (rows['Year'].to_numpy() == year) & (months[column] == month)
+        width = len(months)
+        cells = codes[in_year] * width + column[in_year]
+        sales = np.bincount(cells, weights=rows['Sales'].to_numpy(dtype=float)[in_year], minlength=size * width)
+        present = np.bincount(cells, minlength=size * width) > 0
+        return sales.reshape(size, width), present.reshape(size, width)
     
     def get_forecast_quality_metrics(self, data):
         """
@@ -322,14 +1250,15 @@ class BudgetForecaster:
         2024-2025 trendine göre 2026 tahmininin güvenilirliğini değerlendir
         """
         
-        # 2024 ve 2025 verilerini al
-        data_2024 = data[data['Year'] == 2024].groupby('Month')['Sales'].sum().reset_index()
-        data_2025 = data[data['Year'] == 2025].groupby('Month')['Sales'].sum().reset_index()
+        # Tüm gruplar tek satır: aylık toplamlar (bkz. _quality_metrics). Orijinaldeki
+        # groupby('Month') gibi veride geçen her ay değeri (1-12 dışı olsa da) bir kolondur
+        codes = np.zeros(len(data), dtype=np.int64)
+        months = np.union1d(_MONTHS, data['Month'].to_numpy(dtype=float))
+        sales_2024, present_2024 = self._year_month_matrix(data, codes, 1, 2024, months)
+        sales_2025, present_2025 = self._year_month_matrix(data, codes, 1, 2025, months)
+        metrics = self._quality_metrics(sales_2024, sales_2025, present_2024, present_2025)
         
-        # Ortak ayları bul
-        common_months = set(data_2024['Month']) & set(data_2025['Month'])
-        
-        if len(common_months) < 3:
+        if metrics['common_months'][0] < 3:
             # Yeterli veri yok
             return {
                 'r2_score': None,
@@ -338,38 +1267,89 @@ class BudgetForecaster:
                 'confidence_level': 'Düşük'
             }
         
-        # Ortak aylara göre filtrele
-        sales_2024 = data_2024[data_2024['Month'].isin(common_months)].sort_values('Month')['Sales'].values
-        sales_2025 = data_2025[data_2025['Month'].isin(common_months)].sort_values('Month')['Sales'].values
+        return {
+            'r2_score': float(metrics['r2_score'][0]),
+            'mape': float(metrics['mape'][0]),
+            'trend_consistency': float(metrics['trend_consistency'][0]),
+            'confidence_level': str(metrics['confidence_level'][0]),
+            'avg_growth_2024_2025': float(metrics['avg_growth_2024_2025'][0])
+        }
+    
+    def get_group_quality_metrics(self):
+        """
+        Ana grup bazında tahmin güvenilirliği (veri başına bir kez hesaplanır)
         
-        # 2024'ten 2025'e büyüme oranlarını hesapla
-        growth_rates = (sales_2025 - sales_2024) / sales_2024
+        Her ana grup için 2024-2025 aylık satış korelasyonu (r2_score), büyüme oranı
+        tutarlılığı, MAPE, ortalama büyüme ve güven seviyesi; grup × ay matrisleri
+        üzerinde tek vektörel geçiş. Sales_2025 sıralama/önceliklendirme içindir.
+        """
         
-        # Büyüme oranının tutarlılığı (standart sapma)
-        trend_consistency = 1 - min(np.std(growth_rates), 1.0)  # 0-1 arası normalize
+        def build():
+            codes, groups = pd.factorize(self.data['MainGroup'].to_numpy(), sort=True)
+            sales_2024, present_2024 = self._year_month_matrix(self.data, codes, len(groups), 2024)
+            sales_2025, present_2025 = self._year_month_matrix(self.data, codes, len(groups), 2025)
+            
+            metrics = self._quality_metrics(sales_2024, sales_2025, present_2024, present_2025, skip_zero=True)
+            
+            result = pd.DataFrame({'MainGroup': groups, 'Sales_2025': sales_2025.sum(axis=1)})
+            for name, values in metrics.items():
+                result[name] = values
+            return result
         
-        # Basit R² benzeri metrik (2024-2025 arası korelasyon)
-        if len(sales_2024) > 1:
-            correlation = np.corrcoef(sales_2024, sales_2025)[0, 1]
-            r2_score = correlation ** 2
-        else:
-            r2_score = 0.5
+        return self.memoize('group_quality', None, build)
+
+
+class ForecastSnapshot(BudgetForecaster):
+    """
+    Değiştirilemez, thread-safe forecaster
+    
+    Temizlenmiş veri salt okunur dizilerle dondurulur, tahmin bağlamı (mevsimsellik,
+    organik trend) oluşturulurken hesaplanır ve sonrasında hiçbir alan değiştirilemez.
+    data okumaları kopya değil görünüm döner; senaryo cache'i kilitle korunur.
+    Bu sayede tek bir örnek st.cache_resource ile tüm oturumlara paylaştırılabilir.
+    """
+    
+    # Donduktan sonra da güncellenebilen alanlar (cache sayaçları kilit altında artar)
+    _mutable_attributes = ('cache_hits', 'cache_misses')
+    
+    def __init__(self, source=None, cache_size=32, dtype_backend='numpy', data=None, schema=None, source_format=None, engine='pandas', winsorize=False, issues=None, cache_bytes=None):
+        object.__setattr__(self, '_frozen', False)
         
-        # MAPE (Mean Absolute Percentage Error) - 2024'ten 2025'i tahmin edersek
-        mape = np.mean(np.abs(growth_rates)) * 100  # Yüzde olarak
+        # Kaynak dosyadan geliyorsa önce normal forecaster ile temizle (Aralık tamamlama dahil)
+        if data is None:
+            source = BudgetForecaster(source, dtype_backend=dtype_backend, schema=schema, source_format=source_format, engine=engine)
+            data, issues = source.data, source.issues
         
-        # Güven seviyesi belirleme
-        if r2_score > 0.8 and trend_consistency > 0.7:
-            confidence = 'Yüksek'
-        elif r2_score > 0.6 and trend_consistency > 0.5:
-            confidence = 'Orta'
-        else:
-            confidence = 'Düşük'
+        super().__init__(cache_size=cache_size, dtype_backend=dtype_backend, data=data, schema=schema, engine=engine,
+                         winsorize=winsorize, issues=issues, cache_bytes=cache_bytes)
         
-        return {
-            'r2_score': r2_score,
-            'mape': mape,
-            'trend_consistency': trend_consistency,
-            'confidence_level': confidence,
-            'avg_growth_2024_2025': np.mean(growth_rates) * 100
-        }
+        self.get_forecast_context()
+        object.__setattr__(self, '_frozen', True)
+    
+    @property
+    def data(self):
+        return self._data.copy(deep=False)
+    
+    @data.setter
+    def data(self, value):
+        if self._frozen:
+            raise AttributeError("ForecastSnapshot değiştirilemez: data atanamaz")
+        object.__setattr__(self, '_data', _read_only_frame(value))
+    
+    def append_actuals(self, rows):
+        raise AttributeError("ForecastSnapshot değiştirilemez: append_actuals ile güncellenmiş bir "
+                             "BudgetForecaster'dan yeni snapshot üretin")
+    
+    def __setattr__(self, name, value):
+        if self._frozen and name not in self._mutable_attributes:
+            raise AttributeError(f"ForecastSnapshot değiştirilemez: {name} atanamaz")
+        object.__setattr__(self, name, value)
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"ForecastSnapshot değiştirilemez: {name} silinemez")
+
+
+# Bellekteki veri setleri ve cache boyutu yalnızca metrikler okunurken hesaplanır
+metrics.RESIDENT_DATASETS.set_function(lambda: len(_FORECASTERS))
+metrics.RESIDENT_DATASET_BYTES.set_function(lambda: sum(f.resident_bytes() for f in list(_FORECASTERS)))
+metrics.CACHE_ENTRIES.set_function(lambda: sum(f.cache_info()['size'] for f in list(_FORECASTERS)))
@@ -0,0 +1,236 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.express as px
+
+# Bu yıl ve sonrası tahmin olarak (kesikli çizgi) gösterilir
+FIRST_FORECAST_YEAR = 2026
+
+# plotly (özellikle plotly.express şablon uygulaması) thread-safe değil; eşzamanlı
+# oturumlar figürleri aynı anda kurarken geçersiz özellik hataları alabiliyor
+_FIGURE_LOCK = threading.Lock()
+
+
+def top_n_indices(values, n):
+    """En büyük n değerin indekslerini (büyükten küçüğe) argpartition ile bul"""
+    
+    values = np.asarray(values, dtype=float)
+    if n <= 0 or len(values) == 0:
+        return np.array([], dtype=int)
+    
+    if n < len(values):
+        candidates = np.argpartition(-values, n - 1)[:n]
+    else:
+        candidates = np.arange(len(values))
+    
+    return candidates[np.argsort(-values[candidates], kind='stable')]
+
+
+def monthly_totals(full_data):
+    """Yıl × Ay bazında toplam satış, brüt kar ve brüt marj %"""
+    
+    totals = full_data.groupby(['Year', 'Month'], sort=True)[['Sales', 'GrossProfit']].sum().reset_index()
+    
+    sales = totals['Sales'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        totals['Margin%'] = np.where(sales > 0, totals['GrossProfit'].to_numpy(dtype=float) / sales * 100, 0)
+    
+    return totals
+
+
+def group_year_sales(full_data):
+    """MainGroup × Yıl satış matrisi"""
+    return full_data.groupby(['MainGroup', 'Year'], sort=True)['Sales'].sum().unstack('Year', fill_value=0)
+
+
+def _year_label(year, first_forecast_year):
+    return f'{year}' + (' (Tahmin)' if year >= first_forecast_year else '')
+
+
+def monthly_sales_figure(totals, first_forecast_year=FIRST_FORECAST_YEAR):
+    """Aylık satış karşılaştırma grafiği"""
+    
+    fig = go.Figure()
+    
+    for year, year_data in totals.groupby('Year', sort=True):
+        is_forecast = year >= first_forecast_year
+        
+        fig.add_trace(go.Scatter(
+            x=year_data['Month'].to_numpy(dtype=int),
+            y=year_data['Sales'].to_numpy(dtype=float),
+            name=_year_label(year, first_forecast_year),
+            mode='lines+markers',
+            line=dict(dash='dash' if is_forecast else 'solid', width=3 if is_forecast else 2),
+            marker=dict(size=8)
+        ))
+    
+    fig.update_layout(
+        title="Aylık Satış Karşılaştırması",
+        xaxis_title="Ay",
+        yaxis_title="Satış (TRY)",
+        hovermode='x unified',
+        height=500
+    )
+    
+    return fig
+
+
+def monthly_margin_figure(totals, first_forecast_year=FIRST_FORECAST_YEAR):
+    """Aylık brüt marj % karşılaştırma grafiği"""
+    
+    fig = go.Figure()
+    
+    for year, year_data in totals.groupby('Year', sort=True):
+        fig.add_trace(go.Scatter(
+            x=year_data['Month'].to_numpy(dtype=int),
+            y=year_data['Margin%'].to_numpy(dtype=float),
+            name=_year_label(year, first_forecast_year),
+            mode='lines+markers',
+            line=dict(dash='dash' if year >= first_forecast_year else 'solid'),
+            marker=dict(size=8)
+        ))
+    
+    fig.update_layout(
+        title="Aylık Brüt Marj % Karşılaştırması",
+        xaxis_title="Ay",
+        yaxis_title="Brüt Marj %",
+        hovermode='x unified',
+        height=500
+    )
+    
+    return fig
+
+
+def top_groups_figure(group_sales, top_n=10):
+    """Son yıla göre top N ana grubun yıllık satış karşılaştırması"""
+    
+    last_year = group_sales.columns.max()
+    top = group_sales.iloc[top_n_indices(group_sales[last_year].to_numpy(), top_n)]
+    
+    # Sadece seçilen grupları uzun formata çevir
+    top_long = top.reset_index().melt(id_vars='MainGroup', var_name='Year', value_name='Sales')
+    
+    fig = px.bar(
+        top_long,
+        x='MainGroup',
+        y='Sales',
+        color='Year',
+        barmode='group',
+        title=f'Top {top_n} Ana Grup - Yıllık Satış Karşılaştırması'
+    )
+    
+    fig.update_layout(height=500, xaxis_tickangle=-45)
+    return fig
+
+
+def group_growth_figure(group_sales, top_n=15):
+    """Son iki yıl arasında en hızlı büyüyen top N ana grup"""
+    
+    previous_year, last_year = sorted(group_sales.columns)[-2:]
+    previous = group_sales[previous_year].to_numpy(dtype=float)
+    current = group_sales[last_year].to_numpy(dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+    
+    valid = np.flatnonzero(np.isfinite(growth))
+    selected = valid[top_n_indices(growth[valid], top_n)]
+    
+    growth_analysis = pd.DataFrame({
+        'MainGroup': group_sales.index.to_numpy()[selected],
+        'Growth%': growth[selected]
+    })
+    
+    fig = px.bar(
+        growth_analysis,
+        x='MainGroup',
+        y='Growth%',
+        title=f'Top {top_n} Ana Grup - Büyüme Oranı ({previous_year} → {last_year})',
+        color='Growth%',
+        color_continuous_scale='RdYlGn'
+    )
+    
+    fig.update_layout(height=500, xaxis_tickangle=-45)
+    return fig
+
+
+def tornado_figure(sensitivity, metric='Sales', top_n=15):
+    """
+    Parametre duyarlılıklarının tornado grafiği (mutlak etkiye göre top N)
+    
+    Etkiler hedeflerde doğrusal olduğundan -adım etkisi +adım etkisinin tersidir
+    (marjın 0-1 sınırına dayandığı satırlarda yaklaşık).
+    """
+    
+    effects = sensitivity[metric].to_numpy(dtype=float)
+    
+    # En büyük etki en üstte: plotly yatay çubukları aşağıdan yukarı çizer
+    selected = top_n_indices(np.abs(effects), top_n)[::-1]
+    labels = sensitivity['Label'].to_numpy()[selected]
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=labels, x=-effects[selected], orientation='h',
+        name='Azalış (-1 puan)', marker_color='#d62728'
+    ))
+    fig.add_trace(go.Bar(
+        y=labels, x=effects[selected], orientation='h',
+        name='Artış (+1 puan)', marker_color='#2ca02c'
+    ))
+    
+    fig.update_layout(
+        title=f'En Etkili {len(selected)} Parametre - 2026 Toplam Değişim',
+        barmode='relative',
+        height=max(400, 30 * len(selected) + 150),
+        xaxis_title='2026 toplam değişim (₺)',
+        hovermode='y unified'
+    )
+    return fig
+
+
+def get_tornado_spec(forecaster, scenario, metric='Sales', top_n=15):
+    """Senaryonun tornado figür spec'ini senaryo cache'inden getir (bkz. get_sensitivity)"""
+    
+    key = (forecaster.scenario_key(**scenario), metric, top_n)
+    
+    def build():
+        sensitivity = forecaster.get_sensitivity(**scenario)
+        with _FIGURE_LOCK:
+            return tornado_figure(sensitivity, metric, top_n).to_dict()
+    
+    return forecaster.memoize('tornado_spec', key, build)
+
+
+def build_chart_specs(full_data, top_n=10, growth_top_n=15, first_forecast_year=FIRST_FORECAST_YEAR):
+    """Aylık trend ve ana grup sekmelerinin figür spec'lerini (dict) oluştur"""
+    
+    totals = monthly_totals(full_data)
+    group_sales = group_year_sales(full_data)
+    
+    with _FIGURE_LOCK:
+        figures = {
+            'monthly_sales': monthly_sales_figure(totals, first_forecast_year),
+            'monthly_margin': monthly_margin_figure(totals, first_forecast_year),
+            'top_groups': top_groups_figure(group_sales, top_n),
+            'group_growth': group_growth_figure(group_sales, growth_top_n),
+        }
+        
+        return {name: fig.to_dict() for name, fig in figures.items()}
+
+
+def get_chart_specs(forecaster, scenario, top_n=10, growth_top_n=15, first_forecast_year=FIRST_FORECAST_YEAR):
+    """
+    Senaryonun figür spec'lerini forecaster'ın senaryo cache'inden getir
+    
+    Spec'ler senaryo anahtarı ve grafik ayarlarıyla cache'lenir; aynı senaryoya
+    dönüldüğünde figürler yeniden oluşturulmaz. Dönen dict'ler değiştirilmemelidir.
+    """
+    
+    key = (forecaster.scenario_key(**scenario), top_n, growth_top_n, first_forecast_year)
+    
+    return forecaster.memoize('chart_specs', key, lambda: build_chart_specs(
+        forecaster.get_full_data_with_forecast(**scenario),
+        top_n, growth_top_n, first_forecast_year
+    ))
@@ -0,0 +1,189 @@
+"""
+Kaynak veri okuyucuları ve şema eşlemesi
+
+Kaynak dosyadaki kolon adları bildirimsel bir şema ile standart alanlara
+(Sales, GrossProfit, GrossMargin%, Stock) yıl bazında eşlenir. Excel, CSV ve
+Parquet aynı read_source arayüzüyle okunur; yalnızca şemadaki kolonlar okunur.
+
+Şema JSON dosyasından da yüklenebilir (bkz. load_schema):
+    
+    {
+        "month": "Month",
+        "group": "MainGroupDesc",
+        "years": {
+            "2024": {"Sales": "Satis_2024", "GrossProfit": "BrutKar_2024",
+                     "GrossMargin%": "BrutMarj_2024", "Stock": "Stok_2024"},
+            "2025": {...}
+        },
+        "csv": {"sep": ";", "decimal": ","}
+    }
+"""
+import copy
+import json
+import os
+
+import pandas as pd
+
+# Her yıl için eşlenmesi gereken standart alanlar (process_data bu sırayla okur)
+SCHEMA_METRICS = ('Sales', 'GrossProfit', 'GrossMargin%', 'Stock')
+
+# Varsayılan şema: mevcut Excel düzeni (Sayfa1, başlık 2. satır, 2025 kolonları '.1' ekli)
+DEFAULT_SCHEMA = {
+    'month': 'Month',
+    'group': 'MainGroupDesc',
+    'years': {
+        2024: {
+            'Sales': 'TY Sales Value TRY2',             # Kolon J - Gerçek satış
+            'GrossProfit': 'TY Gross Profit TRY2',      # Kolon H - Brüt kar
+            'GrossMargin%': 'TY Gross Marjin TRY%',     # Kolon K - Brüt marj %
+            'Stock': 'TY Avg Store Stock Cost TRY2'     # Kolon I - Stok
+        },
+        2025: {
+            'Sales': 'TY Sales Value TRY2.1',           # Kolon S - Gerçek satış
+            'GrossProfit': 'TY Gross Profit TRY2.1',    # Kolon Q - Brüt kar
+            'GrossMargin%': 'TY Gross Marjin TRY%.1',   # Kolon T - Brüt marj %
+            'Stock': 'TY Avg Store Stock Cost TRY2.1'   # Kolon R - Stok
+        }
+    },
+    # Okuyucu seçenekleri (pandas okuyucusuna olduğu gibi geçirilir)
+    'excel': {'sheet_name': 'Sayfa1', 'header': 1},
+    'csv': {}
+}
+
+# Hedef dosyası kolonları (arayüzdeki hedef tablosunun indirilen hali de bu düzendedir)
+TARGET_GROUP_COLUMN = 'Ana Grup'
+TARGET_VALUE_COLUMN = 'Hedef (%)'
+
+# Dosya uzantısı → kaynak formatı
+SOURCE_FORMATS = {
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet'
+}
+
+
+def validate_schema(schema):
+    """Şemayı kontrol et; yıl anahtarlarını int'e çevrilmiş kopya döndür"""
+    
+    for key in ('month', 'group', 'years'):
+        if key not in schema:
+            raise ValueError(f"Şemada '{key}' alanı eksik")
+    
+    if not schema['years']:
+        raise ValueError("Şemada en az bir yıl eşlemesi olmalı")
+    
+    schema = copy.deepcopy(schema)
+    years = {}
+    for year, mapping in schema['years'].items():
+        missing = [metric for metric in SCHEMA_METRICS if metric not in mapping]
+        if missing:
+            raise ValueError(f"{year} yılı eşlemesinde eksik alan(lar): {missing}")
+        years[int(year)] = mapping
+    schema['years'] = years
+    
+    return schema
+
+
+def load_schema(path):
+    """JSON şema dosyasını oku; verilmeyen okuyucu seçenekleri varsayılandan alınır"""
+    
+    with open(path, encoding='utf-8') as f:
+        schema = json.load(f)
+    
+    for reader in ('excel', 'csv'):
+        schema.setdefault(reader, DEFAULT_SCHEMA[reader])
+    
+    return validate_schema(schema)
+
+
+def schema_columns(schema):
+    """Şemanın okuduğu kaynak kolonlar (sıra korunur, tekrarsız)"""
+    
+    columns = [schema['month'], schema['group']]
+    for mapping in schema['years'].values():
+        columns.extend(mapping[metric] for metric in SCHEMA_METRICS)
+    
+    return list(dict.fromkeys(columns))
+
+
+def detect_format(path):
+    """Dosya uzantısından kaynak formatını bul"""
+    
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in SOURCE_FORMATS:
+        raise ValueError(f"Desteklenmeyen dosya türü: '{extension}' "
+                         f"(desteklenenler: {', '.join(sorted(SOURCE_FORMATS))})")
+    
+    return SOURCE_FORMATS[extension]
+
+
+def read_source(source, schema=DEFAULT_SCHEMA, source_format=None):
+    """
+    Kaynak dosyayı yalnızca şemadaki kolonlarla oku (ham, temizlenmemiş tablo)
+    
+    source: dosya yolu veya dosya benzeri nesne (dosya benzeri ise source_format zorunlu)
+    source_format: 'excel', 'csv' veya 'parquet'; None ise uzantıdan bulunur
+    """
+    
+    source_format = source_format or detect_format(source)
+    columns = schema_columns(schema)
+    wanted = set(columns)
+    
+    # Excel/CSV'de tekrarlanan başlıklar ('.1' ekli) filtrelemeden önce adlandırılır
+    if source_format == 'excel':
+        df = pd.read_excel(source, usecols=lambda name: name in wanted, **schema.get('excel', {}))
+    elif source_format == 'csv':
+        df = pd.read_csv(source, usecols=lambda name: name in wanted, **schema.get('csv', {}))
+    elif source_format == 'parquet':
+        df = pd.read_parquet(source, columns=columns)
+    else:
+        raise ValueError(f"Bilinmeyen kaynak formatı: {source_format}")
+    
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"Kaynakta şemadaki kolon(lar) bulunamadı: {missing}")
+    
+    return df[columns]
+
+
+def read_targets(source, source_format=None):
+    """
+    Ana grup büyüme hedefleri dosyasını oku (CSV/Excel/Parquet)
+    
+    Dosyada 'Ana Grup' ve 'Hedef (%)' kolonları olmalı; hedefler yüzde olarak
+    yazılır (15 = %15). Boş hedefler atlanır. Ana grup indeksli, oran (0.15)
+    değerli pd.Series döner.
+    """
+    
+    source_format = source_format or detect_format(source)
+    columns = [TARGET_GROUP_COLUMN, TARGET_VALUE_COLUMN]
+    
+    # CSV ayracı Excel'in bölgesel ayarına göre ',' veya ';' olabildiği için tahmin edilir
+    if source_format == 'excel':
+        df = pd.read_excel(source)
+    elif source_format == 'csv':
+        df = pd.read_csv(source, sep=None, engine='python', encoding='utf-8-sig')
+    elif source_format == 'parquet':
+        df = pd.read_parquet(source)
+    else:
+        raise ValueError(f"Bilinmeyen kaynak formatı: {source_format}")
+    
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"Hedef dosyasında kolon(lar) bulunamadı: {missing}")
+    
+    groups = df[TARGET_GROUP_COLUMN].astype(str).str.strip()
+    values = pd.to_numeric(df[TARGET_VALUE_COLUMN], errors='coerce')
+    
+    invalid = groups[values.isna() & df[TARGET_VALUE_COLUMN].notna()]
+    if len(invalid):
+        raise ValueError(f"Sayısal olmayan hedef(ler): {invalid.tolist()[:10]}")
+    
+    duplicated = groups[groups.duplicated()]
+    if len(duplicated):
+        raise ValueError(f"Tekrarlanan ana grup(lar): {duplicated.unique().tolist()[:10]}")
+    
+    targets = pd.Series(values.to_numpy(dtype=float) / 100, index=groups.to_numpy(), name='Target')
+    return targets[targets.notna()]
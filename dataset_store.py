@@ -0,0 +1,135 @@
+"""
+Temizlenmiş veri için memory-mapped kolonsal depo
+
+BudgetForecaster.data bir kez Arrow IPC (sıkıştırmasız) dosyasına yazılır; tüm
+Streamlit oturumları ve worker süreçleri aynı dosyayı memory-map ile açar.
+Kolonlar dosya sayfalarını doğrudan gösterir, böylece veri işletim sisteminin
+page cache'inde tek kopya olarak paylaşılır.
+
+Dosya adı içerik anahtarına ek olarak depo sürümünü taşır; temizlik mantığı veya
+kolon şeması değişince STORE_VERSION artırılır ve eski temiz veri yeniden kullanılmaz.
+prune_store eski sürüm dosyalarını siler ve depoyu boyut sınırında tutar (en uzun
+süredir açılmayan dosyalar önce düşer).
+"""
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+# Varsayılan depo klasörü (aynı makinedeki tüm süreçler paylaşır)
+DEFAULT_STORE_DIR = os.path.join(tempfile.gettempdir(), 'budget_forecast_store')
+
+# Depo biçimi sürümü: process_data / kolon şeması / metadata değişince artırılır
+STORE_VERSION = 2
+
+# Depo boyut sınırı (byte); prune_store bunu aşan en eski dosyaları siler
+MAX_STORE_BYTES = 2 * 1024 ** 3
+
+# Doğrulama raporunun şema metadata anahtarı
+ISSUES_METADATA_KEY = b'budget_forecast.issues'
+
+
+def dataset_path(key, store_dir=DEFAULT_STORE_DIR):
+    """Veri seti anahtarı (örn. dosya içerik hash'i) ve depo sürümü için depo dosya yolu"""
+    return os.path.join(store_dir, f'{key}.v{STORE_VERSION}.arrow')
+
+
+def prune_store(store_dir=DEFAULT_STORE_DIR, max_bytes=MAX_STORE_BYTES, keep=()):
+    """
+    Eski sürüm dosyalarını sil, kalanları en eski kullanılandan başlayarak max_bytes'a indir
+
+    Kullanım zamanı dosyanın mtime'ıdır (open_dataset günceller). keep'teki yollar
+    silinmez. Açık memory-map'ler silinen dosyada geçerli kalır (POSIX); silinemeyen
+    dosyalar (örn. Windows'ta açık) atlanır. Silinen dosya yollarını döndürür.
+    """
+    if not os.path.isdir(store_dir):
+        return []
+
+    suffix = f'.v{STORE_VERSION}.arrow'
+    keep = {os.path.abspath(path) for path in keep}
+    stale, current = [], []
+    for entry in os.scandir(store_dir):
+        if not entry.is_file() or not entry.name.endswith('.arrow') or os.path.abspath(entry.path) in keep:
+            continue
+        if entry.name.endswith(suffix):
+            stat = entry.stat()
+            current.append((stat.st_mtime, stat.st_size, entry.path))
+        else:
+            stale.append(entry.path)
+
+    total = sum(size for _, size, _ in current) + sum(os.path.getsize(path) for path in keep if os.path.exists(path))
+    for _, size, path in sorted(current):
+        if total <= max_bytes:
+            break
+        stale.append(path)
+        total -= size
+
+    removed = []
+    for path in stale:
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        removed.append(path)
+
+    return removed
+
+
+def write_dataset(data, path, issues=None):
+    """
+    DataFrame'i Arrow IPC dosyasına yaz (atomik: önce geçici dosya, sonra rename)
+
+    Sıkıştırma kullanılmaz; sıkıştırılmış buffer'lar memory-map ile kopyasız okunamaz.
+    issues (yükleme doğrulama raporu, bkz. validation) şema metadata'sında saklanır.
+    """
+    import pyarrow as pa
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    if issues is not None:
+        metadata = dict(table.schema.metadata or {})
+        metadata[ISSUES_METADATA_KEY] = json.dumps(issues.to_dict('records'), ensure_ascii=False).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return path
+
+
+def open_dataset(path):
+    """Arrow IPC dosyasını memory-map ile kopyasız aç (Arrow-backed DataFrame döner)"""
+    import pyarrow as pa
+
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+
+    # Kullanım zamanı (prune_store en eski kullanılanları siler)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def read_issues(path):
+    """write_dataset ile saklanan doğrulama raporu (yoksa None)"""
+    import pyarrow as pa
+    from validation import ISSUE_COLUMNS
+
+    with pa.memory_map(path, 'r') as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    if ISSUES_METADATA_KEY not in metadata:
+        return None
+    return pd.DataFrame(json.loads(metadata[ISSUES_METADATA_KEY]), columns=ISSUE_COLUMNS)
@@ -0,0 +1,247 @@
+"""
+DuckDB ile disk üzerinde (out-of-core) toplama backend'i
+
+Mağaza × ürün gibi pandas'a rahat sığmayan Parquet dökümlerinde process_data
+temizliği, Aralık tahmini, mevsimsellik, trend, momentum ve yıllık özet gömülü
+bir DuckDB'de SQL olarak çalışır; Python'a yalnızca küçük sonuç tabloları döner.
+Temizlenmiş veri DuckDB tablosunda kalır ve bellek limiti aşılırsa geçici
+klasöre taşar (database bir dosya yolu ise doğrudan diskte tutulur).
+
+Sonuçlar BudgetForecaster'ın pandas yolu ile aynıdır (kayan nokta toplama
+sırası dışında); kolon adları ve sıralama birebir korunur.
+
+duckdb opsiyonel bir bağımlılıktır (pip install duckdb). Parquet okuyucu
+pakete gömülüdür; eklenti indirmesi kapatılır, bağlantı tamamen çevrimdışı çalışır.
+
+Kullanım:
+    
+    aggregates = DuckDBAggregates('dokum/*.parquet', memory_limit='4GB')
+    seasonality = aggregates.calculate_seasonality()
+    summary = aggregates.get_summary_stats()
+"""
+import numpy as np
+
+from budget_forecast import BudgetForecaster, DAYS_IN_MONTH, HISTORY_YEARS, RECENT_MONTHS, SUMMARY_YEARS
+from data_sources import DEFAULT_SCHEMA, SCHEMA_METRICS, validate_schema
+
+# Temizlenmiş tablonun kolonları (BudgetForecaster.data ile aynı sıra)
+CLEAN_COLUMNS = ['Month', 'MainGroup', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'Year',
+                 'COGS', 'Stock_COGS_Ratio']
+
+
+def _identifier(name):
+    """SQL kolon adı (çift tırnaklı, kaçışlı)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value):
+    """SQL metin sabiti (tek tırnaklı, kaçışlı)"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _number(column):
+    """Sayısal kolon: NULL ve NaN 0 olur (pandas fillna(0) karşılığı)"""
+    return f"COALESCE(NULLIF(CAST({_identifier(column)} AS DOUBLE), 'NaN'::DOUBLE), 0)"
+
+
+class DuckDBAggregates:
+    def __init__(self, source, schema=None, database=':memory:', memory_limit=None, temp_directory=None, threads=None):
+        """
+        Parquet kaynak(lar)ını temizleyip DuckDB tablosuna yükle
+        
+        source: Parquet dosya yolu, glob deseni ('dokum/*.parquet') veya yol listesi
+        schema: kaynak kolon eşlemesi (varsayılan: data_sources.DEFAULT_SCHEMA)
+        database: ':memory:' veya DuckDB dosya yolu (temiz tablo diskte tutulur)
+        memory_limit: DuckDB bellek limiti (örn. '4GB'); aşılırsa temp_directory'ye taşar
+        threads: DuckDB thread sayısı (None: tüm çekirdekler)
+        """
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("DuckDB backend'i için 'duckdb' paketi gerekli (pip install duckdb)") from e
+        
+        self.schema = validate_schema(schema) if schema is not None else DEFAULT_SCHEMA
+        self.source = source
+        
+        # Çevrimdışı: bilinen eklentileri otomatik indirme/yükleme kapalı
+        self.connection = duckdb.connect(database, config={
+            'autoinstall_known_extensions': False,
+            'autoload_known_extensions': False
+        })
+        if memory_limit is not None:
+            self.connection.execute(f"SET memory_limit = {_literal(memory_limit)}")
+        if temp_directory is not None:
+            self.connection.execute(f"SET temp_directory = {_literal(temp_directory)}")
+        if threads is not None:
+            self.connection.execute(f"SET threads = {int(threads)}")
+        
+        self.december_filled = False
+        self.process_data()
+    
+    def _source_sql(self):
+        """read_parquet çağrısı (tek yol, glob veya yol listesi)"""
+        if isinstance(self.source, (list, tuple)):
+            paths = '[' + ', '.join(_literal(path) for path in self.source) + ']'
+        else:
+            paths = _literal(self.source)
+        return f"read_parquet({paths})"
+    
+    def process_data(self):
+        """Veriyi yıl bazında ayrıştır, temizle ve 'clean' tablosuna yaz (bkz. BudgetForecaster.process_data)"""
+        
+        month = _identifier(self.schema['month'])
+        group = _identifier(self.schema['group'])
+        
+        # Her yıl için eşlenen kolonları standart adlara çevir; toplam satırları ve
+        # ana grubu boş satırlar atılır, sayısal boşluklar 0 olur
+        selects = []
+        for year, mapping in self.schema['years'].items():
+            metrics = ', '.join(
+                f"{_number(mapping[metric])} AS {_identifier(metric)}" for metric in SCHEMA_METRICS
+            )
+            selects.append(
+                f"SELECT TRY_CAST({month} AS DOUBLE) AS Month, CAST({group} AS VARCHAR) AS MainGroup, "
+                f"{metrics}, {int(year)}::BIGINT AS Year FROM source "
+                f"WHERE NOT COALESCE(CAST({month} AS VARCHAR) LIKE '%Toplam%', false) AND {group} IS NOT NULL"
+            )
+        
+        self.connection.execute(f"""
+            CREATE OR REPLACE TABLE clean AS
+            WITH source AS (SELECT * FROM {self._source_sql()}),
+            years AS ({' UNION ALL '.join(selects)})
+            SELECT *, Sales - GrossProfit AS COGS,
+                   CASE WHEN Sales - GrossProfit > 0 THEN Stock / (Sales - GrossProfit) ELSE 0 END AS Stock_COGS_Ratio
+            FROM years
+        """)
+        
+        # pd.to_numeric gibi: tüm aylar sayıya çevrilebilen tam sayılarsa Month tam sayı
+        # tipinde tutulur; çevrilemeyen aylar 0 olur (pandas'ta NaN → fillna(0))
+        integral, = self.connection.execute(
+            "SELECT COALESCE(bool_and(Month IS NOT NULL AND Month = floor(Month)), true) FROM clean"
+        ).fetchone()
+        if integral:
+            self.connection.execute("ALTER TABLE clean ALTER Month TYPE BIGINT")
+        else:
+            self.connection.execute("UPDATE clean SET Month = 0 WHERE Month IS NULL")
+        
+        self._fill_missing_december()
+    
+    def _fill_missing_december(self):
+        """Son gerçekleşme yılının Aralık ayı eksik veya sıfırsa Kasım × 1.12 ile tahmin et"""
+        
+        year = HISTORY_YEARS[-1]
+        december_rows, december_sales, november_rows = self.connection.execute(f"""
+            SELECT COUNT(*) FILTER (WHERE Month = 12), COALESCE(SUM(Sales) FILTER (WHERE Month = 12), 0),
+                   COUNT(*) FILTER (WHERE Month = 11)
+            FROM clean WHERE Year = {year}
+        """).fetchone()
+        
+        if (december_rows == 0 or december_sales < 1000000) and november_rows > 0:
+            self.connection.execute(f"DELETE FROM clean WHERE Year = {year} AND Month = 12")
+            self.connection.execute(f"""
+                INSERT INTO clean BY NAME
+                SELECT 12 AS Month, MainGroup, Sales * 1.12 AS Sales, GrossProfit * 1.12 AS GrossProfit,
+                       "GrossMargin%", Stock * 1.05 AS Stock, Year, COGS * 1.12 AS COGS, Stock_COGS_Ratio
+                FROM clean WHERE Year = {year} AND Month = 11
+            """)
+            self.december_filled = True
+            
+            print("📅 2025 Aralık ayı tahmini eklendi (Kasım × 1.12)")
+    
+    def query(self, sql):
+        """Temiz tablo ('clean') üzerinde SQL çalıştır, sonucu pandas DataFrame olarak döndür"""
+        return self.connection.execute(sql).df()
+    
+    def fetch_data(self):
+        """Temizlenmiş tablonun tamamını pandas'a al (BudgetForecaster(data=...) için; büyük dökümde pahalı)"""
+        columns = ', '.join(_identifier(column) for column in CLEAN_COLUMNS)
+        return self.query(f"SELECT {columns} FROM clean ORDER BY Year, Month, MainGroup")
+    
+    def calculate_seasonality(self):
+        """Her ay için mevsimsellik indeksi hesapla (ana grup × ay)"""
+        
+        # Grup × ay ortalaması / grubun tüm satırlarının ortalaması
+        return self.query("""
+            WITH group_month AS (
+                SELECT MainGroup, Month, SUM(Sales) / COUNT(*) AS AvgSales
+                FROM clean GROUP BY MainGroup, Month
+            ),
+            yearly AS (
+                SELECT MainGroup, SUM(Sales) / COUNT(*) AS YearlyAvg FROM clean GROUP BY MainGroup
+            )
+            SELECT MainGroup, Month,
+                   CASE WHEN YearlyAvg > 0 THEN AvgSales / YearlyAvg ELSE 1 END AS SeasonalityIndex
+            FROM group_month JOIN yearly USING (MainGroup)
+            ORDER BY MainGroup, Month
+        """)
+    
+    def calculate_trend(self):
+        """Her grup için trend hesapla (2024->2025 büyümesi; iki yılda da olan gruplar)"""
+        
+        previous, current = HISTORY_YEARS[-2:]
+        return self.query(f"""
+            WITH totals AS (
+                SELECT MainGroup,
+                       SUM(Sales) FILTER (WHERE Year = {previous}) AS previous,
+                       SUM(Sales) FILTER (WHERE Year = {current}) AS current
+                FROM clean WHERE Year IN ({previous}, {current}) GROUP BY MainGroup
+            )
+            SELECT MainGroup,
+                   CASE WHEN previous > 0 THEN (current - previous) / previous ELSE 0 END AS GrowthRate
+            FROM totals WHERE previous IS NOT NULL AND current IS NOT NULL
+            ORDER BY MainGroup
+        """)
+    
+    def calculate_recent_momentum(self):
+        """Son 3 ayın momentumunu hesapla (son aylarda veri yoksa yılın tamamı)"""
+        
+        year = HISTORY_YEARS[-1]
+        months = ', '.join(str(month) for month in RECENT_MONTHS)
+        stats = self.query(f"""
+            SELECT MainGroup, SUM(Sales) AS overall_sum, COUNT(*) AS overall_count,
+                   COALESCE(SUM(Sales) FILTER (WHERE Month IN ({months})), 0) AS recent_sum,
+                   COUNT(*) FILTER (WHERE Month IN ({months})) AS recent_count
+            FROM clean WHERE Year = {year} GROUP BY MainGroup
+            ORDER BY MainGroup
+        """)
+        
+        # Grup başına tek satır: oranlar pandas yolundaki gibi toplam / adet ile hesaplanır
+        overall = stats['overall_sum'].to_numpy(dtype=float) / stats['overall_count'].to_numpy(dtype=float)
+        if stats['recent_count'].sum() == 0:
+            recent = overall
+        else:
+            stats = stats[stats['recent_count'] > 0].reset_index(drop=True)
+            overall = stats['overall_sum'].to_numpy(dtype=float) / stats['overall_count'].to_numpy(dtype=float)
+            recent = stats['recent_sum'].to_numpy(dtype=float) / stats['recent_count'].to_numpy(dtype=float)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats['MomentumScore'] = np.where(overall > 0, recent / overall, 1)
+        
+        return stats[['MainGroup', 'MomentumScore']]
+    
+    def summarize_years(self, years=None):
+        """Yıl bazında özet istatistikler (bkz. BudgetForecaster.summarize_years)"""
+        
+        # Haftalık normalize Stok/SMM: Stok / ((SMM/gün_sayısı)*7); geçersiz ayda gün NULL (ortalamaya girmez)
+        days = ', '.join(f"({month}, {count})" for month, count in DAYS_IN_MONTH.items())
+        summary = self.query(f"""
+            SELECT Year,
+                   SUM(Sales) AS Total_Sales,
+                   SUM(GrossProfit) AS Total_GrossProfit,
+                   AVG(Stock) AS Avg_Stock,
+                   AVG(Stock_COGS_Ratio) AS Avg_Stock_COGS_Ratio,
+                   AVG(CASE WHEN COGS > 0 THEN Stock / ((COGS / days) * 7) ELSE 0 END) AS Avg_Stock_COGS_Weekly
+            FROM clean LEFT JOIN (VALUES {days}) AS month_days(day_month, days) ON Month = day_month
+            GROUP BY Year ORDER BY Year
+        """).set_index('Year')
+        
+        return BudgetForecaster.complete_summary(summary, years)
+    
+    def get_summary_stats(self, years=SUMMARY_YEARS):
+        """Gerçekleşme verisinin {yıl: {metrik: değer}} özeti (bkz. BudgetForecaster.get_summary_stats)"""
+        
+        summary = self.summarize_years(years)
+        return {int(year): row for year, row in summary.to_dict(orient='index').items()}
+    
+    def close(self):
+        self.connection.close()
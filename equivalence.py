@@ -0,0 +1,371 @@
+"""
+Referans ve hızlı tahmin motorları arasında sayısal eşitlik testi
+
+Her vaka için rastgele (tohumlu) bir kaynak çalışma kitabı ve senaryo üretilir.
+Çalışma kitaplarında eksik aylar, SMM'si sıfır satırlar ve aylar, 2024 toplamı sıfır
+aylar, boş hücreler, Toplam satırları, tek yılda görünen gruplar ve eksik 2025
+Aralık/Kasım bulunur. Dondurulmuş
+ReferenceForecaster (reference_forecast.py) ile BudgetForecaster'ın hızlı yolları
+(numpy / pyarrow backend, kuruluysa Polars motoru) karşılaştırılır:
+
+- temizlenmiş veri (data)
+- forecast_2026 ve get_full_data_with_forecast
+- get_summary_stats ve get_forecast_quality_metrics (NaN/inf değerler dahil)
+
+Tolerans rtol=1e-9'dur (toplama sırası farkından gelen kayan nokta yuvarlaması).
+Her adım için süre de ölçülür. forecast_2026 üç durumda ölçülür: ilk senaryo (tüm
+cache'ler temiz, senaryodan bağımsız bağlam da hesaplanır), yeni senaryo (bağlam
+hazır, senaryo cache'i temiz) ve aynı senaryonun tekrarı (cache).
+Hata bulunursa vaka tohumu yazılır; --seed ile aynı vaka tekrar üretilir.
+
+Kullanım:
+    python equivalence.py --cases 50
+    python equivalence.py --cases 5 --groups 2000   # hızlanma ölçümü için büyük veri
+    python equivalence.py --seed 1234 --cases 1       # hatalı vakayı tekrar üret
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from budget_forecast import BudgetForecaster
+from reference_forecast import ReferenceForecaster
+from stock_optimizer import allocate_stock, budget_range
+from synthetic_data import YEAR_COLUMNS, make_raw_frame, write_raw_workbook
+
+RTOL = 1e-9
+ATOL = 1e-6
+
+# Karşılaştırılan kolonlar (referansın get_full_data_with_forecast çıktısı)
+FRAME_COLUMNS = ['Year', 'Month', 'MainGroup', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS', 'Stock_COGS_Ratio']
+
+
+def fast_engines():
+    """Karşılaştırılacak hızlı yollar: ad → BudgetForecaster argümanları"""
+    engines = {
+        'numpy': dict(dtype_backend='numpy'),
+        'pyarrow': dict(dtype_backend='pyarrow'),
+    }
+    try:
+        import polars  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        engines['polars'] = dict(engine='polars')
+    return engines
+
+
+def random_workbook(rng, n_groups=None):
+    """Kenar durumları içeren rastgele ham tablo (make_raw_frame düzeninde; grup sayısı verilmezse 1-40)"""
+    n_groups = n_groups or int(rng.integers(1, rng.choice([4, 40]) + 1))
+    df = make_raw_frame(n_groups, seed=int(rng.integers(2**31)), december_2025_missing=bool(rng.random() < 0.5))
+    is_total = df['Month'].astype(str).str.contains('Toplam')
+    rows = df.index[~is_total]
+    
+    def pick(fraction):
+        return rng.choice(rows, size=int(len(rows) * fraction), replace=False)
+    
+    # Eksik ay-grup satırları ve bazen tüm bir ay (Ekim-Aralık yoksa momentum 2025'e düşer)
+    drops = list(pick(rng.uniform(0, 0.2)))
+    if rng.random() < 0.3:
+        missing = rng.choice(np.arange(1, 13), size=int(rng.integers(1, 10)), replace=False)
+        drops.extend(rows[df.loc[rows, 'Month'].isin(missing)])
+    
+    # SMM'si sıfır (brüt kar = satış) ve satışı sıfır satırlar
+    for suffix in ('', '.1'):
+        zero_cogs = pick(rng.uniform(0, 0.2))
+        df.loc[zero_cogs, 'TY Gross Profit TRY2' + suffix] = df.loc[zero_cogs, 'TY Sales Value TRY2' + suffix]
+        df.loc[zero_cogs, 'TY Gross Marjin TRY%' + suffix] = 1.0
+        zero_sales = pick(rng.uniform(0, 0.05))
+        df.loc[zero_sales, [name + suffix for name in YEAR_COLUMNS]] = 0.0
+    
+    # Tüm gruplarda 2024 satışı sıfır olan ay (toplam büyüme inf; 2025 de sıfırsa 0/0 → NaN)
+    if rng.random() < 0.25:
+        month = rows[df.loc[rows, 'Month'] == int(rng.integers(1, 13))]
+        for suffix in ('', '.1') if rng.random() < 0.3 else ('',):
+            df.loc[month, ['TY Sales Value TRY2' + suffix, 'TY Gross Profit TRY2' + suffix]] = 0.0
+    
+    # Tüm gruplarda SMM'si sıfır olan ay (stok/SMM oranı 0, tarihsel oran ortalamasına girer)
+    if rng.random() < 0.25:
+        month = rows[df.loc[rows, 'Month'] == int(rng.integers(1, 13))]
+        suffix = str(rng.choice(['', '.1']))
+        df.loc[month, 'TY Gross Profit TRY2' + suffix] = df.loc[month, 'TY Sales Value TRY2' + suffix]
+        df.loc[month, 'TY Gross Marjin TRY%' + suffix] = 1.0
+    
+    # Boş hücreler (temizlikte 0 olur) ve yalnızca 2024'te görünen grup
+    columns = [name + suffix for name in YEAR_COLUMNS for suffix in ('', '.1')]
+    for column in rng.choice(columns, size=int(rng.integers(0, 4)), replace=False):
+        df.loc[pick(rng.uniform(0, 0.1)), column] = np.nan
+    if n_groups > 1 and rng.random() < 0.3:
+        group = df.loc[rows[0], 'MainGroupDesc']
+        df.loc[df['MainGroupDesc'] == group, [name + '.1' for name in YEAR_COLUMNS]] = np.nan
+    
+    # 2025 Kasım'ı eksik (Aralık tahmini yapılamaz) ve dosya sonunda genel toplam
+    if rng.random() < 0.15:
+        df.loc[rows[df.loc[rows, 'Month'] == 11], [name + '.1' for name in YEAR_COLUMNS]] = np.nan
+    if rng.random() < 0.5:
+        total = df.loc[rows].drop(columns=['Month', 'MainGroupDesc']).sum()
+        df = pd.concat([df, pd.DataFrame([{'Month': 'Genel Toplam', 'MainGroupDesc': None, **total}])],
+                       ignore_index=True)
+    
+    return df.drop(index=drops).reset_index(drop=True)
+
+
+def zero_sales_month_frame():
+    """Regresyon: 2024'te tüm grupların satışı sıfır olan ay (toplam büyüme inf → MAPE inf, güven 'Düşük')"""
+    df = make_raw_frame(3, seed=1, december_2025_missing=False)
+    april = df['Month'].astype(str) == '4'
+    df.loc[april, ['TY Sales Value TRY2', 'TY Gross Profit TRY2']] = 0.0
+    return df
+
+
+# Her çalıştırmada rastgele vakalardan önce denenen sabit vakalar: ad → ham tablo üreticisi
+REGRESSION_CASES = {
+    'zero_sales_month': zero_sales_month_frame,
+}
+
+
+def finishes(fn, timeout=5.0):
+    """fn'i ayrı thread'de çalıştır; timeout saniyede bitmezse AssertionError (takılma regresyonları)"""
+    result = {}
+    
+    def run():
+        try:
+            result['value'] = fn()
+        except Exception as e:
+            result['error'] = e
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"{timeout:.0f} sn içinde bitmedi"
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+def check_stock_budget_bounds():
+    """Regresyon: bütçe tam sınırda veya tolerans içinde sınırın dışındaysa tüm hücreler sınırda"""
+    cogs, target = np.array([1.0, 2.0, 0.0]), np.array([0.5, 0.5, 0.5])
+    lower, upper = np.array([0.2, 0.3, 0.2]), np.array([1.0, 1.5, 1.0])
+    min_total, max_total = budget_range(cogs, lower, upper)
+    for total, expected in ((max_total, upper), (max_total * (1 + 1e-13), upper),
+                            (min_total, lower), (min_total * (1 - 1e-13), lower)):
+        stock = finishes(lambda: allocate_stock(cogs, target, total, lower, upper))
+        np.testing.assert_allclose(stock, cogs * expected, rtol=RTOL)
+    
+    try:
+        allocate_stock(cogs, target, max_total * 1.01, lower, upper)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("sınır dışı bütçe ValueError vermedi")
+
+
+# Tahmin motorundan bağımsız sabit kontroller: ad → fonksiyon (AssertionError = hata)
+REGRESSION_CHECKS = {
+    'stock_budget_bounds': check_stock_budget_bounds,
+}
+
+
+def random_scenario(rng, groups):
+    """Rastgele senaryo: kısmi ay / grup hedefleri ve iki stok yönteminden biri"""
+    scenario = dict(
+        growth_param=float(rng.uniform(-0.3, 0.5)),
+        margin_improvement=float(rng.uniform(-0.05, 0.05)),
+        stock_ratio_target=float(rng.uniform(0.3, 2.0)),
+        monthly_growth_targets=None,
+        maingroup_growth_targets=None,
+        stock_change_pct=None
+    )
+    if rng.random() < 0.5:
+        months = rng.choice(np.arange(1, 13), size=int(rng.integers(1, 13)), replace=False)
+        scenario['monthly_growth_targets'] = {int(month): float(rng.uniform(-0.2, 0.4)) for month in months}
+    if rng.random() < 0.5 and len(groups):
+        chosen = rng.choice(groups, size=int(rng.integers(1, len(groups) + 1)), replace=False)
+        targets = {group: float(rng.uniform(-0.2, 0.4)) for group in chosen}
+        targets['Olmayan Grup'] = 0.9
+        scenario['maingroup_growth_targets'] = targets
+    if rng.random() < 0.4:
+        scenario['stock_change_pct'] = float(rng.uniform(-0.3, 0.3))
+    return scenario
+
+
+def sorted_frame(df):
+    """Satır sırası ve dtype farkından bağımsız karşılaştırma için sıralı numpy tablo"""
+    df = df[[column for column in FRAME_COLUMNS if column in df.columns]]
+    df = df.astype({column: 'float64' for column in df.columns if column != 'MainGroup'}).astype({'MainGroup': object})
+    return df.sort_values(['Year', 'Month', 'MainGroup'], kind='stable').reset_index(drop=True)
+
+
+def assert_frames(expected, actual):
+    pd.testing.assert_frame_equal(sorted_frame(expected), sorted_frame(actual), check_dtype=False,
+                                  check_column_type=False, rtol=RTOL, atol=ATOL)
+
+
+def assert_values(expected, actual):
+    """Sözlük karşılaştırması (sayılar toleransla; None/metin ve NaN/±inf birebir)"""
+    assert set(expected) <= set(actual), f"eksik anahtarlar: {set(expected) - set(actual)}"
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            assert_values(value, actual[key])
+        elif value is None or isinstance(value, str):
+            assert actual[key] == value, f"{key}: {actual[key]!r} != {value!r}"
+        elif not np.isfinite(value):
+            assert actual[key] is not None and (np.isnan(value) and np.isnan(actual[key]) or actual[key] == value), \
+                f"{key}: {actual[key]!r} != {value!r}"
+        else:
+            assert actual[key] is not None and np.isclose(actual[key], value, rtol=RTOL, atol=ATOL, equal_nan=True), \
+                f"{key}: {actual[key]!r} != {value!r}"
+
+
+def cold(forecaster, step, context=True):
+    """
+    Hızlı yolun cache'lerini temizleyip adımı çalıştıran fonksiyon
+    
+    context=False ise senaryodan bağımsız bağlam (mevsimsellik, trend, running tablolar)
+    korunur; yalnızca senaryo cache'i temizlenir (arayüzde yeni senaryo uygulanması).
+    """
+    def run():
+        forecaster.clear_cache()
+        if context:
+            forecaster._context = None
+            forecaster._running = None
+        return step()
+    return run
+
+
+def timed(fn):
+    """fn'in sonucu ve süresi (ms); timeit gibi ölçüm sırasında GC kapalı"""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, (time.perf_counter() - start) * 1000
+    finally:
+        gc.enable()
+
+
+def run_case(seed, engines, tmp_dir, n_groups=None, frame=None):
+    """
+    Tek vaka: (hatalar, süreler) döndürür
+    
+    hatalar: [(motor, adım, mesaj)]; süreler: {(motor, adım): (referans ms, hızlı ms)}.
+    frame verilirse (sabit vaka) çalışma kitabı ondan yazılır; senaryo yine tohumdan gelir.
+    """
+    rng = np.random.default_rng(seed)
+    workbook = random_workbook(rng, n_groups) if frame is None else frame
+    path = write_raw_workbook(os.path.join(tmp_dir, f'case_{seed}.xlsx'), workbook)
+    
+    # Referans ve hızlı yol Aralık tahmini mesajını yazdırır; çıktıyı sustur
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = ReferenceForecaster(path)
+        forecasters = {name: BudgetForecaster(path, **kwargs) for name, kwargs in engines.items()}
+    
+    groups = sorted(reference.data['MainGroup'].astype(str).unique())
+    scenario = random_scenario(rng, groups)
+    
+    expected_forecast, reference_forecast_ms = timed(lambda: reference.forecast_2026(**scenario))
+    expected_full = reference.get_full_data_with_forecast(**scenario)
+    expected_summary, reference_summary_ms = timed(lambda: reference.get_summary_stats(expected_full))
+    expected_quality, reference_quality_ms = timed(lambda: reference.get_forecast_quality_metrics(expected_full))
+    
+    failures, timings = [], {}
+    for name, forecaster in forecasters.items():
+        def check(step, compare):
+            try:
+                compare()
+            except AssertionError as e:
+                failures.append((name, step, str(e).strip().splitlines()[0] if str(e).strip() else 'AssertionError'))
+        
+        check('data', lambda: assert_frames(reference.data, forecaster.data))
+        
+        forecast, ms = timed(cold(forecaster, lambda: forecaster.forecast_2026(**scenario)))
+        timings[(name, 'forecast_2026 (ilk)')] = (reference_forecast_ms, ms)
+        check('forecast_2026', lambda: assert_frames(expected_forecast, forecast))
+        
+        forecast, ms = timed(cold(forecaster, lambda: forecaster.forecast_2026(**scenario), context=False))
+        timings[(name, 'forecast_2026 (yeni senaryo)')] = (reference_forecast_ms, ms)
+        check('forecast_2026 (yeni senaryo)', lambda: assert_frames(expected_forecast, forecast))
+        
+        # Arayüzdeki asıl yol: aynı senaryo tekrar istendiğinde cache'ten okunur
+        forecast, ms = timed(lambda: forecaster.forecast_2026(**scenario))
+        timings[(name, 'forecast_2026 (cache)')] = (reference_forecast_ms, ms)
+        check('forecast_2026 (cache)', lambda: assert_frames(expected_forecast, forecast))
+        
+        full = forecaster.get_full_data_with_forecast(**scenario)
+        check('full_data', lambda: assert_frames(expected_full, full))
+        
+        summary, ms = timed(lambda: forecaster.get_summary_stats(full))
+        timings[(name, 'get_summary_stats')] = (reference_summary_ms, ms)
+        check('get_summary_stats', lambda: assert_values(expected_summary, summary))
+        
+        quality, ms = timed(lambda: forecaster.get_forecast_quality_metrics(full))
+        timings[(name, 'get_forecast_quality_metrics')] = (reference_quality_ms, ms)
+        check('get_forecast_quality_metrics', lambda: assert_values(expected_quality, quality))
+    
+    return failures, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=30, help='Rastgele vaka sayısı')
+    parser.add_argument('--seed', type=int, default=0, help='İlk vaka tohumu (vaka i = seed + i)')
+    parser.add_argument('--groups', type=int, default=None,
+                        help='Her vakada bu kadar ana grup (varsayılan: 1-40 arası rastgele)')
+    args = parser.parse_args()
+    
+    engines = fast_engines()
+    all_failures = []
+    timings = defaultdict(list)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, check in REGRESSION_CHECKS.items():
+            try:
+                check()
+            except AssertionError as e:
+                all_failures.append((name, '-', name, str(e).strip().splitlines()[0]))
+                print(f"{name}: hata", file=sys.stderr)
+            else:
+                print(f"{name}: OK", file=sys.stderr)
+        
+        for name, make_frame in REGRESSION_CASES.items():
+            failures, _ = run_case(args.seed, engines, tmp_dir, frame=make_frame())
+            all_failures.extend((name,) + failure for failure in failures)
+            print(f"{name}: {'OK' if not failures else f'{len(failures)} hata'}", file=sys.stderr)
+        
+        for seed in range(args.seed, args.seed + args.cases):
+            failures, case_timings = run_case(seed, engines, tmp_dir, args.groups)
+            all_failures.extend((seed,) + failure for failure in failures)
+            for key, value in case_timings.items():
+                timings[key].append(value)
+            print(f"vaka {seed}: {'OK' if not failures else f'{len(failures)} hata'}", file=sys.stderr)
+    
+    print(f"{'motor':<10}{'adım':<32}{'referans ms':>12}{'hızlı ms':>12}{'hızlanma':>10}")
+    for (engine, step), values in timings.items():
+        reference_ms, fast_ms = np.sum(values, axis=0)
+        print(f"{engine:<10}{step:<32}{reference_ms:>12.2f}{fast_ms:>12.2f}{reference_ms / fast_ms:>9.1f}x")
+    
+    print()
+    if all_failures:
+        print(f"{len(all_failures)} eşitsizlik ({args.cases} vaka, {', '.join(engines)}):")
+        for case, engine, step, message in all_failures:
+            label = case if isinstance(case, str) else f'tohum {case}'
+            print(f"  {label} · {engine} · {step}: {message}")
+        sys.exit(1)
+    print(f"{len(REGRESSION_CHECKS) + len(REGRESSION_CASES)} sabit + {args.cases} vaka × {len(engines)} motor: "
+          f"tüm sonuçlar referansla eşit (rtol={RTOL})")
+
+
+if __name__ == '__main__':
+    main()
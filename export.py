@@ -0,0 +1,267 @@
+import gzip
+import os
+
+import pandas as pd
+
+# Tam veri dışa aktarma formatları: (dosya uzantısı, MIME tipi)
+EXPORT_FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+    'csv.zst': ('.csv.zst', 'application/zstd'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file')
+}
+
+# Parquet row group / Arrow batch / CSV yazım parçası başına satır
+DEFAULT_CHUNK_ROWS = 65536
+
+# gzip CSV sıkıştırma seviyesi (1: en hızlı; 6'ya göre ~%5 büyük, ~5 kat hızlı)
+CSV_GZIP_LEVEL = 1
+
+
+def to_arrow_ipc(df, compression=None):
+    """
+    DataFrame'i Arrow IPC (Feather v2) dosya formatında byte olarak döndür
+    
+    Arrow-backed tablolar kopyasız Arrow tablosuna dönüşür; CSV'deki gibi
+    her hücrenin metne çevrilmesi gerekmez.
+    compression: None, 'lz4' veya 'zstd'
+    """
+    import pyarrow as pa
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    
+    return sink.getvalue().to_pybytes()
+
+
+def read_arrow_ipc(data):
+    """to_arrow_ipc çıktısını tekrar DataFrame'e çevir (Arrow dtype'ları korunur)"""
+    import pyarrow as pa
+    
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all().to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _open_sink(sink):
+    """Dosya yolu, pyarrow NativeFile veya Python dosya nesnesini yazılabilir Arrow akışına çevir"""
+    import pyarrow as pa
+    
+    if isinstance(sink, (str, os.PathLike)):
+        return pa.OSFile(os.fspath(sink), 'wb'), True
+    if isinstance(sink, pa.NativeFile):
+        return sink, False
+    return pa.PythonFile(sink, mode='w'), False
+
+
+def _write_csv_batches(stream, schema, batches):
+    import pyarrow.csv as pa_csv
+    
+    with pa_csv.CSVWriter(stream, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def write_full_data(df, sink, fmt='parquet', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Tam veriyi (örn. get_full_data_with_forecast çıktısı) parça parça dışa aktar
+    
+    DataFrame bir kez Arrow tablosuna çevrilir (Arrow-backed kolonlarda kopyasız) ve
+    chunk_rows satırlık batch dilimleri halinde (dilimler de kopyasızdır) yazılır:
+    Parquet'te her batch bir row group, Arrow IPC'de bir record batch olur; CSV
+    batch batch metne çevrilip gzip/zstd akışına sıkıştırılır. Tüm dosyanın metin
+    veya sıkıştırılmamış ara kopyası bellekte oluşmaz.
+    
+    sink: dosya yolu, pyarrow NativeFile veya yazılabilir Python dosya nesnesi
+    fmt: EXPORT_FORMATS anahtarlarından biri
+    """
+    import pyarrow as pa
+    
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Bilinmeyen dışa aktarma formatı: {fmt} (desteklenenler: {', '.join(EXPORT_FORMATS)})")
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    batches = table.to_batches(max_chunksize=chunk_rows)
+    
+    stream, owned = _open_sink(sink)
+    try:
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            
+            with pq.ParquetWriter(stream, table.schema, compression='zstd') as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+        elif fmt == 'arrow':
+            options = pa.ipc.IpcWriteOptions(compression='zstd')
+            with pa.ipc.new_file(stream, table.schema, options=options) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+        elif fmt == 'csv.zst':
+            with pa.CompressedOutputStream(stream, 'zstd') as compressed:
+                _write_csv_batches(compressed, table.schema, batches)
+        else:
+            # pyarrow'un gzip akışı seviye almıyor (varsayılanı ~5 kat yavaş); zlib seviye 1
+            with gzip.GzipFile(fileobj=stream, mode='wb', compresslevel=CSV_GZIP_LEVEL) as compressed:
+                _write_csv_batches(pa.PythonFile(compressed, mode='w'), table.schema, batches)
+    finally:
+        if owned:
+            stream.close()
+    
+    return sink
+
+
+def export_full_data(df, fmt='parquet', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """write_full_data çıktısını byte olarak döndür (indirme butonları için)"""
+    import pyarrow as pa
+    
+    sink = pa.BufferOutputStream()
+    write_full_data(df, sink, fmt, chunk_rows)
+    
+    return sink.getvalue().to_pybytes()
+
+
+def build_budget_workbook(data, full_data, progress=None):
+    """
+    2024, 2025 (Aralık tahmini ile) ve tahmin yılı sayfalarından oluşan bütçe Excel'i
+    
+    data: temizlenmiş gerçekleşme verisi (forecaster.data)
+    full_data: get_full_data_with_forecast çıktısı (2025 sonrası her yıl bir "{yıl}_Tahmin" sayfası olur)
+    progress: isteğe bağlı progress(oran, mesaj) geri çağrısı (oran 0-1 arası)
+    Dönen değer xlsx dosyasının byte'larıdır.
+    """
+    import openpyxl
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils.dataframe import dataframe_to_rows
+    from io import BytesIO
+    
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
+    
+    report(0.0, "Veri hazırlanıyor")
+    
+    # 2025 Aralık ayını tahmin et (basit: önceki ayların ortalaması)
+    data_2025_full = data[data['Year'] == 2025].copy()
+    
+    # Aralık için tahmin yap - Kasım verilerini kopyala ve hafif artır
+    november_data = data_2025_full[data_2025_full['Month'] == 11].copy()
+    december_estimate = november_data.copy()
+    december_estimate['Month'] = 12
+    # Mevsimsellik faktörü: Aralık genelde Kasım'dan %10-15 yüksek
+    december_estimate['Sales'] = december_estimate['Sales'] * 1.12
+    december_estimate['GrossProfit'] = december_estimate['GrossProfit'] * 1.12
+    december_estimate['COGS'] = december_estimate['COGS'] * 1.12
+    december_estimate['Stock'] = december_estimate['Stock'] * 1.05  # Stok hafif artış
+    
+    # 2025'e Aralık tahminini ekle
+    data_2025_complete = pd.concat([data_2025_full[data_2025_full['Month'] != 12], december_estimate], ignore_index=True)
+    data_2025_complete = data_2025_complete.sort_values(['Month', 'MainGroup'])
+    
+    # Yeni workbook oluştur
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)  # Default sheet'i sil
+    
+    # 2024 sheet'i (orijinal veri)
+    ws_2024 = wb.create_sheet("2024")
+    data_2024 = data[data['Year'] == 2024].copy()
+    
+    # 2025 sheet'i (tamamlanmış - Aralık tahmini ile)
+    ws_2025 = wb.create_sheet("2025")
+    
+    sheets = [(ws_2024, data_2024, "2024"),
+              (ws_2025, data_2025_complete, "2025")]
+    
+    # Tahmin sheet'leri (ufuktaki her yıl için bir sayfa)
+    forecast_years = full_data['Year'].to_numpy()
+    for year in sorted(set(forecast_years[forecast_years > 2025].tolist())):
+        sheets.append((wb.create_sheet(f"{year}_Tahmin"), full_data[forecast_years == year].copy(), str(year)))
+    
+    # İlerleme: hücre yazımı toplam satır sayısına göre, kayıt son %10
+    total_rows = max(sum(len(sheet_data) for _, sheet_data, _ in sheets), 1)
+    written_rows = 0
+    
+    # Her sheet için veri hazırla ve yaz
+    for ws, sheet_data, year_name in sheets:
+        
+        # Veriyi formatla
+        excel_data = pd.DataFrame()
+        
+        for month in range(1, 13):
+            month_data = sheet_data[sheet_data['Month'] == month].copy()
+            
+            if len(month_data) > 0:
+                # Toplam satırı ekle
+                total_row = pd.DataFrame({
+                    'Ay': [f'Toplam {month}'],
+                    'Ana Grup': [''],
+                    'Satış': [month_data['Sales'].sum()],
+                    'Brüt Kar': [month_data['GrossProfit'].sum()],
+                    'Brüt Marj %': [month_data['GrossProfit'].sum() / month_data['Sales'].sum() if month_data['Sales'].sum() > 0 else 0],
+                    'Stok': [month_data['Stock'].mean()],
+                    'SMM': [month_data['COGS'].sum()]
+                })
+                
+                month_formatted = month_data[['Month', 'MainGroup', 'Sales', 'GrossProfit', 'GrossMargin%', 'Stock', 'COGS']].copy()
+                month_formatted.columns = ['Ay', 'Ana Grup', 'Satış', 'Brüt Kar', 'Brüt Marj %', 'Stok', 'SMM']
+                
+                month_data_with_total = pd.concat([month_formatted, total_row], ignore_index=True)
+                excel_data = pd.concat([excel_data, month_data_with_total], ignore_index=True)
+        
+        # DataFrame'i worksheet'e yaz
+        for r_idx, row in enumerate(dataframe_to_rows(excel_data, index=False, header=True), 1):
+            for c_idx, value in enumerate(row, 1):
+                cell = ws.cell(row=r_idx, column=c_idx, value=value)
+                
+                # Header formatı
+                if r_idx == 1:
+                    cell.fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
+                    cell.font = Font(color="FFFFFF", bold=True)
+                    cell.alignment = Alignment(horizontal='center')
+                
+                # Toplam satırları bold
+                if isinstance(value, str) and value.startswith('Toplam'):
+                    cell.font = Font(bold=True)
+                    cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+                
+                # Number formatları
+                if r_idx > 1:
+                    if c_idx in [3, 4, 6, 7]:  # Satış, Brüt Kar, Stok, SMM
+                        cell.number_format = '#,##0'
+                    elif c_idx == 5:  # Brüt Marj %
+                        cell.number_format = '0.00%'
+            
+            if r_idx % 500 == 0:
+                report(0.9 * min(written_rows + r_idx, total_rows) / total_rows, f"{year_name} sayfası yazılıyor")
+        
+        written_rows += len(sheet_data)
+        report(0.9 * written_rows / total_rows, f"{year_name} sayfası yazıldı")
+        
+        # Kolon genişlikleri
+        ws.column_dimensions['A'].width = 12
+        ws.column_dimensions['B'].width = 25
+        ws.column_dimensions['C'].width = 18
+        ws.column_dimensions['D'].width = 18
+        ws.column_dimensions['E'].width = 15
+        ws.column_dimensions['F'].width = 18
+        ws.column_dimensions['G'].width = 18
+        
+        # Başlık ekle
+        if year_name == "2025":
+            ws.insert_rows(1)
+            ws['A1'] = f'{year_name} (Aralık Tahmini İçerir)'
+            ws['A1'].font = Font(size=14, bold=True, color="FF6B35")
+            ws.merge_cells('A1:G1')
+        elif year_name not in ("2024", "2025"):
+            ws.insert_rows(1)
+            ws['A1'] = f'{year_name} Tahmin'
+            ws['A1'].font = Font(size=14, bold=True, color="1E88E5")
+            ws.merge_cells('A1:G1')
+    
+    # Excel'e kaydet
+    report(0.9, "Dosya kaydediliyor")
+    output = BytesIO()
+    wb.save(output)
+    report(1.0, "Hazır")
+    
+    return output.getvalue()
@@ -0,0 +1,150 @@
+"""
+Arka planda çalışan dışa aktarma işleri
+
+Bütçe Excel'i script çalışması içinde değil, paylaşılan bir thread havuzunda
+üretilir; arayüz ilerlemeyi okuyup beklemeden çizilir. Biten dosyanın byte'ları
+işin kendisinde, senaryo anahtarıyla ayrı ve sınırlı bir depoda (veri seti başına
+LRU) tutulur; aynı senaryoyu isteyen her oturum dosyayı yeniden üretmeden indirir.
+Depo forecaster'ın senaryo cache'inden bağımsızdır: diğer oturumların tahmin ve
+figür istekleri hazır dosyaları düşürmez.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from export import build_budget_workbook, export_full_data
+
+# Eşzamanlı dışa aktarma sayısı (openpyxl saf Python; daha fazla thread GIL'de bekler)
+MAX_EXPORT_WORKERS = 2
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_EXPORT_WORKERS, thread_name_prefix='budget-export')
+
+# Veri seti başına saklanan biten dosya sayısı (en eski kullanılan düşer; süren işler sayılmaz)
+MAX_STORED_EXPORTS = 16
+
+# forecaster → OrderedDict{(senaryo anahtarı, veri sürümü): ExportJob} (LRU sırası);
+# forecaster silinince işleri de düşer
+_JOBS = weakref.WeakKeyDictionary()
+_JOBS_LOCK = threading.Lock()
+
+
+class ExportJob:
+    """Tek senaryonun bütçe Excel'i üretimi (durum ve ilerleme thread-safe okunur)"""
+    
+    def __init__(self, forecaster, scenario):
+        # Zayıf referans: kayıt defteri forecaster'ı canlı tutmamalı (bkz. _JOBS)
+        self._forecaster = weakref.ref(forecaster)
+        self.scenario = dict(scenario)
+        self.key = _job_key(forecaster, scenario)
+        self.status = 'pending'
+        self.progress = 0.0
+        self.message = "Sırada"
+        self.error = None
+        self.content = None
+        self._lock = threading.Lock()
+    
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+    
+    @property
+    def result(self):
+        """Bitmiş dosyanın byte'ları (iş bitmediyse None)"""
+        return self.content if self.status == 'done' else None
+    
+    def update(self, progress, message):
+        with self._lock:
+            self.progress = progress
+            self.message = message
+    
+    def run(self):
+        self.status = 'running'
+        try:
+            forecaster = self._forecaster()
+            if forecaster is None:
+                raise RuntimeError("Veri seti bellekten çıkarıldı; dosyayı yeniden yükleyin")
+            content = self._build(forecaster)
+        except Exception as e:
+            with self._lock:
+                self.error = e
+                self.message = f"Hata: {e}"
+                self.status = 'failed'
+            raise
+        
+        with self._lock:
+            self.content = content
+            self.progress = 1.0
+            self.message = "Hazır"
+            self.status = 'done'
+        
+        with _JOBS_LOCK:
+            _evict(_JOBS.get(forecaster, {}))
+    
+    def _build(self, forecaster):
+        full_data = forecaster.get_full_data_with_forecast(**self.scenario)
+        return _timed_export('xlsx', lambda: build_budget_workbook(forecaster.data, full_data, progress=self.update))
+    
+
+
+def _job_key(forecaster, scenario):
+    """İş deposu anahtarı: senaryo + veri sürümü (append_actuals sonrası eski dosya dönmez)"""
+    return forecaster.scenario_key(**scenario), forecaster.data_version
+
+
+def _evict(jobs):
+    """Biten işlerden en eski kullanılanları MAX_STORED_EXPORTS kalana kadar düşür (_JOBS_LOCK altında)"""
+    finished = [key for key, job in jobs.items() if job.done]
+    for key in finished[:max(len(finished) - MAX_STORED_EXPORTS, 0)]:
+        del jobs[key]
+
+
+def _timed_export(export_format, build):
+    """Dosyayı üret; süre ve boyut format başına metriklere yazılır"""
+    with metrics.EXPORT_SECONDS.time(format=export_format):
+        content = build()
+    metrics.EXPORT_BYTES.inc(len(content), format=export_format)
+    return content
+
+
+def get_full_export(forecaster, scenario, export_format):
+    """Senaryonun tam veri dosyası (bkz. export.export_full_data) - senaryo cache'inden"""
+    key = (forecaster.scenario_key(**scenario), export_format)
+    return forecaster.memoize('full_export', key, lambda: _timed_export(export_format, lambda: export_full_data(
+        forecaster.get_full_data_with_forecast(**scenario), export_format
+    )))
+
+
+def find_export(forecaster, scenario):
+    """Senaryo için mevcut işi döndür (yoksa None); bulunan iş LRU'da en yeni olur"""
+    key = _job_key(forecaster, scenario)
+    with _JOBS_LOCK:
+        jobs = _JOBS.get(forecaster, {})
+        job = jobs.get(key)
+        if job is not None:
+            jobs.move_to_end(key)
+    return job
+
+
+def submit_export(forecaster, scenario):
+    """
+    Senaryonun Excel'ini arka planda üretmeye başla (bekleme yapmaz)
+    
+    Aynı senaryo için çalışan veya bitmiş iş varsa o döner; hata ile biten iş
+    (veya depodan düşmüş dosya) yeniden kuyruğa alınır.
+    """
+    key = _job_key(forecaster, scenario)
+    with _JOBS_LOCK:
+        jobs = _JOBS.setdefault(forecaster, OrderedDict())
+        
+        job = jobs.get(key)
+        if job is not None and job.status != 'failed':
+            jobs.move_to_end(key)
+            return job
+        
+        job = jobs[key] = ExportJob(forecaster, scenario)
+        jobs.move_to_end(key)
+    
+    _EXECUTOR.submit(job.run)
+    return job
@@ -0,0 +1,333 @@
+"""
+app.py için çok oturumlu yük testi
+
+Streamlit'in AppTest aracıyla app.py'yi tarayıcısız çalıştırır. N eşzamanlı
+kullanıcı sentetik çalışma kitabını yükler, slider'ları değiştirip parametre
+formunu uygular, ay seçer ve arka plandaki Excel dışa aktarımını tetikleyip dosya
+hazır olana kadar bekler. Sonuçta etkileşim başına gecikme yüzdelikleri, tepe
+bellek (RSS) ve oturum başına tam çalıştırma / yeniden hesaplama sayıları raporlanır.
+
+Tab değiştirmek Streamlit'te sunucuya gitmez (tüm tablar her rerun'da çizilir);
+bu yüzden tab4'ün ay seçimi sekme içi etkileşim olarak ölçülür. AppTest fragment'ları
+ayrı çalıştırmaz; tarayıcıda yalnızca fragment'ı yenileyen ay seçimi burada tam
+çalıştırma olarak sayılır.
+
+Kullanım:
+    python load_test.py --users 10
+    python load_test.py --users 1 10 40 --groups 500   # her seviye ayrı süreçte
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from synthetic_data import write_workbook
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class SharedConfigPatch:
+    """
+    AppTest'in global config yamasını eşzamanlı çalıştırmalar arasında paylaştır
+    
+    AppTest her run'da config.get_option'ı geçici olarak değiştirip geri alır; aynı
+    süreçte paralel çalışan oturumlar bu yamayı birbirinin ortasında kaldırır ve boş
+    sonuç ağacı döner. Burada yama ilk run'da bir kez uygulanır, son run bitince kaldırılır.
+    """
+    
+    def __init__(self, original):
+        self.original = original
+        self.lock = threading.Lock()
+        self.active_runs = 0
+        self.patch = None
+    
+    @contextlib.contextmanager
+    def __call__(self, config_overrides):
+        with self.lock:
+            if self.active_runs == 0:
+                self.patch = self.original(config_overrides)
+                self.patch.__enter__()
+            self.active_runs += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active_runs -= 1
+                if self.active_runs == 0:
+                    self.patch.__exit__(None, None, None)
+                    self.patch = None
+
+
+_COMPILE_LOCK = threading.Lock()
+
+
+def install_app_test_patches():
+    """
+    AppTest'i aynı süreçte eşzamanlı çalıştırmak için gereken yamaları uygula
+    
+    - patch_config_options paylaşımlı sürümle değiştirilir (bkz. SharedConfigPatch)
+    - Her AppTest kendi ScriptCache'i ile app.py'yi derler; Python 3.11'de paralel
+      compile() 'AST constructor recursion depth mismatch' hatası verebildiği için
+      derleme tek kilide alınır (gerçek sunucuda script cache ortaktır)
+    """
+    from streamlit.testing.v1 import app_test
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    
+    if not isinstance(app_test.patch_config_options, SharedConfigPatch):
+        app_test.patch_config_options = SharedConfigPatch(app_test.patch_config_options)
+    
+    if not getattr(ScriptCache.get_bytecode, '_locked', False):
+        get_bytecode = ScriptCache.get_bytecode
+        
+        def locked_get_bytecode(self, script_path):
+            with _COMPILE_LOCK:
+                return get_bytecode(self, script_path)
+        
+        locked_get_bytecode._locked = True
+        ScriptCache.get_bytecode = locked_get_bytecode
+
+
+def peak_rss_mb():
+    """Sürecin tepe RSS değeri (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS byte döner
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def find_widget(widgets, label):
+    """Etikete göre widget bul (etiket metni içinde geçmesi yeterli)"""
+    for widget in widgets:
+        if label in str(widget.label):
+            return widget
+    return None
+
+
+class SimulatedUser:
+    """Tek bir tarayıcı oturumunu AppTest ile taklit eder"""
+    
+    def __init__(self, user_id, workbook_bytes, rounds, export, timeout):
+        self.user_id = user_id
+        self.workbook_bytes = workbook_bytes
+        self.rounds = rounds
+        self.export = export
+        self.rng = random.Random(user_id)
+        self.latencies = defaultdict(list)
+        self.errors = []
+        self.retries = 0
+        self.run_stats = {}
+        self.polls = 0
+        
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    
+    def step(self, name, action):
+        """Etkileşimi uygula, rerun süresini kaydet"""
+        start = time.perf_counter()
+        action().run()
+        
+        # AppTest nadiren script'i hiç başlatmadan kapanıyor (boş ağaç); oturum
+        # durumu korunduğu için aynı rerun tekrarlanır ve ayrıca sayılır
+        if len(self.at.main.children) == 0:
+            self.retries += 1
+            self.at.run()
+        
+        self.latencies[name].append((time.perf_counter() - start) * 1000)
+        
+        if self.at.exception:
+            self.errors.append(f'{name}: {self.at.exception[0].message}')
+    
+    def run(self):
+        self.step('initial_load', lambda: self.at)
+        self.step('upload', lambda: self.at.file_uploader[0].set_value(
+            ('butce.xlsx', self.workbook_bytes, XLSX_MIME)
+        ))
+        
+        for _ in range(self.rounds):
+            # Parametre formu: iki slider birlikte ayarlanıp tek "Uygula" ile gönderilir
+            growth = self.widget('slider', 'Tüm Aylar İçin Büyüme Hedefi')
+            margin = self.widget('slider', 'Brüt Marj İyileşme Hedefi')
+            apply = self.widget('button', 'Parametreleri Uygula')
+            if growth is not None and margin is not None and apply is not None:
+                growth.set_value(float(self.rng.randint(-10, 40)))
+                margin.set_value(self.rng.choice([0.0, 1.0, 2.0, 3.5]))
+                self.step('apply_parameters', lambda: apply.click())
+            
+            month = self.widget('selectbox', 'Ay Seçin')
+            if month is not None:
+                self.step('month_select', lambda: month.set_value(self.rng.randint(1, 12)))
+            
+            if self.export:
+                self.export_workbook()
+        
+        if 'run_stats' in self.at.session_state:
+            self.run_stats = dict(self.at.session_state['run_stats'], export_polls=self.polls)
+        
+        return self
+    
+    def export_workbook(self):
+        """
+        Excel işini başlat ve indirme butonu çıkana kadar bekle
+        
+        excel_export: butona basılan rerun'un süresi (iş arka planda başlar)
+        excel_ready: tıklamadan dosyanın hazır olmasına kadar geçen süre
+        Aynı senaryo daha önce üretildiyse buton yoktur, indirme doğrudan görünür.
+        """
+        start = time.perf_counter()
+        button = find_widget(self.at.button, 'Excel Dosyası Oluştur')
+        if button is not None:
+            self.step('excel_export', lambda: button.click())
+        
+        # AppTest run_every'ı çalıştırmaz: ilerleme takibi tam çalıştırmalarla yapılır
+        # (export_polls olarak ayrıca sayılır; tarayıcıda bunlar fragment yenilemesidir)
+        deadline = start + self.at.default_timeout
+        while not find_widget(self.at.get('download_button'), 'Bütçe Dosyası İndir'):
+            if time.perf_counter() > deadline:
+                self.errors.append('excel_ready: zaman aşımı')
+                return
+            
+            # Dosya indirilmeden senaryo cache'inden düştüyse buton geri gelir: yeniden üret
+            button = find_widget(self.at.button, 'Excel Dosyası Oluştur')
+            if button is not None and not self.at.get('progress'):
+                self.errors.append('excel_ready: dosya cache\'ten düştü, yeniden üretildi')
+                button.click()
+            
+            time.sleep(0.1)
+            self.polls += 1
+            self.at.run()
+        
+        self.latencies['excel_ready'].append((time.perf_counter() - start) * 1000)
+    
+    def widget(self, kind, label):
+        """Widget'ı bul; bulunamazsa hata olarak kaydet"""
+        widget = find_widget(getattr(self.at, kind), label)
+        if widget is None:
+            self.errors.append(f'{kind} bulunamadı: {label}')
+        return widget
+
+
+def percentile_table(latencies):
+    """Etkileşim başına gecikme yüzdelikleri (ms)"""
+    rows = {}
+    for name, values in latencies.items():
+        values = np.asarray(values)
+        rows[name] = {
+            'count': int(len(values)),
+            'p50': float(np.percentile(values, 50)),
+            'p90': float(np.percentile(values, 90)),
+            'p99': float(np.percentile(values, 99)),
+            'max': float(values.max())
+        }
+    return rows
+
+
+def run_level(users, groups, rounds, export, timeout):
+    """Tek eşzamanlılık seviyesini bu süreçte çalıştır"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = write_workbook(os.path.join(tmp_dir, 'load_test.xlsx'), groups)
+        with open(path, 'rb') as f:
+            workbook_bytes = f.read()
+    
+    install_app_test_patches()
+    
+    baseline_rss = peak_rss_mb()
+    latencies = defaultdict(list)
+    errors = []
+    retries = []
+    run_stats = defaultdict(int)
+    lock = threading.Lock()
+    
+    def simulate(user_id):
+        user = SimulatedUser(user_id, workbook_bytes, rounds, export, timeout).run()
+        with lock:
+            for name, values in user.latencies.items():
+                latencies[name].extend(values)
+            errors.extend(user.errors)
+            retries.append(user.retries)
+            for name, value in user.run_stats.items():
+                run_stats[name] += value
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(simulate, range(users)))
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'users': users,
+        'elapsed_s': elapsed,
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': peak_rss_mb(),
+        'latencies': percentile_table(latencies),
+        'errors': errors,
+        'harness_retries': sum(retries),
+        # Oturum başına ortalama: tam çalıştırma, yeni senaryo hesaplaması, fragment yenilemesi
+        'runs_per_session': {name: value / users for name, value in run_stats.items()}
+    }
+
+
+def print_report(result):
+    print(f"Kullanıcı: {result['users']}  Süre: {result['elapsed_s']:.1f} s  "
+          f"RSS başlangıç: {result['baseline_rss_mb']:.0f} MB  tepe: {result['peak_rss_mb']:.0f} MB  "
+          f"AppTest tekrar: {result['harness_retries']}")
+    print(f"{'etkileşim':<16}{'adet':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in result['latencies'].items():
+        print(f"{name:<16}{row['count']:>6}{row['p50']:>10.0f}{row['p90']:>10.0f}{row['p99']:>10.0f}{row['max']:>10.0f}")
+    runs = result['runs_per_session']
+    if runs:
+        print(f"Oturum başına tam çalıştırma: {runs.get('full_runs', 0):.1f}  "
+              f"yeniden hesaplama: {runs.get('recomputes', 0):.1f}  "
+              f"bölüm yenileme: {runs.get('fragment_runs', 0):.1f}  "
+              f"(tam çalıştırmaların {runs.get('export_polls', 0):.1f}'i Excel ilerleme takibi)")
+    for error in result['errors'][:10]:
+        print(f"HATA {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[10], help='Eşzamanlı kullanıcı sayısı (birden fazla seviye verilebilir)')
+    parser.add_argument('--groups', type=int, default=200, help='Sentetik ana grup sayısı')
+    parser.add_argument('--rounds', type=int, default=3, help='Kullanıcı başına etkileşim turu')
+    parser.add_argument('--no-export', action='store_true', help='Excel dışa aktarımını atla')
+    parser.add_argument('--timeout', type=float, default=300, help='Tek rerun zaman aşımı (s)')
+    parser.add_argument('--json', action='store_true', help='Sonucu JSON olarak yaz')
+    args = parser.parse_args()
+    
+    if len(args.users) == 1:
+        result = run_level(args.users[0], args.groups, args.rounds, not args.no_export, args.timeout)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print_report(result)
+        return
+    
+    # Her seviye temiz bir süreçte: tepe RSS seviyeler arası karışmaz
+    print(f"{'kullanıcı':>10}{'tepe RSS MB':>14}{'MB/kullanıcı':>14}{'p50 ms':>10}{'p99 ms':>10}{'hata':>6}")
+    for users in args.users:
+        command = [sys.executable, os.path.abspath(__file__), '--users', str(users),
+                   '--groups', str(args.groups), '--rounds', str(args.rounds),
+                   '--timeout', str(args.timeout), '--json']
+        if args.no_export:
+            command.append('--no-export')
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        
+        all_p50 = [row['p50'] for row in result['latencies'].values()]
+        all_p99 = [row['p99'] for row in result['latencies'].values()]
+        growth = (result['peak_rss_mb'] - result['baseline_rss_mb']) / users
+        print(f"{users:>10}{result['peak_rss_mb']:>14.0f}{growth:>14.1f}"
+              f"{np.median(all_p50):>10.0f}{max(all_p99):>10.0f}{len(result['errors']):>6}")
+
+
+if __name__ == '__main__':
+    main()
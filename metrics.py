@@ -0,0 +1,286 @@
+"""
+Operasyonel metrikler (Prometheus metin formatı)
+
+BudgetForecaster, export_jobs ve app.py buradaki sayaç / histogram / gauge'lara
+yazar; render() tümünü Prometheus exposition formatında (text/plain 0.0.4) döndürür.
+Metrikler ya yerel HTTP uç noktasından (start_http_server, /metrics) ya da
+node_exporter textfile collector'ın okuyacağı dosyadan (start_textfile_writer)
+dışarı verilir. Dış bağımlılık yoktur.
+
+Ek yük sınırlıdır: her kayıt tek kilit + birkaç aritmetik işlemdir, etiket değerleri
+sabit kümelerden gelir (cache türü, kaynak/dosya formatı) ve gauge'lar yalnızca
+okunurken (scrape) hesaplanır. Kayıt başına maliyet benchmark.py --metrics ile
+ölçülür; set_enabled(False) tüm kayıtları kapatır.
+
+Kullanım:
+    from metrics import start_http_server
+    start_http_server(9464)          # curl localhost:9464/metrics
+"""
+import bisect
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Saniye cinsinden varsayılan histogram sınırları (Prometheus istemci varsayılanları)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = True
+
+
+def set_enabled(enabled):
+    """Tüm metrik kayıtlarını aç/kapat (ölçüm ek yükünü karşılaştırmak için)"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def _format_value(value):
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value):
+    """Etiket değeri kaçışları: ters bölü, çift tırnak ve satır sonu"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Registry:
+    """Metrik kayıt defteri (render sırası kayıt sırasıdır)"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik zaten kayıtlı: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = None
+    
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+    
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} etiketleri {self.labelnames} olmalı: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """Yalnızca artan sayaç (örn. cache istekleri); adı _total ile biter"""
+    type = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in values]
+
+
+class Histogram(_Metric):
+    """Gecikme dağılımı (kümülatif bucket'lar, _sum ve _count)"""
+    type = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def observe(self, value, **labels):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [bucket sayıları (+Inf dahil), toplam]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+    
+    @contextmanager
+    def time(self, **labels):
+        """Blok süresini saniye olarak kaydet (hata ile çıkılsa da)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+    
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = (('le', _format_value(bound)),)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class Gauge(_Metric):
+    """Anlık değer; set_function verilirse yalnızca okunurken hesaplanır"""
+    type = 'gauge'
+    
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self._function = None
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def set_function(self, function):
+        """Etiketsiz gauge için okuma anında çağrılacak fonksiyon"""
+        self._function = function
+    
+    def samples(self):
+        if self._function is not None:
+            return [f'{self.name} {_format_value(self._function())}']
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in values]
+
+
+# Yükleme: kaynak dosyanın okunup temizlenmesi / depodan açılması
+INGEST_SECONDS = Histogram('budget_ingest_seconds', "Veri yükleme süresi (okuma + temizlik)", ['source'])
+INGEST_ROWS = Counter('budget_ingest_rows_total', "Yüklenen temiz satır sayısı", ['source'])
+
+# Tahmin: senaryo cache'i kaçırıldığında yapılan tahmin hesabı (ufuk yılları tek geçişte)
+FORECAST_SECONDS = Histogram('budget_forecast_seconds', "Tahmin hesaplama süresi", ['horizon'])
+
+# Senaryo cache'i (BudgetForecaster.memoize): tür başına isabet/ıska ve ıska hesap süresi
+CACHE_REQUESTS = Counter('budget_cache_requests_total', "Senaryo cache istekleri", ['kind', 'result'])
+CACHE_BUILD_SECONDS = Histogram('budget_cache_build_seconds', "Cache ıskasında sonucu üretme süresi", ['kind'])
+
+# Dışa aktarma dosyası üretimi (bütçe Excel'i ve tam veri indirmeleri)
+EXPORT_SECONDS = Histogram('budget_export_seconds', "Dışa aktarma dosyası üretim süresi", ['format'])
+EXPORT_BYTES = Counter('budget_export_bytes_total', "Üretilen dışa aktarma byte'ları", ['format'])
+
+# Streamlit script çalıştırmaları (tam / yeni senaryo / yalnızca bölüm)
+APP_RUNS = Counter('budget_app_runs_total', "Streamlit script çalıştırmaları", ['kind'])
+
+# Bellekteki veri setleri (okunurken hesaplanır, bkz. budget_forecast)
+RESIDENT_DATASETS = Gauge('budget_resident_datasets', "Bellekteki forecaster (veri seti) sayısı")
+RESIDENT_DATASET_BYTES = Gauge('budget_resident_dataset_bytes', "Bellekteki veri setlerinin byte toplamı")
+CACHE_ENTRIES = Gauge('budget_cache_entries', "Senaryo cache'lerindeki toplam kayıt")
+
+
+def render(registry=REGISTRY):
+    """Tüm metrikler Prometheus metin formatında"""
+    return registry.render()
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Metrikleri dosyaya yaz (atomik: önce geçici dosya, sonra rename)"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(render(registry))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def start_textfile_writer(path, interval=15.0, registry=REGISTRY):
+    """Metrikleri interval saniyede bir dosyaya yazan daemon thread başlat"""
+    def run():
+        while True:
+            write_textfile(path, registry)
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=run, name='budget-metrics-file', daemon=True)
+    thread.start()
+    return thread
+
+
+def start_http_server(port, addr='127.0.0.1', registry=REGISTRY):
+    """
+    /metrics uç noktasını daemon thread'de sun (varsayılan yalnızca yerel arayüz)
+    
+    port=0 ise boş port seçilir; gerçek port server.server_address[1]'dedir.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render(registry).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='budget-metrics-http', daemon=True).start()
+    return server
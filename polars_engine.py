@@ -0,0 +1,264 @@
+"""
+Polars lazy frame ile tahmin hattı (BudgetForecaster(engine='polars'))
+
+Okuma → temizlik → Aralık tahmini → mevsimsellik/trend/momentum → tahmin
+bağlamı → yıllık özet adımları Polars sorguları olarak çalışır. Parquet
+kaynakta okuma scan_parquet ile yapılır; sorgu optimizer'ı yalnızca şemadaki
+kolonları okur (projection pushdown) ve group_by'lar tüm çekirdeklerde paralel
+çalışır (thread sayısı: POLARS_MAX_THREADS). Excel/CSV kaynak pandas ile okunur
+(tekrarlanan '.1' başlık adları şemanın parçasıdır) ve Polars'a devredilir.
+
+Sınırda pandas DataFrame döner; sonuçlar pandas motoruyla aynıdır (kayan nokta
+toplama sırası dışında). Tahmin formülünün kendisi zaten ufuk × satır NumPy
+dizileriyle çalıştığından iki motorda ortaktır.
+
+polars opsiyonel bir bağımlılıktır (pip install polars).
+"""
+import os
+
+try:
+    import polars as pl
+except ImportError as e:
+    raise ImportError("engine='polars' için 'polars' paketi gerekli (pip install polars)") from e
+
+from budget_forecast import DAYS_IN_MONTH, HISTORY_YEARS, RECENT_MONTHS, BudgetForecaster
+from data_sources import SCHEMA_METRICS, detect_format, read_source, schema_columns
+
+
+def scan_source(source, schema, source_format=None):
+    """
+    Kaynağı yalnızca şemadaki kolonlarla LazyFrame olarak aç (ham, temizlenmemiş)
+    
+    Parquet dosya yolu taranır (okuma collect'e kadar ertelenir); diğer kaynaklar
+    data_sources.read_source ile okunur. Metin/karışık kolonlar str'ye çevrilir.
+    """
+    
+    source_format = source_format or detect_format(source)
+    columns = schema_columns(schema)
+    
+    if source_format == 'parquet':
+        if isinstance(source, (str, os.PathLike)):
+            raw = pl.scan_parquet(source)
+        else:
+            raw = pl.read_parquet(source).lazy()
+        
+        missing = [col for col in columns if col not in raw.collect_schema()]
+        if missing:
+            raise ValueError(f"Kaynakta şemadaki kolon(lar) bulunamadı: {missing}")
+        
+        return raw.select(columns)
+    
+    df = read_source(source, schema, source_format)
+    df = df.astype({col: str for col in df.columns if df[col].dtype == object})
+    
+    return pl.from_pandas(df).lazy()
+
+
+def clean(raw, schema):
+    """Ham LazyFrame'i yıl bazında ayrıştırıp temizle (bkz. BudgetForecaster.process_data)"""
+    
+    # Her yıl için eşlenen kolonları standart adlara çevir ve alt alta ekle
+    frames = [
+        raw.select(
+            pl.col(schema['month']).alias('Month'),
+            pl.col(schema['group']).alias('MainGroup'),
+            *(pl.col(mapping[metric]).cast(pl.Float64).alias(metric) for metric in SCHEMA_METRICS),
+            pl.lit(int(year), dtype=pl.Int64).alias('Year')
+        )
+        for year, mapping in schema['years'].items()
+    ]
+    data = pl.concat(frames)
+    
+    # Toplam satırlarını ve ana grubu boş satırları çıkar; Month sayıya çevrilir
+    # (çevrilemeyen ay null kalır, load_data tipini belirledikten sonra 0 yapar)
+    month_text = pl.col('Month').cast(pl.String)
+    data = data.filter(~month_text.str.contains('Toplam', literal=True).fill_null(False))
+    data = data.filter(pl.col('MainGroup').is_not_null())
+    data = data.with_columns(
+        month_text.cast(pl.Float64, strict=False).fill_nan(None).alias('Month'),
+        *(pl.col(metric).fill_nan(None).fill_null(0.0) for metric in SCHEMA_METRICS)
+    )
+    
+    # SMM ve Stok/COGS oranı
+    cogs = pl.col('Sales') - pl.col('GrossProfit')
+    return data.with_columns(
+        cogs.alias('COGS'),
+        pl.when(cogs > 0).then(pl.col('Stock') / cogs).otherwise(0.0).alias('Stock_COGS_Ratio')
+    )
+
+
+def fill_missing_december(data):
+    """Son gerçekleşme yılının Aralık ayı eksik veya sıfırsa Kasım × 1.12 ile tahmin et"""
+    
+    year = HISTORY_YEARS[-1]
+    current = data.filter(pl.col('Year') == year)
+    december = current.filter(pl.col('Month') == 12)
+    november = current.filter(pl.col('Month') == 11)
+    
+    if (december.height > 0 and december['Sales'].sum() >= 1000000) or november.height == 0:
+        return data
+    
+    # Aralık tahmini: Kasım × 1.12 (mevsimsellik faktörü), stok × 1.05
+    estimate = november.with_columns(
+        pl.lit(12, dtype=data.schema['Month']).alias('Month'),
+        pl.col('Sales') * 1.12,
+        pl.col('GrossProfit') * 1.12,
+        pl.col('Stock') * 1.05,
+        pl.col('COGS') * 1.12
+    )
+    data = pl.concat([data.filter(~((pl.col('Year') == year) & (pl.col('Month') == 12))), estimate])
+    
+    print("📅 2025 Aralık ayı tahmini eklendi (Kasım × 1.12)")
+    
+    return data.sort(['Year', 'Month', 'MainGroup'], maintain_order=True)
+
+
+def load_data(source, schema, source_format=None):
+    """Kaynağı oku, temizle ve Aralık'ı tamamla (tek collect; Polars DataFrame döner)"""
+    
+    raw = scan_source(source, schema, source_format)
+    raw_month = raw.collect_schema()[schema['month']]
+    data = clean(raw, schema).collect()
+    
+    # pd.to_numeric gibi: tamsayı ya da tamamı tamsayıya çevrilebilen metin aylar Int64 olur
+    month = data['Month']
+    integral = raw_month.is_integer() or (
+        raw_month == pl.String and month.null_count() == 0 and bool((month == month.floor()).all())
+    )
+    data = data.with_columns(pl.col('Month').cast(pl.Int64) if integral else pl.col('Month').fill_null(0.0))
+    
+    return fill_missing_december(data)
+
+
+def _seasonality(data, sales=None):
+    """
+    Mevsimsellik LazyFrame'i (MainGroup, Month, SeasonalityIndex)
+    
+    sales verilirse (örn. winsorize edilmiş, satırlara hizalı dizi) Sales yerine kullanılır.
+    """
+    
+    data = data.lazy()
+    if sales is not None:
+        data = data.with_columns(pl.lit(pl.Series('Sales', sales)))
+    group_month = data.group_by(['MainGroup', 'Month']).agg(
+        pl.col('Sales').sum().alias('sum'), pl.len().cast(pl.Float64).alias('count')
+    )
+    
+    # Her grup için yıllık ortalama (ay toplamlarından)
+    yearly = group_month.group_by('MainGroup').agg(
+        (pl.col('sum').sum() / pl.col('count').sum()).alias('YearlyAvg')
+    )
+    
+    average = pl.col('sum') / pl.col('count')
+    return group_month.join(yearly, on='MainGroup', how='left').select(
+        'MainGroup', 'Month',
+        pl.when(pl.col('YearlyAvg') > 0).then(average / pl.col('YearlyAvg')).otherwise(1.0).alias('SeasonalityIndex')
+    )
+
+
+def calculate_seasonality(data, sales=None):
+    """Her ay için mevsimsellik indeksi (bkz. BudgetForecaster.calculate_seasonality)"""
+    return _seasonality(data, sales).sort(['MainGroup', 'Month']).collect().to_pandas()
+
+
+def calculate_trend(data):
+    """Her grup için 2024->2025 büyümesi (iki yılda da olan gruplar)"""
+    
+    previous, current = HISTORY_YEARS[-2:]
+    totals = data.lazy().filter(pl.col('Year').is_in([previous, current])).group_by('MainGroup').agg(
+        pl.col('Sales').filter(pl.col('Year') == previous).sum().alias('previous'),
+        pl.col('Sales').filter(pl.col('Year') == current).sum().alias('current'),
+        (pl.col('Year') == previous).any().alias('has_previous'),
+        (pl.col('Year') == current).any().alias('has_current')
+    )
+    
+    return totals.filter(pl.col('has_previous') & pl.col('has_current')).select(
+        'MainGroup',
+        pl.when(pl.col('previous') > 0)
+        .then((pl.col('current') - pl.col('previous')) / pl.col('previous'))
+        .otherwise(0.0).alias('GrowthRate')
+    ).sort('MainGroup').collect().to_pandas()
+
+
+def calculate_recent_momentum(data):
+    """Son 3 ayın momentumu (son aylarda veri yoksa yılın tamamı)"""
+    
+    recent_month = pl.col('Month').cast(pl.Float64).is_in([float(month) for month in RECENT_MONTHS])
+    stats = data.lazy().filter(pl.col('Year') == HISTORY_YEARS[-1]).group_by('MainGroup').agg(
+        (pl.col('Sales').sum() / pl.len()).alias('OverallAvg'),
+        (pl.col('Sales').filter(recent_month).sum() / recent_month.sum()).alias('RecentAvg'),
+        recent_month.sum().alias('recent_count')
+    ).collect()
+    
+    if stats['recent_count'].sum() == 0:
+        stats = stats.with_columns(pl.col('OverallAvg').alias('RecentAvg'))
+    else:
+        stats = stats.filter(pl.col('recent_count') > 0)
+    
+    return stats.select(
+        'MainGroup',
+        pl.when(pl.col('OverallAvg') > 0).then(pl.col('RecentAvg') / pl.col('OverallAvg')).otherwise(1.0).alias('MomentumScore')
+    ).sort('MainGroup').to_pandas()
+
+
+def forecast_inputs(data, seasonality_sales=None):
+    """
+    Tahmin bağlamının senaryodan bağımsız girdileri (bkz. BudgetForecaster.get_forecast_context)
+    
+    base (2025 satırları + SeasonalityIndex + HistoricalRatio, satır sırası korunur)
+    ve 2024->2025 organik büyüme; iki sorgu collect_all ile birlikte çalışır.
+    seasonality_sales yalnızca mevsimsellikte Sales yerine kullanılır (bkz. _seasonality).
+    """
+    
+    data = data.lazy()
+    keys = ['MainGroup', 'Month']
+    
+    # Tarihsel Stok/SMM oranı (grup × ay, SMM'si olan aylar); yoksa grup, o da yoksa genel ortalama
+    history = data.filter(pl.col('COGS') > 0)
+    ratio = pl.col('Stock_COGS_Ratio').mean()
+    base = (
+        data.filter(pl.col('Year') == HISTORY_YEARS[-1])
+        .join(_seasonality(data, seasonality_sales), on=keys, how='left', maintain_order='left')
+        .join(history.group_by(keys).agg(ratio.alias('HistoricalRatio')), on=keys, how='left', maintain_order='left')
+        .join(history.group_by('MainGroup').agg(ratio.alias('GroupRatio')), on='MainGroup', how='left', maintain_order='left')
+        .join(history.select(ratio.alias('OverallRatio')), how='cross', maintain_order='left')
+        .with_columns(
+            pl.col('SeasonalityIndex').fill_null(1.0),
+            pl.coalesce('HistoricalRatio', 'GroupRatio', 'OverallRatio', pl.lit(0.0)).alias('HistoricalRatio')
+        )
+        .drop('GroupRatio', 'OverallRatio')
+    )
+    year_totals = data.group_by('Year').agg(pl.col('Sales').sum())
+    
+    base, year_totals = pl.collect_all([base, year_totals])
+    
+    # Organik trend (2024->2025)
+    totals = dict(zip(year_totals['Year'].to_list(), year_totals['Sales'].to_list()))
+    total_2024 = totals.get(2024, 0)
+    total_2025 = totals.get(2025, 0)
+    organic_growth = (total_2025 - total_2024) / total_2024 if total_2024 > 0 else 0
+    
+    return base.to_pandas(), organic_growth
+
+
+def summarize_years(data, years=None):
+    """Yıl bazında özet istatistikler (bkz. BudgetForecaster.summarize_years)"""
+    
+    if not isinstance(data, pl.DataFrame):
+        data = pl.from_pandas(data[['Year', 'Month', 'Sales', 'GrossProfit', 'Stock', 'COGS', 'Stock_COGS_Ratio']])
+    
+    # Haftalık normalize Stok/SMM: Stok / ((SMM/gün_sayısı)*7); geçersiz ayda gün null (ortalamaya girmez)
+    days = pl.col('Month').cast(pl.Float64).replace_strict(
+        {float(month): float(count) for month, count in DAYS_IN_MONTH.items()}, default=None, return_dtype=pl.Float64
+    )
+    weekly = pl.when(pl.col('COGS') > 0).then(pl.col('Stock') / ((pl.col('COGS') / days) * 7)).otherwise(0.0)
+    
+    summary = data.lazy().group_by(pl.col('Year').cast(pl.Int64)).agg(
+        pl.col('Sales').sum().alias('Total_Sales'),
+        pl.col('GrossProfit').sum().alias('Total_GrossProfit'),
+        pl.col('Stock').mean().alias('Avg_Stock'),
+        pl.col('Stock_COGS_Ratio').mean().alias('Avg_Stock_COGS_Ratio'),
+        weekly.mean().alias('Avg_Stock_COGS_Weekly')
+    ).sort('Year').collect().to_pandas().set_index('Year')
+    
+    return BudgetForecaster.complete_summary(summary, years)
@@ -0,0 +1,112 @@
+"""
+İşletme sermayesi kısıtlı stok dağıtımı
+
+Toplam stok bütçesi ana grup × ay hücrelerine, her hücrenin tarihsel Stok/SMM
+oranından sapması en az olacak şekilde dağıtılır:
+    
+    min  Σ c_i (s_i / c_i - r_i)²
+    öyle ki  Σ s_i = B,   alt_i ≤ s_i / c_i ≤ üst_i
+
+c_i: 2026 SMM, r_i: tarihsel Stok/SMM oranı, alt/üst: haftalık stok kapsama
+sınırlarından gelen oran sınırları. Ayrılabilir bir QP'dir; KKT koşulundan
+çözüm tüm hücrelerde aynı λ kaydırmasıdır: s_i / c_i = clip(r_i + λ, alt_i, üst_i).
+Σ s_i(λ) λ'da monoton olduğundan λ vektörel ikiye bölme ile bulunur ve son
+adımda serbest hücrelerden tam olarak çözülür (binlerce grupta milisaniyeler).
+"""
+import numpy as np
+
+
+def cover_ratio_bounds(days, min_weeks=None, max_weeks=None):
+    """
+    Haftalık stok kapsama sınırlarını Stok/SMM oran sınırlarına çevir
+    
+    Haftalık kapsama = Stok / ((SMM / gün) × 7) = oran × gün / 7
+    """
+    days = np.asarray(days, dtype=float)
+    lower = np.zeros_like(days) if min_weeks is None else min_weeks * 7 / days
+    upper = np.full_like(days, np.inf) if max_weeks is None else max_weeks * 7 / days
+    return lower, upper
+
+
+def budget_range(cogs, lower_ratio, upper_ratio):
+    """Kapsama sınırlarıyla ulaşılabilecek en düşük ve en yüksek toplam stok"""
+    cogs = np.asarray(cogs, dtype=float)
+    active = cogs > 0
+    lower = np.broadcast_to(np.asarray(lower_ratio, dtype=float), cogs.shape)[active]
+    upper = np.broadcast_to(np.asarray(upper_ratio, dtype=float), cogs.shape)[active]
+    return float(np.sum(cogs[active] * lower)), float(np.sum(cogs[active] * upper))
+
+
+def allocate_stock(cogs, target_ratio, total, lower_ratio=None, upper_ratio=None, tol=1e-12, max_iter=200):
+    """
+    Toplam stoğu hücrelere dağıt (bkz. modül açıklaması)
+    
+    cogs, target_ratio, lower_ratio, upper_ratio: hücre başına diziler
+    total: dağıtılacak toplam stok (tüm hücrelerin toplamı)
+    SMM'si sıfır olan hücrelere stok verilmez (oran tanımsız).
+    Bütçe sınırlarla sağlanamıyorsa ValueError (mümkün aralık mesajda).
+    """
+    cogs = np.asarray(cogs, dtype=float)
+    target = np.asarray(target_ratio, dtype=float)
+    lower = np.zeros_like(cogs) if lower_ratio is None else np.broadcast_to(np.asarray(lower_ratio, dtype=float), cogs.shape)
+    upper = np.full_like(cogs, np.inf) if upper_ratio is None else np.broadcast_to(np.asarray(upper_ratio, dtype=float), cogs.shape)
+    
+    if np.any(lower > upper):
+        raise ValueError("Alt kapsama sınırı üst sınırdan büyük olamaz")
+    
+    stock = np.zeros_like(cogs)
+    active = cogs > 0
+    c, r, lo, hi = cogs[active], target[active], lower[active], upper[active]
+    
+    min_total, max_total = budget_range(cogs, lower, upper)
+    if not (min_total - tol * max(abs(total), 1) <= total <= max_total + tol * max(abs(total), 1)):
+        raise ValueError(f"Stok bütçesi kapsama sınırlarıyla sağlanamaz: "
+                         f"mümkün aralık {min_total:,.0f} - {max_total:,.0f}, istenen {total:,.0f}")
+    
+    if len(c) == 0:
+        return stock
+    
+    # Tolerans içinde sınırın dışındaki bütçe sınıra çekilir; sınırda çözüm tüm hücrelerin
+    # alt/üst sınırda olmasıdır (ikiye bölme aralığı bu uçlarda kapanmaz)
+    if total <= min_total:
+        stock[active] = c * lo
+        return stock
+    if total >= max_total:
+        stock[active] = c * hi
+        return stock
+    
+    def allocated(shift):
+        return np.sum(c * np.clip(r + shift, lo, hi))
+    
+    # λ aralığı: alt uçta tüm hücreler alt sınırda, üst uçta tüm hücreler üst sınırda. Üst
+    # sınırı sonsuz hücre varsa Σ s(λ) sınırsız büyür; aralık ikiye katlanarak bulunur
+    low = float(np.min(lo - r))
+    if np.isfinite(hi).all():
+        high = float(np.max(hi - r))
+    else:
+        high = max(float(np.max(lo - r)), 0.0) + 1.0
+        while allocated(high) < total:
+            high *= 2
+    
+    for _ in range(max_iter):
+        mid = (low + high) / 2
+        if allocated(mid) < total:
+            low = mid
+        else:
+            high = mid
+        if high - low <= tol * max(1.0, abs(high)):
+            break
+    
+    # Tam çözüm: aktif kümeyi sabitleyip serbest hücrelerden λ'yı doğrudan hesapla
+    shift = (low + high) / 2
+    ratio = np.clip(r + shift, lo, hi)
+    free = (r + shift > lo) & (r + shift < hi)
+    if free.any():
+        fixed_total = np.sum(c[~free] * ratio[~free])
+        exact = (total - fixed_total - np.sum(c[free] * r[free])) / np.sum(c[free])
+        exact_ratio = np.clip(r + exact, lo, hi)
+        if np.array_equal((r + exact > lo) & (r + exact < hi), free):
+            ratio = exact_ratio
+    
+    stock[active] = c * ratio
+    return stock
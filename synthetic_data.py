@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# Kaynak Excel'deki yıl kolonları (pandas ikinci yılı '.1' ekiyle okur)
+YEAR_COLUMNS = ['TY Gross Profit TRY2', 'TY Avg Store Stock Cost TRY2',
+                'TY Sales Value TRY2', 'TY Gross Marjin TRY%']
+
+
+def make_raw_frame(n_groups=50, seed=0, december_2025_missing=True):
+    """
+    Kaynak Excel düzeninde (Sayfa1, 2 yıl yan yana) sentetik veri üret
+    
+    Her ay için grup satırları ve ardından 'Toplam {ay}' satırı yazılır.
+    december_2025_missing=True ise 2025 Aralık satışları 0 olur (gerçek dosyalardaki gibi).
+    """
+    
+    rng = np.random.default_rng(seed)
+    
+    months = np.repeat(np.arange(1, 13), n_groups)
+    groups = np.tile([f'Grup {g:04d}' for g in range(n_groups)], 12)
+    n = len(months)
+    
+    # Grup ölçeği × mevsimsellik × gürültü
+    scale = np.tile(rng.lognormal(13, 1, n_groups), 12)
+    season = 1 + 0.25 * np.sin((months - 3) / 12 * 2 * np.pi)
+    
+    columns = {'Month': months, 'MainGroupDesc': groups}
+    for i, growth in enumerate([1.0, 1.0 + rng.uniform(0.0, 0.3)]):
+        sales = scale * season * growth * rng.uniform(0.8, 1.2, n)
+        if i == 1 and december_2025_missing:
+            sales[months == 12] = 0
+        margin = rng.uniform(0.15, 0.45, n)
+        profit = sales * margin
+        stock = (sales - profit) * rng.uniform(0.5, 2.0, n)
+        suffix = '' if i == 0 else '.1'
+        for name, values in zip(YEAR_COLUMNS, [profit, stock, sales, margin]):
+            columns[name + suffix] = values
+    
+    df = pd.DataFrame(columns)
+    
+    # Her ayın sonuna 'Toplam' satırı ekle
+    totals = df.drop(columns='MainGroupDesc').groupby('Month', sort=True).sum().reset_index()
+    order = np.concatenate([months * 2, totals['Month'].to_numpy() * 2 + 1])
+    totals['Month'] = 'Toplam ' + totals['Month'].astype(str)
+    totals['MainGroupDesc'] = None
+    
+    df = df.astype({'Month': object})
+    df = pd.concat([df, totals[df.columns]], ignore_index=True)
+    
+    return df.iloc[np.argsort(order, kind='stable')].reset_index(drop=True)
+
+
+def write_workbook(path, n_groups=50, seed=0, december_2025_missing=True):
+    """Sentetik veriyi BudgetForecaster'ın okuduğu Excel düzeninde yaz"""
+    
+    return write_raw_workbook(path, make_raw_frame(n_groups, seed, december_2025_missing))
+
+
+def write_raw_workbook(path, df):
+    """make_raw_frame düzenindeki (gerekirse değiştirilmiş) tabloyu Excel'e yaz"""
+    
+    header = ['Month', 'MainGroupDesc'] + YEAR_COLUMNS * 2
+    
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame([['Sentetik Bütçe Verisi']]).to_excel(
+            writer, sheet_name='Sayfa1', header=False, index=False
+        )
+        pd.DataFrame([header]).to_excel(writer, sheet_name='Sayfa1', header=False, index=False, startrow=1)
+        df.to_excel(writer, sheet_name='Sayfa1', header=False, index=False, startrow=2)
+    
+    return path
+
+
+def write_csv(path, n_groups=50, seed=0, december_2025_missing=True):
+    """Sentetik veriyi ERP CSV dışa aktarımı düzeninde yaz (tek başlık satırı, tekrarlanan yıl kolonları)"""
+    
+    df = make_raw_frame(n_groups, seed, december_2025_missing)
+    df.to_csv(path, index=False, header=['Month', 'MainGroupDesc'] + YEAR_COLUMNS * 2)
+    
+    return path
+
+
+def write_parquet(path, n_groups=50, seed=0, december_2025_missing=True):
+    """Sentetik veriyi Parquet olarak yaz (2025 kolonları varsayılan şemadaki '.1' adlarıyla)"""
+    
+    df = make_raw_frame(n_groups, seed, december_2025_missing)
+    df.astype({'Month': str}).to_parquet(path, index=False)
+    
+    return path
@@ -0,0 +1,171 @@
+"""
+Yükleme anında veri doğrulama ve aykırı değer taraması
+
+process_data temizlikte boş değerleri 0 yapar, okunamayan ayları 0'a çevirir ve
+grubu boş satırları atar; negatif SMM, %100'ü aşan marj, tekrarlanan grup-ay
+satırları ve stok sıçramaları da olduğu gibi tahmine girer. screen_data tüm
+kontrolleri numpy maskeleriyle tek geçişte hesaplar ve kısa bir sorun raporu
+(kontrol başına satır sayısı + birkaç örnek) döndürür; veri değiştirilmez.
+
+Aykırı değerler grup içinde medyan ve MAD (median absolute deviation) ile bulunur;
+winsorize_sales aynı sınırlarla satışları kırpar (isteğe bağlı, mevsimsellikten önce,
+bkz. BudgetForecaster(winsorize=True)).
+"""
+import numpy as np
+import pandas as pd
+
+# MAD'ı normal dağılım standart sapmasına çeviren katsayı
+MAD_SCALE = 1.4826
+
+# Grup içi modifiye z-skoru bu sınırı aşan değerler aykırıdır (Iglewicz-Hoaglin)
+OUTLIER_LIMIT = 3.5
+
+# Rapordaki örnek satır sayısı (kontrol başına)
+MAX_EXAMPLES = 3
+
+# Rapor kolonları ve önem seviyeleri
+ISSUE_COLUMNS = ['Kod', 'Kontrol', 'Önem', 'Satır', 'Örnek']
+SEVERITIES = ('hata', 'uyarı', 'bilgi')
+
+# Kontroller: kod → (açıklama, önem) - rapor bu sırayla yazılır
+CHECKS = {
+    'group_missing': ("Ana grubu boş satır (atıldı)", 'uyarı'),
+    'month_invalid': ("Ay 1-12 dışında veya okunamadı (0 olarak işlendi)", 'hata'),
+    'value_missing': ("Boş satış/kar/marj/stok değeri (0 olarak işlendi)", 'uyarı'),
+    'duplicate_rows': ("Aynı yıl-ay-grup için birden fazla satır", 'hata'),
+    'cogs_negative': ("Negatif SMM (brüt kar satıştan büyük)", 'hata'),
+    'margin_over_100': ("Brüt marj %100'ün üzerinde", 'hata'),
+    'sales_negative': ("Negatif satış (iade)", 'uyarı'),
+    'stock_negative': ("Negatif stok", 'hata'),
+    'stock_spike': ("Stok sıçraması (grup medyanının çok üzerinde)", 'uyarı'),
+    'sales_outlier': ("Aykırı satış (winsorize ile kırpılabilir)", 'bilgi'),
+}
+
+VALUE_COLUMNS = ['Sales', 'GrossProfit', 'GrossMargin%', 'Stock']
+
+
+def _cells(data):
+    """
+    Satırların (ana grup, yıl-ay) hücre yerleşimi
+    
+    Grup başına en fazla yıl × 12 hücre olduğundan grup istatistikleri satırlar
+    yerine (grup × hücre) matrisinde, satır bazında sıralama ile hesaplanır.
+    Dönen değerler: grup kodları (grup boşsa -1), grup sayısı, grup başına hücre
+    sayısı, geçerli ay maskesi, matrise yerleşen satırlar ve hücre indeksleri.
+    """
+    codes, groups = pd.factorize(data['MainGroup'], sort=False)
+    year = data['Year'].to_numpy(dtype=np.int64)
+    first = year.min() if len(year) else 0
+    width = (year.max() - first + 1) * 12 if len(year) else 12
+    month = data['Month'].to_numpy(dtype=float, na_value=np.nan)
+    valid_month = (month >= 1) & (month <= 12) & (month == np.floor(month))
+    
+    placed = valid_month & (codes >= 0)
+    cell = codes[placed] * width + (year[placed] - first) * 12 + month[placed].astype(np.int64) - 1
+    return codes, len(groups), width, valid_month, placed, cell
+
+
+def _row_median(matrix):
+    """Matris satırlarının medyanı (NaN'lar atlanır; satır boşsa NaN)"""
+    matrix = np.sort(matrix, axis=1)
+    width = matrix.shape[1]
+    counts = width - np.isnan(matrix).sum(axis=1)
+    rows = np.arange(len(matrix))
+    low = matrix[rows, np.maximum(counts - 1, 0) // 2]
+    high = matrix[rows, np.minimum(counts // 2, width - 1)]
+    return np.where(counts > 0, (low + high) / 2, np.nan)
+
+
+def _group_bounds(values, layout, limit=OUTLIER_LIMIT):
+    """
+    Grup içi medyan ± limit × ölçekli MAD sınırları (grup başına; kodlarla satırlara hizalanır)
+    
+    Sıfır değerler (satışı/stoğu olmayan ay, örn. henüz girilmemiş Aralık) istatistiğe
+    katılmaz. Son eleman grubu boş satırlar içindir (kod -1). MAD=0 olan veya değeri
+    olmayan gruplarda sınır yoktur. Aynı hücreye düşen tekrarlı satırlardan yalnızca
+    biri sayılır (tekrarlar ayrıca raporlanır).
+    """
+    codes, size, width, _, placed, cell = layout
+    matrix = np.full(size * width, np.nan)
+    matrix[cell] = values[placed]
+    matrix[matrix == 0] = np.nan
+    matrix = matrix.reshape(size, width)
+    
+    median = _row_median(matrix)
+    spread = _row_median(np.abs(matrix - median[:, None])) * MAD_SCALE * limit
+    spread = np.where(spread > 0, spread, np.inf)
+    lower = np.append(np.nan_to_num(median - spread, nan=-np.inf), -np.inf)
+    upper = np.append(np.nan_to_num(median + spread, nan=np.inf), np.inf)
+    return lower, upper
+
+
+def winsorize_sales(data, limit=OUTLIER_LIMIT):
+    """Satışları grup içi medyan ± limit × MAD sınırlarına kırp (sıfırlar korunur; yeni dizi döner)"""
+    sales = data['Sales'].to_numpy(dtype=float)
+    layout = _cells(data)
+    lower, upper = _group_bounds(sales, layout, limit)
+    codes = layout[0]
+    return np.where(sales == 0, sales, np.clip(sales, lower[codes], upper[codes]))
+
+
+def screen_data(data, limit=OUTLIER_LIMIT):
+    """
+    Uzun formattaki veriyi tara, sorun raporu döndür (ISSUE_COLUMNS; sorun yoksa boş)
+    
+    data: Year, Month, MainGroup, Sales, GrossProfit, GrossMargin%, Stock kolonları.
+    process_data'da Toplam satırları çıkarılıp Month sayıya çevrildikten hemen sonra
+    (boş grup/değerler henüz duruyorken) çağrılır; temizlenmiş veride de çalışır
+    (o zaman yalnızca değer kontrolleri sonuç verir).
+    """
+    
+    layout = _cells(data)
+    codes, size, width, valid_month, placed, cell = layout
+    has_group = codes >= 0
+    sales, profit, margin, stock = (data[column].to_numpy(dtype=float, na_value=np.nan) for column in VALUE_COLUMNS)
+    
+    # Aynı yıl-ay-grup hücresine düşen satırlar
+    duplicated = np.zeros(len(codes), dtype=bool)
+    duplicated[placed] = np.bincount(cell, minlength=size * width)[cell] > 1
+    
+    # Grup içi aykırılar (grup başına sınırlar kodlarla satırlara açılır)
+    _, stock_upper = _group_bounds(stock, layout, limit)
+    sales_lower, sales_upper = _group_bounds(sales, layout, limit)
+    
+    masks = {
+        'group_missing': ~has_group,
+        'month_invalid': has_group & ~valid_month,
+        'value_missing': has_group & (np.isnan(sales) | np.isnan(profit) | np.isnan(margin) | np.isnan(stock)),
+        'duplicate_rows': duplicated,
+        'cogs_negative': has_group & (profit > sales),
+        'margin_over_100': has_group & (margin > 1),
+        'sales_negative': has_group & (sales < 0),
+        'stock_negative': has_group & (stock < 0),
+        'stock_spike': stock > stock_upper[codes],
+        'sales_outlier': (sales != 0) & ((sales < sales_lower[codes]) | (sales > sales_upper[codes])),
+    }
+    
+    groups = data['MainGroup']
+    year = data['Year'].to_numpy()
+    month = data['Month'].to_numpy(dtype=float, na_value=np.nan)
+    rows = []
+    for code, (label, severity) in CHECKS.items():
+        count = np.count_nonzero(masks[code])
+        if not count:
+            continue
+        examples = np.flatnonzero(masks[code])[:MAX_EXAMPLES]
+        rows.append({
+            'Kod': code,
+            'Kontrol': label,
+            'Önem': severity,
+            'Satır': count,
+            'Örnek': ', '.join(dict.fromkeys(_describe(groups.iloc[i], year[i], month[i]) for i in examples))
+        })
+    
+    return pd.DataFrame(rows, columns=ISSUE_COLUMNS)
+
+
+def _describe(group, year, month):
+    """Örnek satır etiketi: 'Grup 2025-03'"""
+    label = 'Grupsuz' if pd.isna(group) else str(group)
+    month = f'{int(month):02d}' if np.isfinite(month) else '??'
+    return f'{label} {int(year)}-{month}'
@@ -0,0 +1,118 @@
+"""
+Yükleme sonrası spekülatif ön hesaplama
+
+Veri seti kaydedildikten sonra sunucu, kullanıcı bir widget'a dokunana kadar boşta
+bekler. Bu modül varsayılan senaryonun tahminini, tablarda gösterilen tabloları,
+figür spec'lerini ve dışa aktarma dosyalarını arka plandaki tek bir thread'de üretip
+forecaster'ın senaryo cache'ine (memoize) koyar; ilk gerçek etkileşim cache'ten okunur.
+
+Adımlar script'in ihtiyaç sırasıyla çalışır. memoize tek uçuşlu olduğundan script
+ön hesaplama sürerken aynı değeri isterse hesabı tekrarlamaz, bitmesini bekler.
+"""
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from charts import get_chart_specs, get_tornado_spec
+from export_jobs import get_full_export, submit_export
+
+# Ön hesaplanan tornado metrikleri ve tam veri formatı (arayüzdeki seçeneklerle aynı)
+WARMUP_TORNADO_METRICS = ('Sales', 'GrossProfit', 'Stock')
+WARMUP_EXPORT_FORMAT = 'parquet'
+
+# Tek thread: ön hesaplama oturumların asıl işleriyle en az CPU için yarışmalı
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='budget-warmup')
+
+# forecaster → Warmup; forecaster silinince kaydı da düşer
+_WARMUPS = weakref.WeakKeyDictionary()
+_WARMUPS_LOCK = threading.Lock()
+
+
+class Warmup:
+    """Tek forecaster'ın ön hesaplaması (durum ve adım süreleri thread-safe okunur)"""
+    
+    def __init__(self, forecaster, scenario):
+        # Zayıf referans: kayıt defteri forecaster'ı canlı tutmamalı (bkz. _WARMUPS)
+        self._forecaster = weakref.ref(forecaster)
+        self.scenario = dict(scenario)
+        self.status = 'pending'
+        self.step = None
+        self.timings = {}
+        self.error = None
+        self._lock = threading.Lock()
+    
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+    
+    @property
+    def elapsed(self):
+        """Tamamlanan adımların toplam süresi (saniye)"""
+        with self._lock:
+            return sum(self.timings.values())
+    
+    def steps(self, forecaster):
+        """(ad, fonksiyon) adımları - script'in ilk çalıştırmada istediği sırayla"""
+        scenario = self.scenario
+        steps = [
+            ('forecast', lambda: forecaster.get_full_data_with_forecast(**scenario)),
+            ('charts', lambda: get_chart_specs(forecaster, scenario)),
+            ('group_quality', forecaster.get_group_quality_metrics),
+            ('detail', lambda: forecaster.get_detail_comparison(**scenario, formatted=True)),
+        ]
+        steps.extend(
+            (f'tornado_{metric}', lambda metric=metric: get_tornado_spec(forecaster, scenario, metric))
+            for metric in WARMUP_TORNADO_METRICS
+        )
+        steps.append(('full_export', lambda: get_full_export(forecaster, scenario, WARMUP_EXPORT_FORMAT)))
+        
+        # Excel kendi thread havuzunda üretilir (export_jobs); burada yalnızca kuyruğa alınır
+        steps.append(('budget_workbook', lambda: submit_export(forecaster, scenario)))
+        return steps
+    
+    def run(self):
+        self.status = 'running'
+        try:
+            forecaster = self._forecaster()
+            if forecaster is None:
+                raise RuntimeError("Veri seti bellekten çıkarıldı")
+            
+            for name, step in self.steps(forecaster):
+                with self._lock:
+                    self.step = name
+                start = time.perf_counter()
+                step()
+                with self._lock:
+                    self.timings[name] = time.perf_counter() - start
+        except Exception as e:
+            with self._lock:
+                self.error = e
+                self.status = 'failed'
+            raise
+        
+        with self._lock:
+            self.step = None
+            self.status = 'done'
+
+
+def find_warmup(forecaster):
+    """Forecaster için başlatılmış ön hesaplama (yoksa None)"""
+    with _WARMUPS_LOCK:
+        return _WARMUPS.get(forecaster)
+
+
+def start_warmup(forecaster, scenario):
+    """
+    Senaryonun ön hesaplamasını arka planda başlat (bekleme yapmaz)
+    
+    Forecaster başına bir kez çalışır; tekrar çağrılırsa mevcut iş döner.
+    """
+    with _WARMUPS_LOCK:
+        warmup = _WARMUPS.get(forecaster)
+        if warmup is not None:
+            return warmup
+        warmup = _WARMUPS[forecaster] = Warmup(forecaster, scenario)
+    
+    _EXECUTOR.submit(warmup.run)
+    return warmup